@@ -0,0 +1,16 @@
+"""
+PDF Locker - ベンチマーク
+
+core_logic の処理速度とメモリ使用量を測るためのツール群です。
+pypdfを更新したときなどに、性能が落ちていないかを確認するのに使います。
+
+使い方:
+    python -m benchmarks                      # 合成PDFを作って全項目を測定
+    python -m benchmarks --quick              # 小さめのデータで手早く測定
+    python -m benchmarks -o result.json       # 結果をJSONで保存
+    python -m benchmarks.compare old.json new.json   # 2回分の結果を比較
+    python -m benchmarks.batch_keys           # 鍵の導出の使い回しの効果（1,000件）
+    python -m benchmarks.startup              # デスクトップ版の起動時間（最初のウィンドウまで）
+    python -m benchmarks.import_time          # core_logic のインポート時間（上限150ms）
+    python -m benchmarks.parallel             # 大きなPDF1つの分担暗号化とストリーミング暗号化の比較
+"""
@@ -0,0 +1,7 @@
+"""python -m benchmarks で測定を実行"""
+
+import sys
+
+from benchmarks.run import main
+
+sys.exit(main())
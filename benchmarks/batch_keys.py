@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+同じパスワードで多数のファイルに鍵をかける場合の、鍵の導出の使い回しの効果を測定
+
+1ページの合成PDFを指定した件数だけ続けて処理し、
+ファイルごとに鍵を導出する場合と、バッチの最初に1度だけ導出する場合
+（derive_password_keys）の所要時間を比べます。
+
+Usage:
+    python -m benchmarks.batch_keys [--files 1000] [-o result.json]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks.corpus import CorpusSpec, ensure_corpus
+from benchmarks.run import BENCH_PASSWORD, DEFAULT_CORPUS_DIR, environment_info, percentile
+
+# リポジトリ直下の core_logic を読み込めるようにする
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def run_batch(data: bytes, files: int, shared_keys: bool) -> dict:
+    """
+    1つのPDFを件数分続けて処理
+
+    Args:
+        data: PDFのバイトデータ
+        files: 処理する件数
+        shared_keys: Trueの場合は鍵の導出をバッチの最初に1度だけ行う
+
+    Returns:
+        集計結果
+    """
+    import core_logic
+
+    started = time.perf_counter()
+    keys = core_logic.derive_password_keys(BENCH_PASSWORD) if shared_keys else None
+    latencies = []
+    failures = 0
+    for _ in range(files):
+        file_started = time.perf_counter()
+        if not core_logic.lock_pdf_bytes(data, BENCH_PASSWORD, keys=keys)[0]:
+            failures += 1
+        latencies.append(time.perf_counter() - file_started)
+    total = time.perf_counter() - started
+
+    return {
+        "files": files,
+        "failures": failures,
+        "total_s": round(total, 3),
+        "per_file_ms": round(total / files * 1000, 3),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="鍵の導出の使い回しの効果を測定します")
+    parser.add_argument("--files", type=int, default=1000, help="1バッチの件数")
+    parser.add_argument("--corpus-dir", type=Path, default=DEFAULT_CORPUS_DIR, help="合成PDFの保存先")
+    parser.add_argument("-o", "--output", type=Path, help="結果を保存するJSONファイル")
+    args = parser.parse_args(argv)
+
+    corpus = ensure_corpus(args.corpus_dir / "quick", [CorpusSpec("pages_1", pages=1)])
+    data = corpus["pages_1"].read_bytes()
+
+    # 初回はインポートなどの影響を受けるので測定から外す
+    run_batch(data, 1, shared_keys=False)
+
+    results = {}
+    for name, shared_keys in (("per_file_keys", False), ("shared_keys", True)):
+        print(f"  {name} ({args.files} files) ...", end=" ", flush=True)
+        results[name] = run_batch(data, args.files, shared_keys)
+        print(f"{results[name]['per_file_ms']}ms/file")
+
+    before = results["per_file_keys"]["per_file_ms"]
+    after = results["shared_keys"]["per_file_ms"]
+    saving = {
+        "per_file_ms": round(before - after, 3),
+        "percent": round((before - after) / before * 100, 1) if before else None,
+    }
+    print(f"Saving: {saving['per_file_ms']}ms/file ({saving['percent']}%)")
+
+    report = {"environment": environment_info(), "results": results, "saving": saving}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Saved: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
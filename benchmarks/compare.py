@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+2回分のベンチマーク結果（JSON）を比較
+
+Usage:
+    python -m benchmarks.compare old.json new.json [--threshold 10]
+
+--threshold を指定すると、レイテンシ（p50）または最大RSSがその割合（%）以上
+悪化した組み合わせがあった場合に終了コード1を返します。
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# 比較する項目（名前, 値が大きいほど良いか）
+METRICS = [
+    ("files_per_s", True),
+    ("mb_per_s", True),
+    ("latency_p50_ms", False),
+    ("latency_p95_ms", False),
+    ("peak_rss_mb", False),
+]
+
+# --threshold の判定に使う項目
+GATED_METRICS = {"latency_p50_ms", "peak_rss_mb"}
+
+
+def change_percent(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    """変化率（%）を求める"""
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old * 100
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="2回分のベンチマーク結果を比較します")
+    parser.add_argument("old", type=Path, help="基準となる結果")
+    parser.add_argument("new", type=Path, help="比較する結果")
+    parser.add_argument("--threshold", type=float, help="悪化とみなす変化率（%%）")
+    args = parser.parse_args(argv)
+
+    old = json.loads(args.old.read_text(encoding="utf-8"))["results"]
+    new = json.loads(args.new.read_text(encoding="utf-8"))["results"]
+
+    regressions = []
+    for entry_point in sorted(set(old) & set(new)):
+        for name in sorted(set(old[entry_point]) & set(new[entry_point])):
+            before = old[entry_point][name]
+            after = new[entry_point][name]
+            cells = []
+            for metric, higher_is_better in METRICS:
+                change = change_percent(before.get(metric), after.get(metric))
+                if change is None:
+                    cells.append(f"{metric}=n/a")
+                    continue
+                cells.append(f"{metric}={after[metric]} ({change:+.1f}%)")
+                worse = -change if higher_is_better else change
+                if args.threshold is not None and metric in GATED_METRICS and worse > args.threshold:
+                    regressions.append(f"{entry_point}/{name}: {metric} {change:+.1f}%")
+            print(f"{entry_point}/{name}: " + ", ".join(cells))
+
+    if regressions:
+        print()
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
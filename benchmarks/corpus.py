@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の合成PDFを作成
+
+測定対象（pypdf）に依存しないよう、PDFの構造を直接書き出します。
+同じ名前・同じ設定なら毎回同じ内容のファイルができます。
+
+作成するPDFの種類:
+- pages_N: 簡単な図形を描いたページがN枚
+- image_heavy: 圧縮できない画像（スキャン画像相当）を貼ったページ
+- many_small_objects: 小さなオブジェクトが大量に含まれる文書
+- large_metadata: 大きな文書情報とXMPメタデータを持つ文書
+"""
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+@dataclass
+class CorpusSpec:
+    """合成PDFの設定"""
+    name: str
+    pages: int = 1
+    image_bytes: int = 0
+    small_objects: int = 0
+    metadata_entries: int = 0
+    xmp_bytes: int = 0
+
+
+# 通常の測定で使う合成PDF
+FULL_CORPUS = [
+    CorpusSpec("pages_1", pages=1),
+    CorpusSpec("pages_100", pages=100),
+    CorpusSpec("pages_1000", pages=1000),
+    CorpusSpec("pages_5000", pages=5000),
+    CorpusSpec("image_heavy", pages=40, image_bytes=1024 * 1024),
+    CorpusSpec("many_small_objects", pages=10, small_objects=50000),
+    CorpusSpec("large_metadata", pages=5, metadata_entries=2000, xmp_bytes=4 * 1024 * 1024),
+]
+
+# --quick で使う小さめの合成PDF
+QUICK_CORPUS = [
+    CorpusSpec("pages_1", pages=1),
+    CorpusSpec("pages_100", pages=100),
+    CorpusSpec("image_heavy", pages=8, image_bytes=256 * 1024),
+    CorpusSpec("many_small_objects", pages=5, small_objects=5000),
+    CorpusSpec("large_metadata", pages=2, metadata_entries=200, xmp_bytes=256 * 1024),
+]
+
+
+class _RawPdfWriter:
+    """最小限のPDF書き出し（オブジェクトを順番に追加して最後に相互参照表を書く）"""
+
+    def __init__(self):
+        self._objects: List[Optional[bytes]] = []
+
+    def reserve(self) -> int:
+        """番号だけ先に確保する（親子で相互参照するオブジェクト用）"""
+        self._objects.append(None)
+        return len(self._objects)
+
+    def set(self, idnum: int, body: bytes) -> None:
+        self._objects[idnum - 1] = body
+
+    def add(self, body: bytes) -> int:
+        self._objects.append(body)
+        return len(self._objects)
+
+    def add_stream(self, dictionary: bytes, data: bytes) -> int:
+        body = b"<< " + dictionary + b" /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        return self.add(body)
+
+    def write(self, path: Path, root: int, info: Optional[int] = None) -> None:
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+            offsets = []
+            for idnum, body in enumerate(self._objects, 1):
+                offsets.append(f.tell())
+                f.write(b"%d 0 obj\n" % idnum + body + b"\nendobj\n")
+            xref_offset = f.tell()
+            f.write(b"xref\n0 %d\n" % (len(self._objects) + 1))
+            f.write(b"0000000000 65535 f\r\n")
+            for offset in offsets:
+                f.write(b"%010d 00000 n\r\n" % offset)
+            trailer = b"/Size %d /Root %d 0 R" % (len(self._objects) + 1, root)
+            if info is not None:
+                trailer += b" /Info %d 0 R" % info
+            f.write(b"trailer\n<< " + trailer + b" >>\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+
+
+def build_pdf(spec: CorpusSpec, path: Path, seed: int = 0) -> Path:
+    """
+    設定に従って合成PDFを作成
+
+    Args:
+        spec: 合成PDFの設定
+        path: 出力先
+        seed: 乱数の種（画像データなどに使用）
+
+    Returns:
+        作成したファイルのパス
+    """
+    rng = random.Random(f"{spec.name}-{seed}")
+    pdf = _RawPdfWriter()
+
+    catalog = pdf.reserve()
+    pages_root = pdf.reserve()
+
+    # 小さなオブジェクトは1ページ目からまとめて参照する
+    small_refs = b""
+    if spec.small_objects:
+        refs = []
+        for i in range(spec.small_objects):
+            idnum = pdf.add(b"<< /Index %d /Name (item-%d) /Value %d >>" % (i, i, rng.randrange(1 << 30)))
+            refs.append(b"%d 0 R" % idnum)
+        small_refs = b" /BenchData [ " + b" ".join(refs) + b" ]"
+
+    page_ids = []
+    for page_no in range(spec.pages):
+        resources = b""
+        drawing = b"0.5 w 72 72 m 540 720 l S 72 720 m 540 72 l S\n"
+        if spec.image_bytes:
+            side = max(1, int((spec.image_bytes // 3) ** 0.5))
+            image = pdf.add_stream(
+                b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                b"/ColorSpace /DeviceRGB /BitsPerComponent 8" % (side, side),
+                rng.getrandbits(side * side * 24).to_bytes(side * side * 3, "little")
+            )
+            resources = b" /Resources << /XObject << /Im0 %d 0 R >> >>" % image
+            drawing += b"q 468 0 0 648 72 72 cm /Im0 Do Q\n"
+        contents = pdf.add_stream(b"", drawing * 4)
+        extra = small_refs if page_no == 0 else b""
+        page_ids.append(pdf.add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [ 0 0 612 792 ] /Contents %d 0 R%s%s >>"
+            % (pages_root, contents, resources, extra)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % idnum for idnum in page_ids)
+    pdf.set(pages_root, b"<< /Type /Pages /Count %d /Kids [ %s ] >>" % (len(page_ids), kids))
+
+    metadata = b""
+    if spec.xmp_bytes:
+        packet = b'<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?><x:xmpmeta xmlns:x="adobe:ns:meta/">'
+        filler = b"<rdf:li>" + b"x" * 100 + b"</rdf:li>"
+        packet += filler * (spec.xmp_bytes // len(filler))
+        packet += b'</x:xmpmeta><?xpacket end="w"?>'
+        metadata = b" /Metadata %d 0 R" % pdf.add_stream(b"/Type /Metadata /Subtype /XML", packet)
+    pdf.set(catalog, b"<< /Type /Catalog /Pages %d 0 R%s >>" % (pages_root, metadata))
+
+    entries = [b"/Title (Benchmark %s)" % spec.name.encode(), b"/Producer (pdf_locker benchmarks)"]
+    for i in range(spec.metadata_entries):
+        entries.append(b"/Bench%05d (%s)" % (i, b"m" * 200))
+    info = pdf.add(b"<< " + b" ".join(entries) + b" >>")
+
+    pdf.write(path, catalog, info)
+    return path
+
+
+def ensure_corpus(directory: Path, specs: List[CorpusSpec]) -> Dict[str, Path]:
+    """
+    合成PDFを作成（作成済みのものはそのまま使う）
+
+    Args:
+        directory: 保存先ディレクトリ
+        specs: 合成PDFの設定のリスト
+
+    Returns:
+        {名前: ファイルパス}
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    corpus = {}
+    for spec in specs:
+        path = directory / f"{spec.name}.pdf"
+        if not path.exists():
+            print(f"Generating {path.name}...")
+            build_pdf(spec, path)
+        corpus[spec.name] = path
+    return corpus
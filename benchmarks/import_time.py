@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+core_logic のインポート時間を測定（python -X importtime）
+
+新しいPythonプロセスで core_logic を繰り返しインポートし、-X importtime の出力から
+core_logic の累積インポート時間を求めます。Streamlitの起動やワーカープロセスの起動のたびに
+かかる時間なので、pypdfなどの重いライブラリをインポート時に読み込んでいないかも確かめます。
+
+p50が --budget-ms を超えた場合、またはインポート時に読み込んではいけないモジュール
+（pypdfなど。最初に使うときに読み込む）が読み込まれた場合は終了コード1を返します。
+
+Usage:
+    python -m benchmarks.import_time [--runs 20] [--budget-ms 150] [-o result.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.run import PROJECT_ROOT, environment_info, percentile
+
+# 測定するモジュール
+MODULE = "core_logic"
+# p50の上限（ミリ秒）の既定値
+DEFAULT_BUDGET_MS = 150.0
+# インポート時に読み込んではいけないモジュール（最初に使うときに読み込む）
+DEFERRED_MODULES = ("pypdf", "cryptography", "Crypto", "docx2pdf", "comtypes")
+# 時間のかかったモジュールとして表示する件数
+TOP_IMPORTS = 10
+
+
+def parse_importtime(stderr: str, module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    -X importtime の出力から、moduleのインポートで読み込まれたモジュールの時間を取り出す
+
+    出力は読み込みが終わった順に並び、字下げが入れ子の深さを表します。
+    moduleの行の直前にある、字下げされた行がmoduleから読み込まれたモジュールです
+    （Python自体の起動時に読み込まれるモジュールは含みません）。
+
+    Args:
+        stderr: 標準エラーの内容
+        module: 測定したモジュール
+
+    Returns:
+        {モジュール名: (自身の時間[µs], 累積時間[µs])}（module自身を含む）
+    """
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entry = (int(self_us), int(cumulative_us))
+        if name.startswith("  "):
+            children[name.strip()] = entry
+        elif name.strip() == module:
+            children[module] = entry
+            return children
+        else:
+            children = {}
+    raise ValueError(f"{module} の行が見つかりません")
+
+
+def measure_once(module: str) -> Dict[str, Tuple[int, int]]:
+    """新しいプロセスで1回インポートして、モジュールごとの時間を返す"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(PROJECT_ROOT),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return parse_importtime(completed.stderr, module)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="core_logic のインポート時間を測定します")
+    parser.add_argument("--runs", type=int, default=20, help="測定する回数")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="p50の上限（ミリ秒）")
+    parser.add_argument("--module", default=MODULE, help="測定するモジュール")
+    parser.add_argument("-o", "--output", type=Path, help="結果を保存するJSONファイル")
+    args = parser.parse_args(argv)
+
+    # 初回は .pyc の作成などの影響を受けるので測定から外す
+    measure_once(args.module)
+
+    totals = []
+    self_times: Dict[str, List[int]] = {}
+    deferred_loaded = set()
+    for _ in range(args.runs):
+        times = measure_once(args.module)
+        totals.append(times[args.module][1] / 1000)
+        for name, (self_us, _cumulative) in times.items():
+            self_times.setdefault(name, []).append(self_us)
+            if name.split(".")[0] in DEFERRED_MODULES:
+                deferred_loaded.add(name.split(".")[0])
+
+    p50 = percentile(totals, 50)
+    top = sorted(
+        ((name, percentile(values, 50) / 1000) for name, values in self_times.items() if name != args.module),
+        key=lambda item: item[1],
+        reverse=True
+    )[:TOP_IMPORTS]
+
+    print(f"{args.module}: p50 {p50:.1f}ms, p95 {percentile(totals, 95):.1f}ms, min {min(totals):.1f}ms "
+          f"(budget {args.budget_ms:.0f}ms, {args.runs} runs)")
+    print("Slowest imports (self, p50):")
+    for name, ms in top:
+        print(f"  {name}: {ms:.1f}ms")
+
+    failures = []
+    if p50 > args.budget_ms:
+        failures.append(f"import time p50 {p50:.1f}ms exceeds budget {args.budget_ms:.0f}ms")
+    if deferred_loaded:
+        failures.append("loaded at import time: " + ", ".join(sorted(deferred_loaded)))
+
+    report = {
+        "environment": environment_info(),
+        "module": args.module,
+        "results": {
+            "runs": args.runs,
+            "p50_ms": round(p50, 1),
+            "p95_ms": round(percentile(totals, 95), 1),
+            "min_ms": round(min(totals), 1),
+            "budget_ms": args.budget_ms,
+            "slowest_imports_ms": {name: round(ms, 1) for name, ms in top},
+            "deferred_modules_loaded": sorted(deferred_loaded),
+        },
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Saved: {args.output}")
+
+    if failures:
+        print()
+        print("Regressions:")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
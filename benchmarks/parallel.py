@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+大きなPDF1つを複数プロセスで分担して暗号化する効果を測定
+
+PARALLEL_MIN_BYTES / PARALLEL_MIN_OBJECTS を超える合成PDFを作り、
+1プロセスのストリーミング暗号化（lock_pdf_file(..., streaming=True)）と
+分担暗号化（lock_pdf_file(..., parallel=N)）の所要時間を比べます。
+分担暗号化はストリーミングと同じ構成のPDFを出力するため、比べる相手はストリーミングです。
+
+Usage:
+    python -m benchmarks.parallel [--quick] [--workers 2 4] [--repeat 3] [-o result.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.corpus import CorpusSpec, ensure_corpus
+from benchmarks.run import BENCH_PASSWORD, DEFAULT_CORPUS_DIR, environment_info, percentile
+
+# リポジトリ直下の core_logic を読み込めるようにする
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# 分担暗号化の対象になる大きさの合成PDF
+PARALLEL_CORPUS = [
+    CorpusSpec("image_heavy_64mb", pages=64, image_bytes=1024 * 1024),
+    CorpusSpec("many_small_objects_100k", pages=20, small_objects=100000),
+]
+
+# --quick で使う合成PDF（それでも分担暗号化の下限は超える大きさ）
+QUICK_PARALLEL_CORPUS = [
+    CorpusSpec("image_heavy_16mb", pages=16, image_bytes=1024 * 1024),
+    CorpusSpec("many_small_objects_20k", pages=5, small_objects=20000),
+]
+
+
+def run_lock(path: Path, workers: int, repeat: int) -> dict:
+    """
+    1つのPDFを繰り返し暗号化
+
+    Args:
+        path: 入力PDF
+        workers: 分担するプロセス数（1の場合はストリーミング暗号化）
+        repeat: 繰り返し回数
+
+    Returns:
+        集計結果
+    """
+    import core_logic
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        output = os.path.join(work_dir, "out.pdf")
+
+        def run() -> bool:
+            if workers == 1:
+                return core_logic.lock_pdf_file(str(path), output, BENCH_PASSWORD, streaming=True)[0]
+            return core_logic.lock_pdf_file(str(path), output, BENCH_PASSWORD, parallel=workers)[0]
+
+        # 初回はインポートやキャッシュの影響を受けるので測定から外す
+        run()
+
+        latencies = []
+        failures = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            if not run():
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    return {
+        "runs": repeat,
+        "failures": failures,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "latency_min_ms": round(min(latencies) * 1000, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    import core_logic
+
+    parser = argparse.ArgumentParser(description="大きなPDFの分担暗号化の効果を測定します")
+    parser.add_argument("--quick", action="store_true", help="小さめの合成PDFで手早く測定")
+    parser.add_argument("--workers", type=int, nargs="+", help="分担するプロセス数（既定: 2 と CPUコア数）")
+    parser.add_argument("--repeat", type=int, default=3, help="各組み合わせの繰り返し回数")
+    parser.add_argument("--corpus-dir", type=Path, default=DEFAULT_CORPUS_DIR, help="合成PDFの保存先")
+    parser.add_argument("-o", "--output", type=Path, help="結果を保存するJSONファイル")
+    args = parser.parse_args(argv)
+
+    specs = QUICK_PARALLEL_CORPUS if args.quick else PARALLEL_CORPUS
+    corpus = ensure_corpus(args.corpus_dir / ("parallel_quick" if args.quick else "parallel"), specs)
+    worker_counts = args.workers or sorted({2, core_logic.default_worker_count()})
+    if os.cpu_count() == 1:
+        print("Warning: only 1 CPU is available; parallel encryption cannot be faster here", file=sys.stderr)
+
+    results: Dict[str, dict] = {}
+    for name, path in corpus.items():
+        results[name] = {"input_mb": round(path.stat().st_size / (1024 * 1024), 3)}
+        print(f"  {name} / streaming ...", end=" ", flush=True)
+        baseline = run_lock(path, 1, args.repeat)
+        results[name]["streaming"] = baseline
+        print(f"p50={baseline['latency_p50_ms']}ms")
+        for workers in worker_counts:
+            if workers < 2:
+                continue
+            print(f"  {name} / parallel={workers} ...", end=" ", flush=True)
+            measured = run_lock(path, workers, args.repeat)
+            measured["speedup"] = round(baseline["latency_p50_ms"] / measured["latency_p50_ms"], 2)
+            results[name][f"parallel_{workers}"] = measured
+            print(f"p50={measured['latency_p50_ms']}ms speedup={measured['speedup']}x")
+
+    report = {"environment": environment_info(), "settings": {"quick": args.quick, "repeat": args.repeat},
+              "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Saved: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
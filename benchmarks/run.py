@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+core_logic の処理速度とメモリ使用量を測定
+
+各エントリーポイント × 合成PDFの組み合わせごとに新しいプロセスを起動して測定するため、
+ピークメモリ（最大RSS）が他の測定の影響を受けません。
+
+Usage:
+    python -m benchmarks [--quick] [--repeat N] [--only NAME ...] [-o result.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.corpus import FULL_CORPUS, QUICK_CORPUS, ensure_corpus
+
+# リポジトリ直下の core_logic を読み込めるようにする
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+BENCH_PASSWORD = "benchmark-password"
+DEFAULT_CORPUS_DIR = Path(__file__).resolve().parent / "_corpus"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    このプロセスの最大RSS（MB）を取得
+
+    Returns:
+        最大RSS（取得できない環境ではNone）
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windowsの場合はpsutilがあればそれを使う
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト単位、macOSはバイト単位
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近傍順位法でパーセンタイルを求める"""
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def _run_lock_pdf_bytes(path: Path, work_dir: Path) -> Callable[[], bool]:
+    import core_logic
+    data = path.read_bytes()
+    return lambda: core_logic.lock_pdf_bytes(data, BENCH_PASSWORD)[0]
+
+
+def _run_lock_pdf_bytes_no_deduplicate(path: Path, work_dir: Path) -> Callable[[], bool]:
+    """同じ内容のオブジェクトをまとめない場合との比較用"""
+    import core_logic
+    data = path.read_bytes()
+    return lambda: core_logic.lock_pdf_bytes(data, BENCH_PASSWORD, deduplicate=False)[0]
+
+
+def _run_add_page_loop(path: Path, work_dir: Path) -> Callable[[], bool]:
+    """以前の方法（ページを1枚ずつ追加）との比較用"""
+    import io
+    from pypdf import PdfReader, PdfWriter
+    data = path.read_bytes()
+
+    def run() -> bool:
+        reader = PdfReader(io.BytesIO(data))
+        writer = PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        if reader.metadata:
+            writer.add_metadata(reader.metadata)
+        writer.encrypt(user_password=BENCH_PASSWORD, owner_password=BENCH_PASSWORD, algorithm="AES-256")
+        writer.write(io.BytesIO())
+        return True
+    return run
+
+
+def _run_lock_pdf_file(path: Path, work_dir: Path) -> Callable[[], bool]:
+    import core_logic
+    output = str(work_dir / "out.pdf")
+    return lambda: core_logic.lock_pdf_file(str(path), output, BENCH_PASSWORD)[0]
+
+
+def _run_lock_pdf_file_streaming(path: Path, work_dir: Path) -> Callable[[], bool]:
+    import core_logic
+    output = str(work_dir / "out.pdf")
+    return lambda: core_logic.lock_pdf_file(str(path), output, BENCH_PASSWORD, streaming=True)[0]
+
+
+def _run_lock_pdf_file_parallel(path: Path, work_dir: Path) -> Callable[[], bool]:
+    import core_logic
+    output = str(work_dir / "out.pdf")
+    workers = core_logic.default_worker_count()
+    return lambda: core_logic.lock_pdf_file(str(path), output, BENCH_PASSWORD, parallel=workers)[0]
+
+
+def _run_process_file(path: Path, work_dir: Path) -> Callable[[], bool]:
+    import core_logic
+    return lambda: core_logic.process_file(str(path), BENCH_PASSWORD, output_dir=str(work_dir)).success
+
+
+# 測定するエントリーポイント（名前: 測定用の関数を作る関数）
+ENTRY_POINTS: Dict[str, Callable[[Path, Path], Callable[[], bool]]] = {
+    "lock_pdf_bytes": _run_lock_pdf_bytes,
+    "lock_pdf_bytes_no_deduplicate": _run_lock_pdf_bytes_no_deduplicate,
+    "add_page_loop": _run_add_page_loop,
+    "lock_pdf_file": _run_lock_pdf_file,
+    "lock_pdf_file_streaming": _run_lock_pdf_file_streaming,
+    "lock_pdf_file_parallel": _run_lock_pdf_file_parallel,
+    "process_file": _run_process_file,
+}
+
+
+def _measure(entry_point: str, path: str, repeat: int) -> dict:
+    """
+    1つのエントリーポイントを1つのPDFで繰り返し測定（子プロセスで実行）
+
+    Returns:
+        測定結果の辞書
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        run = ENTRY_POINTS[entry_point](Path(path), Path(work_dir))
+        baseline = peak_rss_mb()
+
+        # 初回はインポートやキャッシュの影響を受けるので測定から外す
+        run()
+
+        latencies = []
+        failures = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if not run():
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    return {"latencies": latencies, "failures": failures, "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}
+
+
+def summarize(measurement: dict, file_size: int) -> dict:
+    """
+    測定結果を集計
+
+    Args:
+        measurement: _measure の戻り値
+        file_size: 入力ファイルのサイズ（バイト）
+
+    Returns:
+        スループット・レイテンシ・メモリの集計結果
+    """
+    latencies = measurement["latencies"]
+    total = sum(latencies)
+    count = len(latencies)
+
+    def rounded(value):
+        return None if value is None else round(value, 3)
+
+    return {
+        "runs": count,
+        "failures": measurement["failures"],
+        "input_mb": rounded(file_size / (1024 * 1024)),
+        "files_per_s": rounded(count / total if total else 0.0),
+        "mb_per_s": rounded(file_size * count / (1024 * 1024) / total if total else 0.0),
+        "latency_p50_ms": rounded(percentile(latencies, 50) * 1000),
+        "latency_p95_ms": rounded(percentile(latencies, 95) * 1000),
+        "baseline_rss_mb": rounded(measurement["baseline_rss_mb"]),
+        "peak_rss_mb": rounded(measurement["peak_rss_mb"]),
+    }
+
+
+def run_benchmarks(corpus: Dict[str, Path], entry_points: List[str], repeat: int) -> dict:
+    """
+    すべての組み合わせを測定
+
+    Args:
+        corpus: {名前: 合成PDFのパス}
+        entry_points: 測定するエントリーポイント名のリスト
+        repeat: 各組み合わせの繰り返し回数
+
+    Returns:
+        {エントリーポイント: {合成PDF名: 集計結果}}
+    """
+    results: Dict[str, Dict[str, dict]] = {}
+    context = get_context("spawn")
+    for entry_point in entry_points:
+        results[entry_point] = {}
+        for name, path in corpus.items():
+            print(f"  {entry_point} / {name} ...", end=" ", flush=True)
+            # 組み合わせごとに新しいプロセスで測定（最大RSSを正しく取るため）
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                measurement = executor.submit(_measure, entry_point, str(path), repeat).result()
+            summary = summarize(measurement, path.stat().st_size)
+            results[entry_point][name] = summary
+            print(f"p50={summary['latency_p50_ms']}ms peak_rss={summary['peak_rss_mb']}MB")
+    return results
+
+
+def environment_info() -> dict:
+    """測定環境の情報"""
+    try:
+        import pypdf
+        pypdf_version = pypdf.__version__
+    except ImportError:
+        pypdf_version = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pypdf": pypdf_version,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="core_logic の処理速度とメモリ使用量を測定します")
+    parser.add_argument("--quick", action="store_true", help="小さめの合成PDFで手早く測定")
+    parser.add_argument("--repeat", type=int, default=5, help="各組み合わせの繰り返し回数")
+    parser.add_argument("--only", nargs="+", choices=sorted(ENTRY_POINTS), help="測定するエントリーポイント")
+    parser.add_argument("--corpus-dir", type=Path, default=DEFAULT_CORPUS_DIR, help="合成PDFの保存先")
+    parser.add_argument("-o", "--output", type=Path, help="結果を保存するJSONファイル")
+    args = parser.parse_args(argv)
+
+    specs = QUICK_CORPUS if args.quick else FULL_CORPUS
+    corpus = ensure_corpus(args.corpus_dir / ("quick" if args.quick else "full"), specs)
+
+    entry_points = args.only or list(ENTRY_POINTS)
+    print(f"Running {len(entry_points)} entry points x {len(corpus)} files (repeat={args.repeat})")
+    report = {
+        "environment": environment_info(),
+        "settings": {"quick": args.quick, "repeat": args.repeat},
+        "results": run_benchmarks(corpus, entry_points, args.repeat),
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+        print(f"Saved: {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
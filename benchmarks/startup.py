@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+デスクトップ版の起動時間（最初のウィンドウが表示されるまで）を測定
+
+デスクトップ版を環境変数 PDF_LOCKER_STARTUP_PROBE を付けて繰り返し起動し、
+ウィンドウが表示されるまでの時間（window）と、共通ロジックをバックグラウンドで
+読み込み終えるまでの時間（ready）を測ります。起動した画面は読み込みが終わると自動で閉じます。
+
+PyInstallerで作ったEXEも --exe で指定すれば同じように測定できます
+（--onefile の場合は展開の時間も含まれます）。画面を表示できる環境で実行してください。
+
+Usage:
+    python -m benchmarks.startup [--runs 10] [--exe dist/PDF_Locker.exe] [-o result.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks.run import PROJECT_ROOT, environment_info, percentile
+
+# 1回の起動を待つ上限（秒）
+STARTUP_TIMEOUT = 60.0
+
+
+def measure_startup(command: List[str]) -> dict:
+    """
+    1回起動して、ウィンドウの表示と読み込み完了までの時間を測る
+
+    Args:
+        command: 起動するコマンド
+
+    Returns:
+        {"window": 秒, "ready": 秒}（記録されなかったものは含まない）
+    """
+    fd, probe_path = tempfile.mkstemp(prefix="pdf_locker_startup_", suffix=".txt")
+    os.close(fd)
+    try:
+        env = dict(os.environ, PDF_LOCKER_STARTUP_PROBE=probe_path)
+        started = time.time()
+        process = subprocess.Popen(command, cwd=str(PROJECT_ROOT), env=env)
+        try:
+            process.wait(timeout=STARTUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+        times = {}
+        for line in Path(probe_path).read_text(encoding="utf-8").splitlines():
+            event, timestamp = line.split()
+            times[event] = float(timestamp) - started
+        return times
+    finally:
+        os.remove(probe_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="デスクトップ版の起動時間を測定します")
+    parser.add_argument("--runs", type=int, default=10, help="起動する回数")
+    parser.add_argument("--exe", type=Path, help="測定するEXE（省略時は python pdf_locker.py）")
+    parser.add_argument("-o", "--output", type=Path, help="結果を保存するJSONファイル")
+    args = parser.parse_args(argv)
+
+    command = [str(args.exe)] if args.exe else [sys.executable, str(PROJECT_ROOT / "pdf_locker.py")]
+
+    samples = {"window": [], "ready": []}
+    for i in range(args.runs):
+        times = measure_startup(command)
+        if "window" not in times:
+            print("ウィンドウが表示されませんでした（画面を表示できる環境で実行してください）", file=sys.stderr)
+            return 1
+        for event in samples:
+            if event in times:
+                samples[event].append(times[event])
+        print(f"  run {i + 1}: window {times['window'] * 1000:.0f}ms, "
+              f"ready {times.get('ready', float('nan')) * 1000:.0f}ms")
+
+    results = {
+        event: {
+            "runs": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "max_ms": round(max(values) * 1000, 1),
+        }
+        for event, values in samples.items() if values
+    }
+    for event, summary in results.items():
+        print(f"{event}: p50 {summary['p50_ms']}ms, p95 {summary['p95_ms']}ms")
+
+    report = {"environment": environment_info(), "command": command, "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Saved: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,12 @@ PyInstallerを使用してexeファイルを生成します。
 Usage:
     python build.py          # specファイルを使用してビルド
     python build.py --simple # シンプルなコマンドでビルド
+    python build.py --simple --onedir  # 起動の速いフォルダ形式でビルド
     python build.py --clean  # ビルド成果物をクリーンアップ
+
+--onefile（既定）のEXEは起動のたびに一時フォルダへ全体を展開するため、
+古いPCでは最初の画面が出るまで数秒かかります。--onedir では展開が不要になり、
+dist/PDF_Locker フォルダごと配布します（起動時間は python -m benchmarks.startup --exe で測定）。
 """
 
 import subprocess
@@ -77,12 +82,17 @@ def build_with_spec():
     return result.returncode == 0
 
 
-def build_simple():
-    """シンプルなコマンドでビルド"""
+def build_simple(onedir: bool = False):
+    """
+    シンプルなコマンドでビルド
+
+    Args:
+        onedir: Trueの場合は1つのEXEにまとめずフォルダ形式で出力（起動時の展開が不要）
+    """
     print("Building with simple command...")
     cmd = [
         sys.executable, "-m", "PyInstaller",
-        "--onefile",
+        "--onedir" if onedir else "--onefile",
         "--windowed",
         "--name", "PDF_Locker",
         "--clean",
@@ -123,7 +133,7 @@ def main():
     # ビルド
     try:
         if "--simple" in sys.argv:
-            success = build_simple()
+            success = build_simple(onedir="--onedir" in sys.argv)
         else:
             success = build_with_spec()
 
@@ -9,42 +9,134 @@ GUIアプリ（Tkinter）とWebアプリ（Streamlit）の両方で使用され
 - PDFへのパスワード設定（AES-256暗号化）
 - Office文書（Word/Excel/PowerPoint）からPDFへの変換
 - ファイル処理のユーティリティ
+- 複数ファイルの並列処理（プロセスプール）
 """
 
+import io
 import os
+import re
+import csv
+import json
+import logging
+import argparse
+import zipfile
+import hashlib
+import uuid
 import sys
 import tempfile
 import shutil
+import stat
+import mmap
+import time
+import queue
+import threading
+import socket
+import subprocess
+import contextlib
+import collections
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.managers import BaseManager
+from multiprocessing.util import Finalize
 from pathlib import Path
-from typing import Tuple, Optional, List, BinaryIO
-from dataclasses import dataclass
-
-# pypdfのインポート
-try:
-    from pypdf import PdfReader, PdfWriter
-    from pypdf.errors import PdfReadError
-    PYPDF_AVAILABLE = True
-except ImportError:
-    PYPDF_AVAILABLE = False
-    PdfReadError = Exception  # フォールバック
-
-# Office文書変換用ライブラリ
-# docx2pdf（Word用）
-try:
-    from docx2pdf import convert as docx2pdf_convert
-    DOCX2PDF_AVAILABLE = True
-except ImportError:
-    DOCX2PDF_AVAILABLE = False
-
-# comtypes（Excel/PowerPoint用・Windows専用）
-if sys.platform == "win32":
+from typing import Tuple, Optional, List, BinaryIO, Iterable, Iterator, Dict, Callable
+from dataclasses import dataclass, field, asdict, replace
+
+logger = logging.getLogger("pdf_locker.core")
+
+# pypdfは読み込みに時間がかかるため（暗号化ライブラリも一緒に読み込まれる）、このモジュールの
+# インポート時ではなく最初に使うときに読み込む（_load_pypdf）。ワーカープロセスの起動や
+# 画面の表示を待たせないため。PYPDF_AVAILABLE などは外から参照されたときに調べる（__getattr__）
+_pypdf_loaded = False
+_pypdf_lock = threading.Lock()
+
+
+def _load_pypdf() -> bool:
+    """
+    pypdfを読み込み、PdfReader などをこのモジュールの名前として使えるようにする（2回目以降は何もしない）
+
+    pypdfを使う関数は、最初にこれを呼んでください。
+
+    Returns:
+        pypdfが利用できる場合True（PYPDF_AVAILABLE）
+    """
+    global _pypdf_loaded, PYPDF_AVAILABLE, STREAMING_AVAILABLE
+    global PdfReader, PdfWriter, PdfReadError, AlgV5, Encryption, EncryptAlgorithm, aes_cbc_encrypt
+    global ArrayObject, ByteStringObject, DictionaryObject, IndirectObject, NameObject, NumberObject, StreamObject
+    if _pypdf_loaded:
+        return PYPDF_AVAILABLE
+    with _pypdf_lock:
+        if _pypdf_loaded:
+            return PYPDF_AVAILABLE
+
+        try:
+            from pypdf import PdfReader, PdfWriter
+            from pypdf.errors import PdfReadError
+            PYPDF_AVAILABLE = True
+        except ImportError:
+            PYPDF_AVAILABLE = False
+            PdfReadError = Exception  # フォールバック
+
+        # ストリーミング暗号化用（pypdfの暗号化モジュールを直接使用）
+        try:
+            from pypdf._encryption import AlgV5, Encryption, EncryptAlgorithm, aes_cbc_encrypt
+            from pypdf.generic import (
+                ArrayObject,
+                ByteStringObject,
+                DictionaryObject,
+                IndirectObject,
+                NameObject,
+                NumberObject,
+                StreamObject,
+            )
+            # 名前があっても中身が変わっている場合は使わない（公開の PdfWriter.encrypt で暗号化する）
+            STREAMING_AVAILABLE = PYPDF_AVAILABLE and _private_api_usable()
+        except ImportError:
+            STREAMING_AVAILABLE = False
+
+        if not STREAMING_AVAILABLE and PYPDF_AVAILABLE:
+            logger.warning("pypdf private encryption API is not usable; falling back to PdfWriter.encrypt")
+        _pypdf_loaded = True
+        return PYPDF_AVAILABLE
+
+
+def _private_api_usable() -> bool:
+    """
+    鍵の使い回し・ストリーミング暗号化で使うpypdfの内部の機能がそろっているか確かめる
+
+    pypdf 4.0〜6.x で確認済みです（requirements.txt の範囲）。内部の機能は予告なく変わることがあるため、
+    足りない場合は STREAMING_AVAILABLE をFalseにして、公開の PdfWriter.encrypt だけを使います。
+
+    Returns:
+        使える場合True
+    """
     try:
-        import comtypes.client
-        COMTYPES_AVAILABLE = True
-    except ImportError:
-        COMTYPES_AVAILABLE = False
-else:
-    COMTYPES_AVAILABLE = False
+        encryption = Encryption.make(EncryptAlgorithm.AES_256, _ALL_PERMISSIONS, b"")
+        encryption._encode_password("")
+        required = (
+            (AlgV5, ("calculate_hash", "compute_Perms_value")),
+            (encryption, ("write_entry", "encrypt_object", "values", "Length", "P", "R", "V", "StmF", "EncryptMetadata")),
+            (PdfWriter, ("_add_object", "generate_file_identifiers")),
+        )
+        return all(hasattr(target, name) for target, names in required for name in names)
+    except Exception:
+        return False
+
+
+def __getattr__(name: str):
+    """依存ライブラリの有無（PYPDF_AVAILABLE など）を、最初に参照されたときに調べる（PEP 562）"""
+    if name in ("PYPDF_AVAILABLE", "STREAMING_AVAILABLE"):
+        _load_pypdf()
+        return globals()[name]
+    if name == "DOCX2PDF_AVAILABLE":
+        return _load_office_libraries()[0] is not None
+    if name == "COMTYPES_AVAILABLE":
+        return _load_office_libraries()[1] is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Office文書変換用ライブラリ（docx2pdf・comtypes）は読み込みに時間がかかり、
+# 変換用ワーカープロセスでしか使わないため、最初に使うときに読み込む（_load_office_libraries）
 
 
 # 対応ファイル拡張子
@@ -52,6 +144,65 @@ SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.xlsx', '.pptx'}
 PDF_EXTENSION = '.pdf'
 OFFICE_EXTENSIONS = {'.docx', '.xlsx', '.pptx'}
 
+# 暗号化辞書の /P（pypdfのPdfWriter.encryptの既定値と同じ: すべての操作を許可）
+_ALL_PERMISSIONS = -4
+
+
+# 処理段階の名前（StageStatsのキー）
+STAGE_READ = "read"            # 入力の読み込みとPDFの解析
+STAGE_CONVERT = "convert"      # Office文書からPDFへの変換
+STAGE_COPY_PAGES = "copy_pages"  # 文書（ページ・しおり・メタデータなど）のコピー
+STAGE_ENCRYPT = "encrypt"      # 鍵の生成とオブジェクトの暗号化
+STAGE_WRITE = "write"          # 暗号化したPDFの書き出し
+
+
+@dataclass
+class StageStats:
+    """
+    処理段階ごとの所要時間（秒）とバイト数
+
+    pypdfのPdfWriterはオブジェクトの暗号化を書き出しと同時に行うため、
+    通常の処理では encrypt は鍵の生成のみ、write に暗号化の時間が含まれます。
+    ストリーミング処理ではオブジェクトの暗号化も encrypt に計上されます。
+    """
+    durations: Dict[str, float] = field(default_factory=dict)
+    byte_counts: Dict[str, int] = field(default_factory=dict)
+
+    @contextlib.contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """with文の中の処理時間を指定した段階に加算する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def add_bytes(self, stage: str, count: int) -> None:
+        self.byte_counts[stage] = self.byte_counts.get(stage, 0) + count
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.durations.values())
+
+    def to_dict(self) -> dict:
+        """ログやJSON出力用の辞書に変換"""
+        data = asdict(self)
+        data["total_seconds"] = self.total_seconds
+        return data
+
+    def summary(self) -> str:
+        """1行の要約（例: "read=0.12s(1.5MB) encrypt=0.30s ..."）"""
+        parts = []
+        for stage, seconds in self.durations.items():
+            text = f"{stage}={seconds:.2f}s"
+            if stage in self.byte_counts:
+                text += f"({self.byte_counts[stage] / (1024 * 1024):.1f}MB)"
+            parts.append(text)
+        return " ".join(parts)
+
 
 @dataclass
 class ProcessResult:
@@ -60,6 +211,157 @@ class ProcessResult:
     output_path: Optional[str] = None
     error_message: str = ""
     original_filename: str = ""
+    input_path: str = ""
+    stats: Optional[StageStats] = None
+    timed_out: bool = False     # 制限時間を過ぎたため中止した
+    cancelled: bool = False     # 取り消されたため中止した
+    input_sha256: Optional[str] = None  # 入力ファイルのSHA-256（hash_input=True で成功した場合のみ）
+
+
+# 処理段階ごとの記録を受け取るコールバック（ファイル名, 記録）
+StatsCallback = Callable[[str, StageStats], None]
+
+
+# 進み具合を知らせる間隔（秒）：画面の更新で処理が遅くならないよう、これより細かくは知らせない
+PROGRESS_INTERVAL = 0.1
+
+# 1ファイルの進み具合を受け取るコールバック（処理段階, 書き出したバイト数, 見込みの総バイト数）
+ProgressCallback = Callable[[str, int, int], None]
+
+
+@dataclass
+class ProgressEvent:
+    """複数ファイルの処理中に届く、1ファイル分の進み具合"""
+    input_path: str
+    stage: str              # 処理段階（STAGE_READ など）
+    done_bytes: int = 0     # 書き出したバイト数
+    total_bytes: int = 0    # 見込みの総バイト数（入力ファイルのサイズ）
+
+    @property
+    def fraction(self) -> float:
+        """進み具合（0.0〜1.0）"""
+        if self.total_bytes <= 0:
+            return 0.0
+        return min(1.0, self.done_bytes / self.total_bytes)
+
+
+# 複数ファイルの進み具合を受け取るコールバック
+ProgressEventCallback = Callable[[ProgressEvent], None]
+
+
+class _ProgressThrottle:
+    """
+    進み具合のコールバックを間引く
+
+    処理段階が変わったときと終わったときはすぐに、それ以外は PROGRESS_INTERVAL ごとに1回だけ呼びます。
+    """
+
+    def __init__(self, callback: ProgressCallback, interval: float = PROGRESS_INTERVAL):
+        self._callback = callback
+        self._interval = interval
+        self._stage = None
+        self._last = 0.0
+
+    def __call__(self, stage: str, done_bytes: int, total_bytes: int) -> None:
+        now = time.monotonic()
+        if stage == self._stage and done_bytes < total_bytes and now - self._last < self._interval:
+            return
+        self._stage = stage
+        self._last = now
+        self._callback(stage, done_bytes, total_bytes)
+
+
+def _no_progress(stage: str, done_bytes: int, total_bytes: int) -> None:
+    """進み具合を知らせる先がない場合の代わり"""
+
+
+def _throttled(progress: Optional[ProgressCallback]) -> ProgressCallback:
+    """コールバックを間引く（間引き済みのものはそのまま、Noneの場合は何もしない関数を返す）"""
+    if progress is None:
+        return _no_progress
+    if isinstance(progress, _ProgressThrottle):
+        return progress
+    return _ProgressThrottle(progress)
+
+
+class _ProgressWriter:
+    """書き込んだバイト数を進み具合として知らせるラッパー（PdfWriter.write の出力先用）"""
+
+    def __init__(self, stream: BinaryIO, progress: ProgressCallback, total_bytes: int):
+        self._stream = stream
+        self._progress = progress
+        self._total_bytes = total_bytes
+        self._written = 0
+
+    def write(self, data: bytes) -> int:
+        count = self._stream.write(data)
+        self._written += len(data)
+        self._progress(STAGE_WRITE, min(self._written, self._total_bytes - 1), self._total_bytes)
+        return count
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+# 取り消された場合のメッセージ
+CANCELLED_MESSAGE = "取り消しました"
+
+
+class _Stopped(Exception):
+    """取り消し・制限時間超過で処理を打ち切った（process_file で結果に変換する）"""
+
+    def __init__(self, message: str, timed_out: bool = False):
+        super().__init__(message)
+        self.timed_out = timed_out
+
+
+class _StopCheck:
+    """
+    取り消しと制限時間を確かめる
+
+    暗号化の途中では進み具合のコールバックのたびに確かめます（_throttled で間引かれるため、
+    確かめる間隔は PROGRESS_INTERVAL 程度）。
+    """
+
+    def __init__(self, cancel_event=None, timeout: Optional[float] = None):
+        self.cancel_event = cancel_event
+        self.timeout = timeout
+        self.deadline = None
+        self.restart()
+
+    def restart(self) -> None:
+        """制限時間を今から数え直す"""
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check(self) -> None:
+        """
+        Raises:
+            _Stopped: 取り消された場合、または制限時間を過ぎた場合
+        """
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise _Stopped(CANCELLED_MESSAGE)
+        if self.expired():
+            raise _Stopped(f"{self.timeout:g}秒以内に終わらなかったため中止しました", timed_out=True)
+
+    def wrap(self, progress: Optional[ProgressCallback]) -> Optional[ProgressCallback]:
+        """進み具合のコールバックに確認を組み込む（制限も取り消しもない場合はそのまま返す）"""
+        if self.cancel_event is None and self.deadline is None:
+            return progress
+
+        def checked(stage: str, done_bytes: int, total_bytes: int) -> None:
+            # 書き終えた後の知らせでは打ち切らない（出来上がった結果を捨てないように）
+            if done_bytes < total_bytes:
+                self.check()
+            if progress is not None:
+                progress(stage, done_bytes, total_bytes)
+        return checked
 
 
 def check_dependencies() -> Tuple[bool, str]:
@@ -69,7 +371,7 @@ def check_dependencies() -> Tuple[bool, str]:
     Returns:
         (利用可能フラグ, エラーメッセージ)
     """
-    if not PYPDF_AVAILABLE:
+    if not _load_pypdf():
         return False, "pypdfライブラリが見つかりません。\npip install pypdf[crypto] を実行してください。"
     return True, ""
 
@@ -108,341 +410,3326 @@ def get_file_type_icon(file_path: str) -> str:
     return icon_map.get(ext, '📁')
 
 
-def convert_office_to_pdf(input_path: str, output_path: str) -> Tuple[bool, str]:
+# ============================================================
+# Office文書からPDFへの変換（変換バックエンドと常駐ワーカー）
+# ============================================================
+#
+# Office/LibreOfficeの起動には数秒かかるため、変換は常駐するワーカープロセスで行い、
+# 起動したアプリケーションをファイルをまたいで使い回します。
+# ワーカーは一定回数の変換ごと、または異常終了・タイムアウトの際に作り直します。
+
+# 変換1件あたりの制限時間（秒）
+DEFAULT_CONVERSION_TIMEOUT = 300.0
+# ワーカーを作り直すまでの変換回数（アプリケーションのメモリ増加対策）
+DEFAULT_MAX_CONVERSIONS = 50
+# バックエンドの制限時間を過ぎてからワーカーを強制終了するまでの猶予（秒）
+_CONVERSION_KILL_GRACE = 10.0
+
+
+class ConverterBackend:
     """
-    Office文書をPDFに変換する
+    Office文書をPDFに変換するバックエンドの共通インターフェース
 
-    Args:
-        input_path: 入力ファイルパス（.docx, .xlsx, .pptx）
-        output_path: 出力PDFパス
+    インスタンスは変換用ワーカープロセスの中で1つだけ作られ、
+    そのワーカーが終了するまで使い回されます。
+    """
+
+    name = ""
+
+    def __init__(self, timeout: float = DEFAULT_CONVERSION_TIMEOUT):
+        self.timeout = timeout
+
+    def version(self) -> str:
+        """変換結果に影響するバージョン情報（変換結果のキャッシュキーに使用）"""
+        return self.name
+
+    def start(self) -> None:
+        """ワーカー起動時の準備（アプリケーションの起動など）。失敗しても変換時に再試行される"""
+
+    def convert(self, input_path: str, output_path: str) -> Tuple[bool, str]:
+        """
+        Office文書をPDFに変換する
+
+        Args:
+            input_path: 入力ファイルパス（.docx, .xlsx, .pptx）
+            output_path: 出力PDFパス
+
+        Returns:
+            (成功フラグ, エラーメッセージ)
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """ワーカー終了時の後片付け（アプリケーションの終了など）"""
+
+
+_office_libraries = None
+
+
+def _load_office_libraries():
+    """
+    Office文書変換用ライブラリを読み込む（2回目以降は読み込み済みのものを返す）
 
     Returns:
-        (成功フラグ, エラーメッセージ)
+        (docx2pdfのconvert関数, comtypes.client)。利用できないものはNone
     """
-    file_ext = Path(input_path).suffix.lower()
+    global _office_libraries
+    if _office_libraries is None:
+        # docx2pdf（Word用）
+        try:
+            from docx2pdf import convert as docx2pdf_convert
+        except ImportError:
+            docx2pdf_convert = None
 
-    # Word文書の変換
-    if file_ext == '.docx':
-        if DOCX2PDF_AVAILABLE:
+        # comtypes（Excel/PowerPoint用・Windows専用）
+        comtypes_client = None
+        if sys.platform == "win32":
             try:
-                docx2pdf_convert(input_path, output_path)
-                return True, ""
-            except Exception as e:
-                return False, f"Word文書の変換に失敗しました: {str(e)}"
-        else:
-            return False, "Word文書の変換機能が利用できません。\ndocx2pdfライブラリをインストールしてください。"
+                import comtypes.client as comtypes_client
+            except ImportError:
+                pass
+        _office_libraries = (docx2pdf_convert, comtypes_client)
+    return _office_libraries
+
+
+class MicrosoftOfficeBackend(ConverterBackend):
+    """Microsoft Office（COM、macOSではdocx2pdf）で変換するバックエンド"""
+
+    name = "office"
+
+    # 拡張子 → COMのプログラムID
+    PROG_IDS = {
+        '.docx': 'Word.Application',
+        '.xlsx': 'Excel.Application',
+        '.pptx': 'PowerPoint.Application',
+    }
+
+    def __init__(self, timeout: float = DEFAULT_CONVERSION_TIMEOUT):
+        super().__init__(timeout)
+        self._apps: Dict[str, object] = {}
 
-    # Excel/PowerPointの変換（Windows専用）
-    elif file_ext in ['.xlsx', '.pptx']:
+    def start(self) -> None:
+        # ライブラリの読み込みを最初の変換の前に済ませておく
+        _load_office_libraries()
+
+    def _app(self, prog_id: str):
+        """起動済みのアプリケーションを返す（未起動なら起動する）"""
+        app = self._apps.get(prog_id)
+        if app is None:
+            app = _load_office_libraries()[1].CreateObject(prog_id)
+            if prog_id == 'PowerPoint.Application':
+                app.Visible = 1
+            else:
+                app.Visible = False
+                app.DisplayAlerts = False
+            self._apps[prog_id] = app
+        return app
+
+    def _discard_app(self, prog_id: str) -> None:
+        """エラーの起きたアプリケーションを終了し、次回の変換で起動し直す"""
+        app = self._apps.pop(prog_id, None)
+        if app is not None:
+            try:
+                app.Quit()
+            except Exception:
+                pass
+
+    def convert(self, input_path: str, output_path: str) -> Tuple[bool, str]:
+        file_ext = Path(input_path).suffix.lower()
+        source = str(Path(input_path).absolute())
+        target = str(Path(output_path).absolute())
+        docx2pdf_convert, comtypes_client = _load_office_libraries()
+
+        # Word文書の変換（COMが使えない環境ではdocx2pdfを使用）
+        if file_ext == '.docx' and comtypes_client is None:
+            if docx2pdf_convert is not None:
+                try:
+                    docx2pdf_convert(input_path, output_path)
+                    return True, ""
+                except Exception as e:
+                    return False, f"Word文書の変換に失敗しました: {str(e)}"
+            else:
+                return False, "Word文書の変換機能が利用できません。\ndocx2pdfライブラリをインストールしてください。"
+
+        if file_ext not in self.PROG_IDS:
+            return False, f"未対応の形式です: {file_ext}"
+
+        # Excel/PowerPointの変換（Windows専用）
         if not sys.platform == "win32":
             return False, "Excel/PowerPoint変換はWindows専用です。"
 
-        if not COMTYPES_AVAILABLE:
+        if comtypes_client is None:
             return False, "Office変換機能が利用できません。\ncomtypesライブラリをインストールしてください。"
 
+        prog_id = self.PROG_IDS[file_ext]
         try:
-            if file_ext == '.xlsx':
-                # Excel変換
-                excel = comtypes.client.CreateObject('Excel.Application')
-                excel.Visible = False
-                excel.DisplayAlerts = False
-
-                wb = excel.Workbooks.Open(str(Path(input_path).absolute()))
-                wb.ExportAsFixedFormat(0, str(Path(output_path).absolute()))
-                wb.Close(False)
-                excel.Quit()
+            app = self._app(prog_id)
+            if file_ext == '.docx':
+                doc = app.Documents.Open(source, ReadOnly=True)
+                doc.SaveAs(target, FileFormat=17)  # 17 = wdFormatPDF
+                doc.Close(False)
 
-                return True, ""
+            elif file_ext == '.xlsx':
+                wb = app.Workbooks.Open(source)
+                wb.ExportAsFixedFormat(0, target)
+                wb.Close(False)
 
             elif file_ext == '.pptx':
-                # PowerPoint変換
-                powerpoint = comtypes.client.CreateObject('PowerPoint.Application')
-                powerpoint.Visible = 1
-
-                presentation = powerpoint.Presentations.Open(str(Path(input_path).absolute()))
-                presentation.SaveAs(str(Path(output_path).absolute()), 32)  # 32 = ppSaveAsPDF
+                presentation = app.Presentations.Open(source)
+                presentation.SaveAs(target, 32)  # 32 = ppSaveAsPDF
                 presentation.Close()
-                powerpoint.Quit()
 
-                return True, ""
+            return True, ""
 
         except Exception as e:
+            self._discard_app(prog_id)
             error_msg = str(e)
-            if "Microsoft Office" in error_msg or "Excel" in error_msg or "PowerPoint" in error_msg:
+            if "Microsoft Office" in error_msg or "Word" in error_msg or "Excel" in error_msg or "PowerPoint" in error_msg:
                 return False, f"{file_ext}の変換に失敗しました。\nMicrosoft Officeがインストールされているか確認してください。"
             return False, f"{file_ext}の変換に失敗しました: {error_msg}"
 
-    return False, f"未対応の形式です: {file_ext}"
+    def close(self) -> None:
+        for prog_id in list(self._apps):
+            self._discard_app(prog_id)
 
 
-def validate_password(password: str) -> Tuple[bool, str]:
+def find_soffice() -> Optional[str]:
     """
-    パスワードのバリデーション
-
-    Args:
-        password: チェックするパスワード
+    LibreOfficeの実行ファイルを探す
 
     Returns:
-        (有効フラグ, エラーメッセージ)
+        soffice のパス（見つからない場合はNone）
     """
-    if not password:
-        return False, "パスワードを入力してください。"
+    for name in ("soffice", "libreoffice"):
+        found = shutil.which(name)
+        if found:
+            return found
+    candidates = [
+        Path("C:/Program Files/LibreOffice/program/soffice.exe"),
+        Path("C:/Program Files (x86)/LibreOffice/program/soffice.exe"),
+        Path("/Applications/LibreOffice.app/Contents/MacOS/soffice"),
+    ]
+    for candidate in candidates:
+        if candidate.exists():
+            return str(candidate)
+    return None
 
-    if len(password) < 4:
-        return False, "パスワードは4文字以上にしてください。"
-
-    return True, ""
 
+class LibreOfficeBackend(ConverterBackend):
+    """
+    LibreOffice（ヘッドレス）で変換するバックエンド（Linuxのサーバーでも使用可）
 
-def lock_pdf_bytes(pdf_bytes: bytes, password: str) -> Tuple[bool, bytes, str]:
+    ワーカーごとに専用のユーザープロファイルを作って使い回すため、
+    2件目以降はプロファイルの初期化（起動時間の大半）が省かれます。
     """
-    PDFバイトデータにパスワードを設定
 
-    Args:
-        pdf_bytes: PDFのバイトデータ
-        password: 設定するパスワード
+    name = "libreoffice"
 
-    Returns:
-        (成功フラグ, 暗号化されたPDFバイト, エラーメッセージ)
-    """
-    if not PYPDF_AVAILABLE:
-        return False, b"", "pypdfライブラリが利用できません。"
+    def __init__(self, timeout: float = DEFAULT_CONVERSION_TIMEOUT):
+        super().__init__(timeout)
+        self._soffice = find_soffice()
+        self._profile_dir: Optional[str] = None
+        self._version: Optional[str] = None
 
-    try:
-        import io
+    def _command(self, *args: str) -> List[str]:
+        if self._profile_dir is None:
+            self._profile_dir = tempfile.mkdtemp(prefix="pdf_locker_lo_")
+        profile = Path(self._profile_dir).as_uri()
+        return [self._soffice, f"-env:UserInstallation={profile}", "--headless", "--norestore", *args]
 
-        # PDFを読み込む
-        reader = PdfReader(io.BytesIO(pdf_bytes))
+    def version(self) -> str:
+        if self._version is None:
+            self._version = self.name
+            if self._soffice:
+                try:
+                    completed = subprocess.run(
+                        [self._soffice, "--version"], capture_output=True, text=True, timeout=60
+                    )
+                    self._version = f"{self.name} {completed.stdout.strip()}"
+                except (OSError, subprocess.SubprocessError):
+                    pass
+        return self._version
 
-        # 既に暗号化されている場合
-        if reader.is_encrypted:
-            return False, b"", "すでに鍵がかかっています"
+    def start(self) -> None:
+        # プロファイルを作るためだけに1度起動して終了させる
+        if self._soffice:
+            subprocess.run(
+                self._command("--terminate_after_init"),
+                capture_output=True, timeout=self.timeout
+            )
+
+    def convert(self, input_path: str, output_path: str) -> Tuple[bool, str]:
+        file_ext = Path(input_path).suffix.lower()
+        if file_ext not in OFFICE_EXTENSIONS:
+            return False, f"未対応の形式です: {file_ext}"
+        if not self._soffice:
+            return False, "LibreOfficeが見つかりません。\nLibreOfficeをインストールしてください。"
+
+        out_dir = tempfile.mkdtemp(prefix="pdf_locker_lo_out_")
+        try:
+            try:
+                completed = subprocess.run(
+                    self._command("--convert-to", "pdf", "--outdir", out_dir, str(Path(input_path).absolute())),
+                    capture_output=True, text=True, timeout=self.timeout
+                )
+            except subprocess.TimeoutExpired:
+                return False, f"{file_ext}の変換が{self.timeout:.0f}秒以内に終わりませんでした。"
 
-        # 新しいPDFを作成
-        writer = PdfWriter()
+            converted = Path(out_dir) / f"{Path(input_path).stem}.pdf"
+            if completed.returncode != 0 or not converted.exists():
+                detail = (completed.stderr or completed.stdout).strip()
+                return False, f"{file_ext}の変換に失敗しました: {detail}"
 
-        # すべてのページをコピー
-        for page in reader.pages:
-            writer.add_page(page)
+            shutil.move(str(converted), output_path)
+            return True, ""
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
 
-        # メタデータをコピー
-        if reader.metadata:
-            writer.add_metadata(reader.metadata)
+    def close(self) -> None:
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+            self._profile_dir = None
 
-        # AES-256で暗号化
-        writer.encrypt(
-            user_password=password,
-            owner_password=password,
-            algorithm="AES-256"
-        )
 
-        # バイトデータとして出力
-        output = io.BytesIO()
-        writer.write(output)
-        output.seek(0)
+class FakeConverterBackend(ConverterBackend):
+    """
+    テスト用のバックエンド（Officeなしで1ページの空白PDFを作る）
 
-        return True, output.getvalue(), ""
+    入力ファイル名に "fail" を含む場合は失敗、"crash" を含む場合はワーカーを異常終了、
+    "hang" を含む場合は応答しなくなります（プールの動作確認用）。
+    環境変数 PDF_LOCKER_FAKE_CONVERTER_DELAY で1件あたりの所要時間（秒）を指定できます。
+    """
 
-    except PdfReadError:
-        return False, b"", "PDFファイルが壊れているかもしれません"
-    except Exception as e:
-        return False, b"", f"エラーが発生しました: {str(e)}"
+    name = "fake"
+
+    _BLANK_PDF = (
+        b"%PDF-1.4\n"
+        b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+        b"2 0 obj\n<< /Type /Pages /Count 1 /Kids [ 3 0 R ] >>\nendobj\n"
+        b"3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [ 0 0 612 792 ] >>\nendobj\n"
+    )
+
+    def convert(self, input_path: str, output_path: str) -> Tuple[bool, str]:
+        name = Path(input_path).name.lower()
+        time.sleep(float(os.environ.get("PDF_LOCKER_FAKE_CONVERTER_DELAY", "0")))
+        if "crash" in name:
+            os._exit(1)
+        if "hang" in name:
+            time.sleep(self.timeout + _CONVERSION_KILL_GRACE + 60)
+        if "fail" in name:
+            return False, f"{Path(input_path).suffix.lower()}の変換に失敗しました: fake"
+
+        body = self._BLANK_PDF
+        offsets = []
+        position = 0
+        for marker in (b"1 0 obj", b"2 0 obj", b"3 0 obj"):
+            position = body.index(marker, position)
+            offsets.append(position)
+        xref = b"xref\n0 4\n0000000000 65535 f\r\n" + b"".join(b"%010d 00000 n\r\n" % o for o in offsets)
+        trailer = b"trailer\n<< /Size 4 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % len(body)
+        with open(output_path, "wb") as f:
+            f.write(body + xref + trailer)
+        return True, ""
+
+
+# 利用できる変換バックエンド（名前 → クラス）
+CONVERTER_BACKENDS: Dict[str, type] = {
+    MicrosoftOfficeBackend.name: MicrosoftOfficeBackend,
+    LibreOfficeBackend.name: LibreOfficeBackend,
+    FakeConverterBackend.name: FakeConverterBackend,
+}
 
 
-def lock_pdf_file(input_path: str, output_path: str, password: str) -> Tuple[bool, str]:
+def default_converter_backend() -> str:
     """
-    PDFファイルにパスワードを設定してファイルに保存
+    既定の変換バックエンド名を取得
 
-    Args:
-        input_path: 入力PDFファイルパス
-        output_path: 出力PDFファイルパス
-        password: 設定するパスワード
+    環境変数 PDF_LOCKER_CONVERTER が設定されていればそれを使い、
+    なければWindows/macOSではMicrosoft Office、それ以外ではLibreOfficeを使います。
 
     Returns:
-        (成功フラグ, エラーメッセージ)
+        CONVERTER_BACKENDS のキー
     """
-    if not PYPDF_AVAILABLE:
-        return False, "pypdfライブラリが利用できません。"
+    name = os.environ.get("PDF_LOCKER_CONVERTER")
+    if name:
+        return name
+    if sys.platform in ("win32", "darwin"):
+        return MicrosoftOfficeBackend.name
+    return LibreOfficeBackend.name
 
-    try:
-        # PDFを読み込む
-        reader = PdfReader(input_path)
 
-        # 既に暗号化されている場合
-        if reader.is_encrypted:
-            return False, "すでに鍵がかかっています"
+def _converter_worker_main(conn, backend_name: str, timeout: float) -> None:
+    """変換用ワーカープロセスの本体（要求を受け取って変換し、結果を返す）"""
+    backend = CONVERTER_BACKENDS[backend_name](timeout=timeout)
+    try:
+        backend.start()
+    except Exception:
+        # 起動に失敗した場合も、変換時のエラーとして報告する
+        pass
 
-        # 新しいPDFを作成
-        writer = PdfWriter()
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            input_path, output_path = request
+            try:
+                result = backend.convert(input_path, output_path)
+            except Exception as e:
+                result = (False, f"{Path(input_path).suffix.lower()}の変換に失敗しました: {str(e)}")
+            conn.send(result)
+    finally:
+        backend.close()
+        conn.close()
 
-        # すべてのページをコピー
-        for page in reader.pages:
-            writer.add_page(page)
 
-        # メタデータをコピー
-        if reader.metadata:
-            writer.add_metadata(reader.metadata)
+class _ConverterWorker:
+    """変換用ワーカープロセス1つ分（親プロセス側の窓口）"""
 
-        # AES-256で暗号化
-        writer.encrypt(
-            user_password=password,
-            owner_password=password,
-            algorithm="AES-256"
+    def __init__(self, backend_name: str, timeout: float):
+        self.conversions = 0
+        self.conn, child_conn = multiprocessing.Pipe()
+        # daemonにしておくと、呼び出し元が終了したときに一緒に終了する
+        self.process = multiprocessing.Process(
+            target=_converter_worker_main,
+            args=(child_conn, backend_name, timeout),
+            name=f"pdf-locker-converter-{backend_name}",
+            daemon=True
         )
+        self.process.start()
+        child_conn.close()
 
-        # ファイルに保存
-        with open(output_path, "wb") as f:
-            writer.write(f)
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
 
-        return True, ""
+    def request(self, input_path: str, output_path: str, timeout: float) -> Optional[Tuple[bool, str]]:
+        """
+        変換を依頼して結果を待つ
 
-    except PdfReadError:
-        return False, "PDFファイルが壊れているかもしれません"
-    except PermissionError:
-        return False, "このファイルは開けません（使用中の可能性）"
-    except Exception as e:
-        return False, f"エラーが発生しました: {str(e)}"
+        Returns:
+            (成功フラグ, エラーメッセージ)。制限時間を過ぎた場合はNone
+        Raises:
+            EOFError, OSError: ワーカーが異常終了した場合
+        """
+        self.conn.send((input_path, output_path))
+        if not self.conn.poll(timeout):
+            return None
+        self.conversions += 1
+        return self.conn.recv()
 
+    def stop(self, timeout: float = 30.0) -> None:
+        """アプリケーションを終了させてからワーカーを止める"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
 
-def process_file(
-    file_path: str,
-    password: str,
-    output_dir: Optional[str] = None,
-    output_prefix: str = "鍵付き_"
-) -> ProcessResult:
-    """
-    ファイルを処理してパスワード付きPDFを作成
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
 
-    Office文書の場合は自動的にPDFに変換してからパスワードを設定します。
 
-    Args:
-        file_path: 入力ファイルパス
-        password: 設定するパスワード
-        output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じ場所）
-        output_prefix: 出力ファイル名のプレフィックス
+# 変換バックエンドのバージョン情報（バックエンド名ごとに、このプロセスで1度だけ調べる）
+# LibreOfficeでは soffice --version の起動に時間がかかるため、キャッシュを見るたびに調べ直さない
+_converter_versions: Dict[str, str] = {}
+_converter_versions_lock = threading.Lock()
 
-    Returns:
-        ProcessResult: 処理結果
+
+class ConverterPool:
     """
-    original_path = Path(file_path)
-    file_ext = original_path.suffix.lower()
+    常駐する変換用ワーカープロセスのプール
 
-    # 出力ディレクトリを決定
-    if output_dir is None:
-        output_dir = str(original_path.parent)
+    convert() は複数のスレッドから同時に呼び出せます。空いているワーカーがない場合は
+    空くまで待ちます。Word/PowerPointはCOMのインスタンスを共有するため、
+    Microsoft Officeを使う場合はワーカー数を1にしてください。
+    """
 
-    # 出力ファイルパスを生成
-    output_filename = f"{output_prefix}{original_path.stem}.pdf"
-    output_path = Path(output_dir) / output_filename
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        workers: int = 1,
+        max_conversions: int = DEFAULT_MAX_CONVERSIONS,
+        timeout: float = DEFAULT_CONVERSION_TIMEOUT
+    ):
+        """
+        Args:
+            backend: 変換バックエンド名（Noneの場合は default_converter_backend()）
+            workers: ワーカープロセス数
+            max_conversions: ワーカーを作り直すまでの変換回数
+            timeout: 変換1件あたりの制限時間（秒）
+        """
+        self.backend = backend or default_converter_backend()
+        if self.backend not in CONVERTER_BACKENDS:
+            raise ValueError(f"未対応の変換バックエンドです: {self.backend}")
+        self.workers = max(1, workers)
+        self.max_conversions = max_conversions
+        self.timeout = timeout
+        self._closed = False
+        # 空いているワーカー（Noneはまだ起動していない枠）
+        self._idle: "queue.Queue[Optional[_ConverterWorker]]" = queue.Queue()
+        for _ in range(self.workers):
+            self._idle.put(None)
 
-    temp_pdf = None
+    def version(self) -> str:
+        """変換バックエンドのバージョン情報（バックエンドごとに最初の1回だけ調べる）"""
+        with _converter_versions_lock:
+            if self.backend not in _converter_versions:
+                _converter_versions[self.backend] = CONVERTER_BACKENDS[self.backend](timeout=self.timeout).version()
+            return _converter_versions[self.backend]
 
-    try:
-        # Office文書の場合、まずPDFに変換
-        if file_ext in OFFICE_EXTENSIONS:
-            # 一時ファイルを作成
-            temp_dir = tempfile.mkdtemp()
-            temp_pdf = Path(temp_dir) / f"{original_path.stem}.pdf"
+    def warm(self) -> None:
+        """すべてのワーカーを先に起動しておく（最初の変換の待ち時間を減らす）"""
+        started = []
+        for _ in range(self.workers):
+            worker = self._idle.get()
+            if worker is None or not worker.is_alive():
+                worker = _ConverterWorker(self.backend, self.timeout)
+            started.append(worker)
+        for worker in started:
+            self._idle.put(worker)
 
-            success, error_msg = convert_office_to_pdf(file_path, str(temp_pdf))
-            if not success:
-                # 一時ディレクトリをクリーンアップ
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                return ProcessResult(
-                    success=False,
-                    error_message=error_msg,
-                    original_filename=original_path.name
-                )
+    def convert(self, input_path: str, output_path: str, timeout: Optional[float] = None) -> Tuple[bool, str]:
+        """
+        Office文書をPDFに変換する（ワーカープロセスで実行）
 
-            pdf_to_encrypt = str(temp_pdf)
-        else:
-            pdf_to_encrypt = file_path
+        制限時間を過ぎた変換は、ワーカープロセスごと強制終了します（止まったままのCOM呼び出しなど）。
 
-        # PDFにパスワードを設定
-        success, error_msg = lock_pdf_file(pdf_to_encrypt, str(output_path), password)
+        Args:
+            input_path: 入力ファイルパス（.docx, .xlsx, .pptx）
+            output_path: 出力PDFパス
+            timeout: この変換の制限時間（秒）。プールの制限時間より短い場合だけ使われます
 
-        # 一時ファイルをクリーンアップ
-        if temp_pdf and temp_pdf.parent.exists():
-            shutil.rmtree(temp_pdf.parent, ignore_errors=True)
+        Returns:
+            (成功フラグ, エラーメッセージ)
+        """
+        if self._closed:
+            return False, "変換プールは終了しています。"
 
-        if success:
-            return ProcessResult(
-                success=True,
-                output_path=str(output_path),
-                original_filename=original_path.name
-            )
+        file_ext = Path(input_path).suffix.lower()
+        if timeout is None or timeout >= self.timeout:
+            # バックエンド側の制限時間が先に効くので、少し待ってから強制終了する
+            limit, wait = self.timeout, self.timeout + _CONVERSION_KILL_GRACE
         else:
-            return ProcessResult(
-                success=False,
-                error_message=error_msg,
-                original_filename=original_path.name
-            )
+            limit, wait = timeout, timeout
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.is_alive():
+                worker = _ConverterWorker(self.backend, self.timeout)
 
-    except Exception as e:
+            try:
+                result = worker.request(input_path, output_path, wait)
+            except (EOFError, OSError):
+                worker.kill()
+                worker = None
+                return False, f"{file_ext}の変換中に変換プロセスが異常終了しました。"
+
+            if result is None:
+                worker.kill()
+                worker = None
+                return False, f"{file_ext}の変換が{limit:.0f}秒以内に終わりませんでした。"
+
+            if worker.conversions >= self.max_conversions:
+                worker.stop()
+                worker = None
+            return result
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        """すべてのワーカーを終了する"""
+        self._closed = True
+        for _ in range(self.workers):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.stop()
+        for _ in range(self.workers):
+            self._idle.put(None)
+
+
+class _ConverterManager(BaseManager):
+    """バッチ用ワーカープロセスから1つの変換プールを共有するためのマネージャー"""
+
+
+_ConverterManager.register("ConverterPool", ConverterPool)
+
+
+# このプロセスで使う変換プール（バッチ用ワーカーでは親から共有されたもの）
+_converter_pool = None
+_converter_pool_lock = threading.Lock()
+
+
+def get_converter_pool():
+    """
+    このプロセスで共有する変換プールを取得（初回に作成）
+
+    Returns:
+        ConverterPool（バッチ用ワーカーではそのプロキシ）
+    """
+    global _converter_pool
+    with _converter_pool_lock:
+        if _converter_pool is None:
+            _converter_pool = ConverterPool()
+            # プロセス終了時にOffice/LibreOfficeを終了させる
+            Finalize(_converter_pool, _converter_pool.close, exitpriority=10)
+        return _converter_pool
+
+
+# ============================================================
+# 変換結果のキャッシュ
+# ============================================================
+#
+# 同じテンプレートに別のパスワードを付け直すことが多いため、変換済みのPDFを
+# 元文書の内容（SHA-256）と変換バックエンドのバージョンをキーにして保存しておきます。
+# キャッシュのPDFには鍵がかかっていないので、既定では使わず、使う場合も本人だけが読める
+# ディレクトリに置きます。
+
+# キャッシュの既定の上限サイズ（MB）。0は無効（環境変数 PDF_LOCKER_CACHE_MAX_MB で上限を指定すると有効）
+DEFAULT_CACHE_MAX_MB = 0
+# キャッシュの保存形式のバージョン（形式を変えたら上げる）
+_CACHE_LAYOUT = "v1"
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    ファイル内容のSHA-256を求める（大きなファイルも少しずつ読み込む）
+
+    Args:
+        file_path: ファイルパス
+
+    Returns:
+        16進数のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_cache_dir() -> Path:
+    """
+    変換結果のキャッシュの既定の保存先を取得
+
+    環境変数 PDF_LOCKER_CACHE_DIR が設定されていればそれを使います。
+
+    Returns:
+        キャッシュディレクトリのパス
+    """
+    configured = os.environ.get("PDF_LOCKER_CACHE_DIR")
+    if configured:
+        return Path(configured)
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+        return base / "PDF_Locker" / "conversion_cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "PDF_Locker" / "conversion_cache"
+    base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "pdf_locker" / "conversion_cache"
+
+
+class ConversionCache:
+    """
+    変換済みPDFのディスクキャッシュ（合計サイズの上限を超えたら古いものから削除）
+
+    保存先: <directory>/v1/<キーの先頭2文字>/<キー>.pdf
+    キーはハッシュ値のみで作るため、元のファイル名はキャッシュに残りません。
+    書き込みは一時ファイルを作ってから置き換えるため、複数のプロセスから同時に使えます。
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """
+        Args:
+            directory: キャッシュディレクトリ
+            max_bytes: 合計サイズの上限（バイト）
+        """
+        self.root = Path(directory)
+        self.directory = self.root / _CACHE_LAYOUT
+        self.max_bytes = max_bytes
+
+    def _make_private_dirs(self, bucket: Path) -> None:
+        """
+        保存先のディレクトリを本人だけが使える権限で作る
+
+        途中のディレクトリ（%LOCALAPPDATA% や ~/.cache の下の PDF_Locker・conversion_cache など）も
+        新しく作るものはすべて 0700 にします。すでにあったキャッシュディレクトリも 0700 に直します。
+        """
+        missing = []
+        for path in (bucket, *bucket.parents):
+            if path.exists():
+                break
+            missing.append(path)
+        for path in reversed(missing):
+            with contextlib.suppress(FileExistsError):
+                path.mkdir(mode=0o700)
+        if sys.platform == "win32":
+            # Windowsでは %LOCALAPPDATA% のアクセス権（本人のみ）がそのまま使われる
+            return
+        for path in (self.root, self.directory):
+            if stat.S_IMODE(path.stat().st_mode) & 0o077:
+                os.chmod(path, 0o700)
+
+    @staticmethod
+    def make_key(source_hash: str, file_ext: str, converter_version: str) -> str:
+        """
+        キャッシュキーを作る
+
+        Args:
+            source_hash: 元文書のSHA-256
+            file_ext: 元文書の拡張子
+            converter_version: 変換バックエンドのバージョン情報
+
+        Returns:
+            キー（16進数のSHA-256）
+        """
+        material = f"{converter_version}\n{file_ext.lower()}\n{source_hash}"
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str, output_path: str) -> bool:
+        """
+        キャッシュにあれば出力先にコピーする
+
+        Returns:
+            キャッシュにあった場合True
+        """
+        cached = self._path(key)
+        try:
+            shutil.copyfile(cached, output_path)
+            # 最終使用日時として更新時刻を使う（削除の順番に使用）
+            os.utime(cached)
+        except OSError:
+            return False
+        return True
+
+    def put(self, key: str, pdf_path: str) -> None:
+        """変換したPDFをキャッシュに保存する（失敗しても変換処理には影響させない）"""
+        cached = self._path(key)
+        try:
+            if Path(pdf_path).stat().st_size > self.max_bytes:
+                return
+            self._make_private_dirs(cached.parent)
+            fd, temp_path = tempfile.mkstemp(dir=str(cached.parent), suffix=".part")
+            try:
+                with os.fdopen(fd, 'wb') as out, open(pdf_path, 'rb') as src:
+                    shutil.copyfileobj(src, out)
+                os.replace(temp_path, cached)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                raise
+            self.evict()
+        except OSError:
+            pass
+
+    def _entries(self) -> List[Tuple[str, os.stat_result]]:
+        entries = []
+        if not self.directory.is_dir():
+            return entries
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".pdf"):
+                    try:
+                        entries.append((entry.path, entry.stat()))
+                    except OSError:
+                        pass
+        return entries
+
+    def size(self) -> int:
+        """キャッシュの合計サイズ（バイト）"""
+        return sum(st.st_size for _, st in self._entries())
+
+    def evict(self) -> None:
+        """合計サイズが上限を超えていれば、最後に使ってから長いものから削除する"""
+        entries = self._entries()
+        total = sum(st.st_size for _, st in entries)
+        for path, st in sorted(entries, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                total -= st.st_size
+
+    def clear(self) -> None:
+        """キャッシュをすべて削除する"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+_conversion_cache: Optional[ConversionCache] = None
+_conversion_cache_loaded = False
+
+
+def get_conversion_cache() -> Optional[ConversionCache]:
+    """
+    変換結果のキャッシュを取得（既定では無効。環境変数 PDF_LOCKER_CACHE_MAX_MB に上限を指定した場合のみ使う）
+
+    Returns:
+        ConversionCache（無効な場合はNone）
+    """
+    global _conversion_cache, _conversion_cache_loaded
+    if not _conversion_cache_loaded:
+        _conversion_cache_loaded = True
+        max_mb = float(os.environ.get("PDF_LOCKER_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB))
+        if max_mb > 0:
+            _conversion_cache = ConversionCache(default_cache_dir(), int(max_mb * 1024 * 1024))
+    return _conversion_cache
+
+
+def convert_office_to_pdf(
+    input_path: str,
+    output_path: str,
+    use_cache: bool = True,
+    timeout: Optional[float] = None
+) -> Tuple[bool, str]:
+    """
+    Office文書をPDFに変換する
+
+    変換は常駐する変換用ワーカープロセスで行います（get_converter_pool）。
+    同じ内容の文書を変換したことがあれば、キャッシュの結果を使います。
+
+    Args:
+        input_path: 入力ファイルパス（.docx, .xlsx, .pptx）
+        output_path: 出力PDFパス
+        use_cache: Falseの場合は変換結果のキャッシュを使わない
+        timeout: 変換の制限時間（秒）。Noneの場合は変換プールの制限時間（DEFAULT_CONVERSION_TIMEOUT）
+
+    Returns:
+        (成功フラグ, エラーメッセージ)
+    """
+    file_ext = Path(input_path).suffix.lower()
+    if file_ext not in OFFICE_EXTENSIONS:
+        return False, f"未対応の形式です: {file_ext}"
+
+    pool = get_converter_pool()
+    cache = get_conversion_cache() if use_cache else None
+    key = None
+    if cache is not None:
+        try:
+            key = cache.make_key(file_sha256(input_path), file_ext, pool.version())
+        except OSError as e:
+            return False, f"ファイルを読み込めませんでした: {str(e)}"
+        if cache.get(key, output_path):
+            return True, ""
+
+    success, error_msg = pool.convert(input_path, output_path, timeout)
+    if success and key is not None:
+        cache.put(key, output_path)
+    return success, error_msg
+
+
+def validate_password(password: str) -> Tuple[bool, str]:
+    """
+    パスワードのバリデーション
+
+    Args:
+        password: チェックするパスワード
+
+    Returns:
+        (有効フラグ, エラーメッセージ)
+    """
+    if not password:
+        return False, "パスワードを入力してください。"
+
+    if len(password) < 4:
+        return False, "パスワードは4文字以上にしてください。"
+
+    return True, ""
+
+
+# 事前確認で読む範囲（バイト）
+_PRESCAN_HEAD_BYTES = 1024   # ヘッダー（%PDF-）はこの範囲になければならない（PDFの仕様）
+_PRESCAN_TAIL_BYTES = 4096   # 末尾のトレーラーと startxref を探す範囲
+# トレーラーの /Encrypt（参照または辞書が続くものだけ。文字列中の語句は対象外）
+_TRAILER_ENCRYPT = re.compile(rb"/Encrypt\s*(?:\d+\s+\d+\s+R|<<)")
+_STARTXREF_OFFSET = re.compile(rb"startxref\s*(\d+)")
+
+
+def prescan_pdf(source: BinaryIO) -> Tuple[bool, str]:
+    """
+    ファイルの先頭と末尾だけを読んで、明らかに処理できないPDFを見分ける
+
+    PdfReaderで文書全体を解析する前に、空のファイル・PDFではないファイル・
+    すでに鍵がかかっているPDF（最新のトレーラーに /Encrypt がある）を数マイクロ秒で見分けます。
+    判断できない場合は続けてよいとみなします（通常の読み込みで確かめます）。
+
+    Args:
+        source: 入力PDF（シーク可能なファイルオブジェクトまたはmmap。位置は元に戻す）
+
+    Returns:
+        (処理を続けてよいか, 続けられない場合のエラーメッセージ)
+    """
+    position = source.tell()
+    try:
+        # mmap.seek は新しい位置を返さない（Python 3.13より前）ので tell() で求める
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        if size == 0:
+            return False, "PDFファイルが壊れているかもしれません"
+
+        source.seek(0)
+        if b"%PDF-" not in source.read(_PRESCAN_HEAD_BYTES):
+            return False, "PDFファイルではないか、壊れているかもしれません"
+
+        tail_start = max(0, size - _PRESCAN_TAIL_BYTES)
+        source.seek(tail_start)
+        tail = source.read(_PRESCAN_TAIL_BYTES)
+
+        startxref = tail.rfind(b"startxref")
+        if startxref < 0:
+            return True, ""
+
+        # 最新の版のトレーラー（1つ前の %%EOF より後にあるもの）
+        revision_start = tail.rfind(b"%%EOF", 0, startxref) + 1
+        trailer = tail.rfind(b"trailer", revision_start, startxref)
+        if trailer >= 0:
+            dictionary = tail[trailer:startxref]
+        else:
+            # 相互参照ストリームの場合はトレーラーの代わりにストリームの辞書を読む
+            match = _STARTXREF_OFFSET.match(tail, startxref)
+            if match is None or int(match.group(1)) >= size:
+                return True, ""
+            source.seek(int(match.group(1)))
+            dictionary = source.read(_PRESCAN_TAIL_BYTES).split(b"stream", 1)[0]
+
+        if _TRAILER_ENCRYPT.search(dictionary):
+            return False, "すでに鍵がかかっています"
+        return True, ""
+    finally:
+        source.seek(position)
+
+
+def prescan_pdf_file(file_path: str) -> Tuple[bool, str]:
+    """
+    prescan_pdf のファイルパス版（開けない場合は続けてよいとみなし、通常の処理でエラーにする）
+    """
+    try:
+        with open(file_path, "rb") as f:
+            return prescan_pdf(f)
+    except OSError:
+        return True, ""
+
+
+# AES-256（R6）の /U /O の検証用・鍵用のソルトの長さ
+_SALT_LENGTH = 8
+
+
+@dataclass(frozen=True)
+class PasswordKeys:
+    """
+    パスワードから導出したAES-256（R6）の鍵情報
+
+    AES-256ではパスワードから鍵を導出する計算（ハッシュの繰り返し）に
+    1ファイルあたり数ミリ秒かかります。同じパスワードで多数のファイルに鍵をかける場合は
+    derive_password_keys で1度だけ導出し、各ファイルの処理に渡して使い回します。
+
+    ファイルの暗号化に使う鍵（ファイル鍵）はファイルごとに新しく作り、
+    /UE /OE /Perms もファイルごとに計算します。使い回すのは /U /O とソルトだけです
+    （そのため、同じバッチのファイルは同じパスワードであることが分かります）。
+    """
+    u_value: bytes    # /U（ハッシュ + 検証用ソルト + 鍵用ソルト）
+    o_value: bytes    # /O
+    user_key: bytes   # /UE を作るための鍵
+    owner_key: bytes  # /OE を作るための鍵
+
+    def make_encryption(self, first_id: bytes) -> Tuple["Encryption", "DictionaryObject"]:
+        """
+        新しいファイル鍵でEncryptionと暗号化辞書を作成
+
+        Args:
+            first_id: ファイル識別子の1つ目
+
+        Returns:
+            (Encryption, 暗号化辞書)
+        """
+        encryption = Encryption.make(EncryptAlgorithm.AES_256, _ALL_PERMISSIONS, first_id)
+        file_key = os.urandom(encryption.Length // 8)
+        zero_iv = bytes(16)
+        encryption._key = file_key
+        encryption.values.U = self.u_value
+        encryption.values.O = self.o_value
+        encryption.values.UE = aes_cbc_encrypt(self.user_key, zero_iv, file_key)
+        encryption.values.OE = aes_cbc_encrypt(self.owner_key, zero_iv, file_key)
+        encryption.values.Perms = AlgV5.compute_Perms_value(file_key, encryption.P, encryption.EncryptMetadata)
+
+        # Encryption.write_entry と同じ内容の暗号化辞書
+        std_cf = DictionaryObject()
+        std_cf[NameObject("/AuthEvent")] = NameObject("/DocOpen")
+        std_cf[NameObject("/CFM")] = NameObject(encryption.StmF)
+        std_cf[NameObject("/Length")] = NumberObject(encryption.Length // 8)
+        cf = DictionaryObject()
+        cf[NameObject("/StdCF")] = std_cf
+
+        entry = DictionaryObject()
+        entry[NameObject("/V")] = NumberObject(encryption.V)
+        entry[NameObject("/R")] = NumberObject(encryption.R)
+        entry[NameObject("/Length")] = NumberObject(encryption.Length)
+        entry[NameObject("/P")] = NumberObject(encryption.P)
+        entry[NameObject("/Filter")] = NameObject("/Standard")
+        entry[NameObject("/O")] = ByteStringObject(encryption.values.O)
+        entry[NameObject("/U")] = ByteStringObject(encryption.values.U)
+        entry[NameObject("/CF")] = cf
+        entry[NameObject("/StmF")] = NameObject("/StdCF")
+        entry[NameObject("/StrF")] = NameObject("/StdCF")
+        entry[NameObject("/OE")] = ByteStringObject(encryption.values.OE)
+        entry[NameObject("/UE")] = ByteStringObject(encryption.values.UE)
+        entry[NameObject("/Perms")] = ByteStringObject(encryption.values.Perms)
+        return encryption, entry
+
+
+def derive_password_keys(password: str) -> Optional[PasswordKeys]:
+    """
+    パスワードからAES-256の鍵情報を導出（バッチの最初に1度だけ呼ぶ）
+
+    Args:
+        password: 設定するパスワード
+
+    Returns:
+        PasswordKeys（pypdfの暗号化モジュールを直接使えない場合はNone。各ファイルで導出します）
+    """
+    _load_pypdf()
+    if not STREAMING_AVAILABLE:
+        return None
+    encryption = Encryption.make(EncryptAlgorithm.AES_256, _ALL_PERMISSIONS, b"")
+    encoded = encryption._encode_password(password)[:127]
+    salts = os.urandom(_SALT_LENGTH * 4)
+    user_check, user_salt, owner_check, owner_salt = (
+        salts[i:i + _SALT_LENGTH] for i in range(0, len(salts), _SALT_LENGTH)
+    )
+    u_value = AlgV5.calculate_hash(encryption.R, encoded, user_check, b"") + user_check + user_salt
+    o_value = AlgV5.calculate_hash(encryption.R, encoded, owner_check, u_value) + owner_check + owner_salt
+    return PasswordKeys(
+        u_value=u_value,
+        o_value=o_value,
+        user_key=AlgV5.calculate_hash(encryption.R, encoded, user_salt, b""),
+        owner_key=AlgV5.calculate_hash(encryption.R, encoded, owner_salt, u_value[:48]),
+    )
+
+
+def _encrypt_writer(writer: "PdfWriter", password: str, keys: Optional[PasswordKeys] = None) -> None:
+    """
+    PdfWriterにAES-256の暗号化を設定（PdfWriter.encrypt と同じ。keysがあれば導出を省く）
+    """
+    if keys is None or not hasattr(writer, "generate_file_identifiers"):
+        writer.encrypt(user_password=password, owner_password=password, algorithm="AES-256")
+        return
+    writer.generate_file_identifiers()
+    writer._encryption, entry = keys.make_encryption(writer._ID[0])
+    writer._add_object(entry)
+    writer._encrypt_entry = entry
+
+
+# コピー中に進み具合を知らせる間隔（読み込んだオブジェクトの数）
+_CLONE_PROGRESS_OBJECTS = 64
+
+
+def _clone_document(
+    reader: "PdfReader",
+    deduplicate: bool = True,
+    progress: ProgressCallback = _no_progress,
+    total_bytes: int = 0
+) -> "PdfWriter":
+    """
+    文書全体を1度にコピーしたPdfWriterを作成
+
+    ページを1枚ずつ追加する方法と違い、しおり・リンク先・フォーム・添付ファイル・
+    XMPメタデータなども含めて文書をそのまま引き継ぎます。
+    複数のページで共有しているフォントや画像は共有したままコピーされます。
+
+    コピー中も読み込んだオブジェクトの数に応じて進み具合を知らせるため、
+    取り消しや制限時間（_StopCheck.wrap したコールバック）はコピーの途中でも効きます。
+
+    Args:
+        reader: コピー元のPdfReader
+        deduplicate: Trueの場合は内容が同じオブジェクトを1つにまとめる（出力が小さくなる。
+            Falseの場合はまとめる処理を省く）
+        progress: 進み具合を受け取るコールバック（STAGE_COPY_PAGES。オブジェクト数から見積もったバイト数）
+        total_bytes: 入力のサイズ
+
+    Returns:
+        PdfWriter
+    """
+    object_count = max(1, int(reader.trailer.get("/Size", 1)))
+    total_bytes = max(1, total_bytes)
+    loaded = 0
+    get_object = reader.get_object
+
+    def counted_get_object(indirect_reference):
+        nonlocal loaded
+        loaded += 1
+        if loaded % _CLONE_PROGRESS_OBJECTS == 0:
+            progress(STAGE_COPY_PAGES, min(total_bytes * loaded // object_count, total_bytes - 1), total_bytes)
+        return get_object(indirect_reference)
+
+    # PdfWriter(clone_from=...) は参照先のオブジェクトを reader.get_object で順に読み込むため、
+    # そこで進み具合を知らせる（コピーが終わったら元に戻す）
+    reader.get_object = counted_get_object
+    try:
+        writer = PdfWriter(clone_from=reader)
+    finally:
+        del reader.get_object
+    # compress_identical_objects は pypdf 5.0以降
+    if deduplicate and hasattr(writer, "compress_identical_objects"):
+        progress(STAGE_COPY_PAGES, total_bytes - 1, total_bytes)
+        writer.compress_identical_objects()
+    return writer
+
+
+def lock_pdf_bytes(
+    pdf_bytes: bytes,
+    password: str,
+    stats: Optional[StageStats] = None,
+    deduplicate: bool = True,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[bool, bytes, str]:
+    """
+    PDFバイトデータにパスワードを設定
+
+    Args:
+        pdf_bytes: PDFのバイトデータ
+        password: 設定するパスワード
+        stats: 処理段階ごとの時間とバイト数の記録先（省略可）
+        deduplicate: Trueの場合は内容が同じオブジェクトを1つにまとめてから暗号化（既定）
+        keys: パスワードから導出済みの鍵情報（derive_password_keys。省略時はこの処理で導出）
+        progress: 進み具合を受け取るコールバック（処理段階, 書き出したバイト数, 入力のサイズ）
+
+    Returns:
+        (成功フラグ, 暗号化されたPDFバイト, エラーメッセージ)
+    """
+    if not _load_pypdf():
+        return False, b"", "pypdfライブラリが利用できません。"
+
+    stats = stats if stats is not None else StageStats()
+    progress = _throttled(progress)
+    total = len(pdf_bytes)
+
+    try:
+        # PDFを読み込む（明らかに処理できないものは解析する前に見分ける）
+        progress(STAGE_READ, 0, total)
+        with stats.measure(STAGE_READ):
+            source = io.BytesIO(pdf_bytes)
+            ok, error_msg = prescan_pdf(source)
+            if not ok:
+                return False, b"", error_msg
+            reader = PdfReader(source)
+        stats.add_bytes(STAGE_READ, len(pdf_bytes))
+
+        # 既に暗号化されている場合
+        if reader.is_encrypted:
+            return False, b"", "すでに鍵がかかっています"
+
+        progress(STAGE_COPY_PAGES, 0, total)
+        with stats.measure(STAGE_COPY_PAGES):
+            writer = _clone_document(reader, deduplicate, progress, total)
+
+        # AES-256で暗号化
+        progress(STAGE_ENCRYPT, 0, total)
+        with stats.measure(STAGE_ENCRYPT):
+            _encrypt_writer(writer, password, keys)
+
+        # バイトデータとして出力
+        with stats.measure(STAGE_WRITE):
+            output = io.BytesIO()
+            writer.write(_ProgressWriter(output, progress, total))
+            locked_bytes = output.getvalue()
+        stats.add_bytes(STAGE_WRITE, len(locked_bytes))
+        progress(STAGE_WRITE, total, total)
+
+        return True, locked_bytes, ""
+
+    except PdfReadError:
+        return False, b"", "PDFファイルが壊れているかもしれません"
+    except _Stopped:
+        raise
+    except Exception as e:
+        return False, b"", f"エラーが発生しました: {str(e)}"
+
+
+class _CountingWriter:
+    """書き込んだバイト数を数えるラッパー（出力先がtell()できなくても位置を把握するため）"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.position = 0
+
+    def write(self, data: bytes) -> int:
+        self._stream.write(data)
+        self.position += len(data)
+        return len(data)
+
+
+def _default_file_mode() -> int:
+    """open() で新しく作るファイルと同じアクセス権（0o666 から umask を除いたもの）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# 出力ファイルのアクセス権（一時ファイルは本人だけが読める 0600 で作られるため、置き換える前に直す）
+_OUTPUT_FILE_MODE = _default_file_mode()
+
+
+class _AtomicOutput:
+    """
+    出力ファイルを同じフォルダの一時ファイルに書き、commit() で置き換える
+
+    commit() しないまま閉じた場合（失敗・取り消し・例外）は一時ファイルを削除するため、
+    書きかけのファイルが出力先に残りません。置き換える前に、open() で作った場合と同じ
+    アクセス権に直します。
+    """
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        fd, self.temp_path = tempfile.mkstemp(suffix=".part", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            self.file = os.fdopen(fd, "wb")
+        except BaseException:
+            os.close(fd)
+            os.remove(self.temp_path)
+            raise
+        self._committed = False
+
+    def commit(self) -> None:
+        """書き終えた一時ファイルを出力先に置き換える"""
+        self.file.close()
+        os.chmod(self.temp_path, _OUTPUT_FILE_MODE)
+        os.replace(self.temp_path, self.output_path)
+        self._committed = True
+
+    def __enter__(self) -> "_AtomicOutput":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.file.close()
+        if not self._committed:
+            with contextlib.suppress(OSError):
+                os.remove(self.temp_path)
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    """シーク可能なストリームのサイズを取得（位置は元に戻す）"""
+    position = stream.tell()
+    # mmap.seek は新しい位置を返さない（Python 3.13より前）ので tell() で求める
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def _list_object_ids(reader: "PdfReader") -> List[Tuple[int, int]]:
+    """
+    相互参照表から使用中のオブジェクト番号と世代番号を取得
+
+    Args:
+        reader: PdfReader
+
+    Returns:
+        (オブジェクト番号, 世代番号) のリスト（番号順）
+    """
+    generations = {}
+    for generation, table in reader.xref.items():
+        free = reader.xref_free_entry.get(generation, {})
+        for idnum in table:
+            if idnum == 0 or free.get(idnum, False):
+                continue
+            generations[idnum] = max(generation, generations.get(idnum, generation))
+    # オブジェクトストリーム内のオブジェクトは世代番号0
+    for idnum in reader.xref_objStm:
+        generations[idnum] = 0
+    return sorted(generations.items())
+
+
+def _is_structural_stream(obj) -> bool:
+    """相互参照ストリームとオブジェクトストリームは出力し直さない"""
+    return isinstance(obj, StreamObject) and obj.get("/Type") in ("/XRef", "/ObjStm")
+
+
+def _write_xref_and_trailer(
+    out: _CountingWriter,
+    offsets: dict,
+    size: int,
+    trailer: "DictionaryObject"
+) -> None:
+    """相互参照表とトレーラーを書き込む"""
+    xref_offset = out.position
+    out.write(f"xref\n0 {size}\n".encode())
+    out.write(b"0000000000 65535 f\r\n")
+    for idnum in range(1, size):
+        if idnum in offsets:
+            offset, generation = offsets[idnum]
+            out.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+        else:
+            out.write(b"0000000000 00000 f\r\n")
+    out.write(b"trailer\n")
+    trailer.write_to_stream(out)
+    out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def _make_encryption(
+    reader: "PdfReader",
+    password: str,
+    keys: Optional["PasswordKeys"] = None
+) -> Tuple["Encryption", "DictionaryObject", "ByteStringObject"]:
+    """
+    AES-256の暗号化辞書と鍵を作成（keysがあればパスワードからの導出を省く）
+
+    Returns:
+        (Encryption, 暗号化辞書, ファイル識別子の1つ目)
+    """
+    # ファイル識別子（1つ目は元の文書のものを引き継ぐ）
+    original_id = reader.trailer.get("/ID")
+    first_id = bytes(original_id[0].original_bytes) if original_id else os.urandom(16)
+    if keys is not None:
+        encryption, encrypt_entry = keys.make_encryption(first_id)
+    else:
+        encryption = Encryption.make(EncryptAlgorithm.AES_256, _ALL_PERMISSIONS, first_id)
+        encrypt_entry = encryption.write_entry(password, password)
+    return encryption, encrypt_entry, ByteStringObject(first_id)
+
+
+def _write_encrypted_objects(
+    reader: "PdfReader",
+    encryption: "Encryption",
+    object_ids: List[Tuple[int, int]],
+    out: _CountingWriter,
+    progress: ProgressCallback = _no_progress,
+    total_bytes: int = 0
+) -> Tuple[dict, float, float, float]:
+    """
+    オブジェクトを1つずつ読み込み → 暗号化 → 書き出し → 破棄する
+
+    Args:
+        reader: PdfReader
+        encryption: 暗号化に使うEncryption
+        object_ids: 書き出す (オブジェクト番号, 世代番号) のリスト
+        out: 出力先
+        progress: 進み具合を受け取るコールバック（オブジェクトを1つ書き出すごとに呼ぶ）
+        total_bytes: 進み具合の見込みの総バイト数
+
+    Returns:
+        ({オブジェクト番号: (outでの位置, 世代番号)}, 読み込み時間, 暗号化時間, 書き出し時間)
+    """
+    offsets = {}
+    read_time = encrypt_time = write_time = 0.0
+    for idnum, generation in object_ids:
+        started = time.perf_counter()
+        obj = reader.get_object(IndirectObject(idnum, generation, reader))
+        read_done = time.perf_counter()
+        read_time += read_done - started
+        if obj is None or _is_structural_stream(obj):
+            continue
+
+        encrypted = encryption.encrypt_object(obj, idnum, generation)
+        encrypt_done = time.perf_counter()
+        encrypt_time += encrypt_done - read_done
+
+        offsets[idnum] = (out.position, generation)
+        out.write(f"{idnum} {generation} obj\n".encode())
+        encrypted.write_to_stream(out)
+        out.write(b"\nendobj\n")
+        write_time += time.perf_counter() - encrypt_done
+        progress(STAGE_ENCRYPT, min(out.position, total_bytes - 1), total_bytes)
+
+        # 書き終えたオブジェクトはキャッシュから外してメモリを解放
+        reader.resolved_objects.pop((generation, idnum), None)
+    return offsets, read_time, encrypt_time, write_time
+
+
+def _write_document_tail(
+    reader: "PdfReader",
+    encryption: "Encryption",
+    encrypt_entry: "DictionaryObject",
+    file_id: "ByteStringObject",
+    out: _CountingWriter,
+    offsets: dict,
+    max_idnum: int
+) -> None:
+    """
+    トレーラーが直接持つオブジェクト・暗号化辞書・相互参照表・トレーラーを書き込む
+
+    Args:
+        reader: PdfReader
+        encryption: 暗号化に使うEncryption
+        encrypt_entry: 暗号化辞書
+        file_id: ファイル識別子の1つ目
+        out: 出力先
+        offsets: 書き出し済みのオブジェクトの位置（この関数で追加したものも書き加える）
+        max_idnum: 元の文書で使われている最大のオブジェクト番号
+    """
+    trailer = DictionaryObject()
+    next_idnum = max_idnum + 1
+
+    # 文書情報辞書が直接オブジェクトの場合は間接オブジェクトとして書き出す
+    for key in ("/Root", "/Info"):
+        value = reader.trailer.raw_get(key) if key in reader.trailer else None
+        if value is None:
+            continue
+        if not isinstance(value, IndirectObject):
+            offsets[next_idnum] = (out.position, 0)
+            out.write(f"{next_idnum} 0 obj\n".encode())
+            encryption.encrypt_object(value, next_idnum, 0).write_to_stream(out)
+            out.write(b"\nendobj\n")
+            value = IndirectObject(next_idnum, 0, None)
+            next_idnum += 1
+        trailer[NameObject(key)] = value
+
+    # 暗号化辞書は暗号化せずに書き出す
+    encrypt_idnum = next_idnum
+    offsets[encrypt_idnum] = (out.position, 0)
+    out.write(f"{encrypt_idnum} 0 obj\n".encode())
+    encrypt_entry.write_to_stream(out)
+    out.write(b"\nendobj\n")
+
+    size = encrypt_idnum + 1
+    trailer[NameObject("/Size")] = NumberObject(size)
+    trailer[NameObject("/Encrypt")] = IndirectObject(encrypt_idnum, 0, None)
+    trailer[NameObject("/ID")] = ArrayObject([file_id, ByteStringObject(os.urandom(16))])
+    _write_xref_and_trailer(out, offsets, size, trailer)
+
+
+def lock_pdf_stream(
+    source: BinaryIO,
+    destination: BinaryIO,
+    password: str,
+    stats: Optional[StageStats] = None,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[bool, str]:
+    """
+    PDFをストリーミングで暗号化して出力先に書き込む（大きなPDF向け）
+
+    入力全体をメモリに読み込まず、相互参照表に載っているオブジェクトを
+    1つずつ読み込み → 暗号化 → 書き出し → 破棄します。
+    ページ単位のコピーではなく文書をそのまま暗号化するため、
+    しおり・フォーム・添付ファイルなどもそのまま残ります。
+
+    ピークメモリの目安:
+        最大のオブジェクト1個分 × 2（元データと暗号化後）
+        + 展開中のオブジェクトストリーム
+        + オブジェクト数に比例する小さな表（1オブジェクトあたり数十バイト）
+        入力ファイル全体のサイズには比例しません。
+
+    Args:
+        source: 入力PDF（シーク可能なファイルオブジェクトまたはmmap）
+        destination: 出力先（ファイルオブジェクトなど。シーク不要）
+        password: 設定するパスワード
+        stats: 処理段階ごとの時間とバイト数の記録先（省略可）
+        keys: パスワードから導出済みの鍵情報（derive_password_keys。省略時はこの処理で導出）
+        progress: 進み具合を受け取るコールバック（処理段階, 書き出したバイト数, 入力のサイズ）
+
+    Returns:
+        (成功フラグ, エラーメッセージ)
+    """
+    if not _load_pypdf():
+        return False, "pypdfライブラリが利用できません。"
+
+    stats = stats if stats is not None else StageStats()
+    progress = _throttled(progress)
+
+    try:
+        with stats.measure(STAGE_READ):
+            total = _stream_size(source)
+            progress(STAGE_READ, 0, total)
+            ok, error_msg = prescan_pdf(source)
+            if not ok:
+                return False, error_msg
+            reader = PdfReader(source)
+            stats.add_bytes(STAGE_READ, total)
+
+        # 既に暗号化されている場合
+        if reader.is_encrypted:
+            return False, "すでに鍵がかかっています"
+
+        if not STREAMING_AVAILABLE:
+            # pypdfの内部構成が変わった場合は通常の方法で書き込む
+            writer = _clone_document(reader, progress=progress, total_bytes=total)
+            _encrypt_writer(writer, password, keys)
+            writer.write(_ProgressWriter(destination, progress, total))
+            progress(STAGE_WRITE, total, total)
+            return True, ""
+
+        object_ids = _list_object_ids(reader)
+        max_idnum = object_ids[-1][0] if object_ids else 0
+
+        # AES-256の暗号化辞書と鍵を作成
+        with stats.measure(STAGE_ENCRYPT):
+            encryption, encrypt_entry, file_id = _make_encryption(reader, password, keys)
+
+        out = _CountingWriter(destination)
+        out.write(reader.pdf_header.encode() + b"\n%\xe2\xe3\xcf\xd3\n")
+
+        offsets, read_time, encrypt_time, write_time = _write_encrypted_objects(
+            reader, encryption, object_ids, out, progress, total
+        )
+        stats.add_time(STAGE_READ, read_time)
+        stats.add_time(STAGE_ENCRYPT, encrypt_time)
+
+        write_started = time.perf_counter()
+        progress(STAGE_WRITE, min(out.position, total - 1), total)
+        _write_document_tail(reader, encryption, encrypt_entry, file_id, out, offsets, max_idnum)
+        stats.add_time(STAGE_WRITE, write_time + time.perf_counter() - write_started)
+        stats.add_bytes(STAGE_WRITE, out.position)
+        progress(STAGE_WRITE, total, total)
+        return True, ""
+
+    except PdfReadError:
+        return False, "PDFファイルが壊れているかもしれません"
+    except _Stopped:
+        raise
+    except Exception as e:
+        return False, f"エラーが発生しました: {str(e)}"
+
+
+@contextlib.contextmanager
+def _map_file(input_path: str) -> Iterator[BinaryIO]:
+    """
+    ファイルを読み取り専用でメモリマップする
+
+    PdfReaderは受け取ったストリームから必要な部分だけを読むため、
+    ファイル全体がヒープにコピーされることはありません（ページキャッシュを共有）。
+    空のファイルはメモリマップできないため、通常のファイルとして返します。
+
+    Args:
+        input_path: ファイルパス
+
+    Yields:
+        mmapオブジェクト（空のファイルの場合はファイルオブジェクト）
+    """
+    with open(input_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _lock_pdf_file_streaming(
+    input_path: str,
+    output_path: str,
+    password: str,
+    use_mmap: bool = False,
+    stats: Optional[StageStats] = None,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[bool, str]:
+    """
+    ストリーミングでPDFファイルを暗号化（一時ファイルに書いてから置き換える）
+    """
+    # 入力を先に開く（開けなかった場合に一時ファイルを作らない）
+    source_context = _map_file(input_path) if use_mmap else open(input_path, "rb")
+    with source_context as source, _AtomicOutput(output_path) as output:
+        success, error_msg = lock_pdf_stream(source, output.file, password, stats, keys, progress)
+        if success:
+            output.commit()
+    return success, error_msg
+
+
+# 1つの文書を複数プロセスで分担して暗号化する場合の設定
+# これより小さい文書はプロセスの起動と分担の手間のほうが大きいため1プロセスで処理する
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+PARALLEL_MIN_OBJECTS = 5000
+# ワーカー1つあたりの分担数（大きさの見積もりが外れても待ち時間が偏らないよう細かく分ける）
+_PARALLEL_CHUNKS_PER_WORKER = 4
+# オブジェクトストリーム内のオブジェクトの大きさの見積もり（バイト）
+_COMPRESSED_OBJECT_WEIGHT = 64
+
+
+def _partition_object_ids(
+    reader: "PdfReader",
+    object_ids: List[Tuple[int, int]],
+    file_size: int,
+    parts: int
+) -> List[List[Tuple[int, int]]]:
+    """
+    オブジェクトを番号順のまま、大きさがほぼ均等になるように分ける
+
+    大きさは相互参照表の位置の差（次のオブジェクトまでのバイト数）から見積もります。
+
+    Args:
+        reader: PdfReader
+        object_ids: (オブジェクト番号, 世代番号) のリスト（番号順）
+        file_size: 入力ファイルのサイズ
+        parts: 分割数
+
+    Returns:
+        分割したリストのリスト（空のものは含まない）
+    """
+    positions = {}
+    for generation, table in reader.xref.items():
+        for idnum, offset in table.items():
+            positions[(idnum, generation)] = offset
+    ordered = sorted(set(positions.values()) | {file_size})
+    following = dict(zip(ordered, ordered[1:]))
+
+    weights = []
+    for idnum, generation in object_ids:
+        offset = positions.get((idnum, generation))
+        if offset is None or offset not in following:
+            weights.append(_COMPRESSED_OBJECT_WEIGHT)
+        else:
+            weights.append(max(1, following[offset] - offset))
+
+    target = sum(weights) / max(1, parts)
+    chunks: List[List[Tuple[int, int]]] = [[]]
+    filled = 0
+    for object_id, weight in zip(object_ids, weights):
+        if chunks[-1] and filled + weight / 2 > target and len(chunks) < parts:
+            chunks.append([])
+            filled = 0
+        chunks[-1].append(object_id)
+        filled += weight
+    return [chunk for chunk in chunks if chunk]
+
+
+# ワーカープロセスごとに開いた入力（_init_chunk_worker で設定）
+_chunk_reader: Optional["PdfReader"] = None
+
+
+def _init_chunk_worker(input_path: str, use_mmap: bool) -> None:
+    """分担暗号化用ワーカーの初期化（入力を開いて相互参照表を1度だけ読む）"""
+    global _chunk_reader
+    _load_pypdf()
+    # ワーカーの終了時まで開いたままにする（親プロセスで読めた空でないファイルが前提）
+    source = open(input_path, "rb")
+    if use_mmap:
+        source = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    _chunk_reader = PdfReader(source)
+
+
+def _encrypt_object_chunk(
+    object_ids: List[Tuple[int, int]],
+    encryption: "Encryption",
+    chunk_path: str
+) -> Tuple[dict, float, float, float]:
+    """
+    担当するオブジェクトを暗号化して一時ファイルに書き出す（ワーカープロセス用）
+
+    Args:
+        object_ids: 担当する (オブジェクト番号, 世代番号) のリスト
+        encryption: 親プロセスで作成したEncryption（鍵を含む）
+        chunk_path: 書き出し先
+
+    Returns:
+        _write_encrypted_objects の戻り値（位置は一時ファイルの先頭からのバイト数）
+    """
+    with open(chunk_path, "wb") as f:
+        return _write_encrypted_objects(_chunk_reader, encryption, object_ids, _CountingWriter(f))
+
+
+def _write_chunks_parallel(
+    input_path: str,
+    use_mmap: bool,
+    chunks: List[List[Tuple[int, int]]],
+    encryption: "Encryption",
+    workers: int,
+    work_dir: str,
+    out: _CountingWriter,
+    progress: ProgressCallback = _no_progress,
+    total_bytes: int = 0
+) -> Tuple[dict, float]:
+    """
+    分担ごとにワーカープロセスで暗号化し、できた一時ファイルを番号順に出力先へつなげる
+
+    進み具合は分担を1つつなげるごとに知らせます。
+
+    Returns:
+        ({オブジェクト番号: (outでの位置, 世代番号)}, つなげるのにかかった時間)
+    """
+    offsets = {}
+    concat_time = 0.0
+    executor = ProcessPoolExecutor(
+        max_workers=max(1, min(workers, len(chunks))),
+        initializer=_init_chunk_worker,
+        initargs=(input_path, use_mmap)
+    )
+    with executor:
+        futures = []
+        for index, chunk in enumerate(chunks):
+            chunk_path = os.path.join(work_dir, f"{index}.chunk")
+            futures.append((chunk_path, executor.submit(
+                _encrypt_object_chunk, chunk, encryption, chunk_path
+            )))
+        try:
+            # 終わった順ではなく番号順につなげる（後の分担はその間も並行して進む）
+            for chunk_path, future in futures:
+                chunk_offsets = future.result()[0]
+                started = time.perf_counter()
+                base = out.position
+                for idnum, (offset, generation) in chunk_offsets.items():
+                    offsets[idnum] = (base + offset, generation)
+                with open(chunk_path, "rb") as chunk_file:
+                    shutil.copyfileobj(chunk_file, out, 1024 * 1024)
+                os.remove(chunk_path)
+                concat_time += time.perf_counter() - started
+                progress(STAGE_ENCRYPT, min(out.position, total_bytes - 1), total_bytes)
+        finally:
+            # 失敗した場合は未着手の分担を取り消す
+            for _, future in futures:
+                future.cancel()
+    return offsets, concat_time
+
+
+def _lock_pdf_file_parallel(
+    input_path: str,
+    output_path: str,
+    password: str,
+    workers: int,
+    use_mmap: bool = False,
+    stats: Optional[StageStats] = None,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[bool, str]:
+    """
+    1つのPDFを複数のワーカープロセスで分担して暗号化（大きなPDF向け）
+
+    親プロセスで鍵を作り、オブジェクトを番号順に分けて各ワーカーに渡します。
+    各ワーカーは入力を開き直し、同じ鍵で担当分を暗号化して一時ファイルに書き出します。
+    親プロセスは一時ファイルを順につなげ、位置をずらして相互参照表を書き込みます。
+    出力はストリーミング処理（lock_pdf_stream）と同じ構成になります。
+
+    statsの encrypt には分担した処理（読み込み・暗号化・一時ファイルへの書き出し）の経過時間、
+    write には一時ファイルの連結と相互参照表の書き込みの時間が入ります。
+    """
+    stats = stats if stats is not None else StageStats()
+    progress = _throttled(progress)
+    file_size = os.path.getsize(input_path)
+
+    with contextlib.ExitStack() as stack:
+        progress(STAGE_READ, 0, file_size)
+        with stats.measure(STAGE_READ):
+            source = stack.enter_context(_map_file(input_path) if use_mmap else open(input_path, "rb"))
+            reader = PdfReader(source)
+        stats.add_bytes(STAGE_READ, file_size)
+
+        if reader.is_encrypted:
+            return False, "すでに鍵がかかっています"
+
+        object_ids = _list_object_ids(reader)
+        if file_size < PARALLEL_MIN_BYTES and len(object_ids) < PARALLEL_MIN_OBJECTS:
+            stack.close()
+            return _lock_pdf_file_streaming(input_path, output_path, password, use_mmap, stats, keys, progress)
+
+        max_idnum = object_ids[-1][0] if object_ids else 0
+        chunks = _partition_object_ids(reader, object_ids, file_size, workers * _PARALLEL_CHUNKS_PER_WORKER)
+
+        progress(STAGE_ENCRYPT, 0, file_size)
+        with stats.measure(STAGE_ENCRYPT):
+            encryption, encrypt_entry, file_id = _make_encryption(reader, password, keys)
+
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        with _AtomicOutput(output_path) as output:
+            with tempfile.TemporaryDirectory(prefix=".pdf_locker_", dir=output_dir) as work_dir:
+                out = _CountingWriter(output.file)
+                out.write(reader.pdf_header.encode() + b"\n%\xe2\xe3\xcf\xd3\n")
+
+                started = time.perf_counter()
+                offsets, concat_time = _write_chunks_parallel(
+                    input_path, use_mmap, chunks, encryption, workers, work_dir, out, progress, file_size
+                )
+                stats.add_time(STAGE_ENCRYPT, time.perf_counter() - started - concat_time)
+
+                with stats.measure(STAGE_WRITE):
+                    _write_document_tail(reader, encryption, encrypt_entry, file_id, out, offsets, max_idnum)
+                stats.add_time(STAGE_WRITE, concat_time)
+                stats.add_bytes(STAGE_WRITE, out.position)
+            output.commit()
+        progress(STAGE_WRITE, file_size, file_size)
+        return True, ""
+
+
+def lock_pdf_file(
+    input_path: str,
+    output_path: str,
+    password: str,
+    streaming: bool = False,
+    use_mmap: bool = False,
+    stats: Optional[StageStats] = None,
+    parallel: int = 1,
+    deduplicate: bool = True,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[bool, str]:
+    """
+    PDFファイルにパスワードを設定してファイルに保存
+
+    Args:
+        input_path: 入力PDFファイルパス
+        output_path: 出力PDFファイルパス
+        password: 設定するパスワード
+        streaming: Trueの場合はストリーミングで暗号化（lock_pdf_stream を参照）
+        use_mmap: Trueの場合は入力をメモリマップで開く（ファイル全体を読み込まない）
+        stats: 処理段階ごとの時間とバイト数の記録先（省略可）
+        parallel: 2以上の場合は1つの文書をこの数のワーカープロセスで分担して暗号化
+            （ストリーミングと同じ出力。小さな文書は1プロセスで処理）
+        deduplicate: Trueの場合は内容が同じオブジェクトを1つにまとめてから暗号化（既定）
+            （streaming・parallel の場合は使われません）
+        keys: パスワードから導出済みの鍵情報（derive_password_keys。省略時はこの処理で導出）
+        progress: 進み具合を受け取るコールバック（処理段階, 書き出したバイト数, 入力のサイズ）。
+            画面の更新で処理が遅くならないよう PROGRESS_INTERVAL ごとに間引いて呼びます
+
+    Returns:
+        (成功フラグ, エラーメッセージ)
+    """
+    if not _load_pypdf():
+        return False, "pypdfライブラリが利用できません。"
+
+    stats = stats if stats is not None else StageStats()
+    progress = _throttled(progress)
+
+    try:
+        # 明らかに処理できないファイル（すでに鍵がかかっているものなど）は解析する前に見分ける
+        with stats.measure(STAGE_READ):
+            ok, error_msg = prescan_pdf_file(input_path)
+        if not ok:
+            return False, error_msg
+
+        if parallel > 1 and STREAMING_AVAILABLE:
+            return _lock_pdf_file_parallel(
+                input_path, output_path, password, parallel, use_mmap, stats, keys, progress
+            )
+        if streaming:
+            return _lock_pdf_file_streaming(input_path, output_path, password, use_mmap, stats, keys, progress)
+
+        with contextlib.ExitStack() as stack:
+            # PDFを読み込む（use_mmapの場合はメモリマップ経由で必要な部分だけ読む）
+            total = os.path.getsize(input_path)
+            progress(STAGE_READ, 0, total)
+            with stats.measure(STAGE_READ):
+                source = stack.enter_context(_map_file(input_path)) if use_mmap else input_path
+                reader = PdfReader(source)
+            stats.add_bytes(STAGE_READ, total)
+
+            # 既に暗号化されている場合
+            if reader.is_encrypted:
+                return False, "すでに鍵がかかっています"
+
+            progress(STAGE_COPY_PAGES, 0, total)
+            with stats.measure(STAGE_COPY_PAGES):
+                writer = _clone_document(reader, deduplicate, progress, total)
+
+            # AES-256で暗号化
+            progress(STAGE_ENCRYPT, 0, total)
+            with stats.measure(STAGE_ENCRYPT):
+                _encrypt_writer(writer, password, keys)
+
+            # ファイルに保存（同じフォルダの一時ファイルに書いてから置き換え、書きかけのファイルを残さない）
+            with stats.measure(STAGE_WRITE), _AtomicOutput(output_path) as output:
+                writer.write(_ProgressWriter(output.file, progress, total))
+                stats.add_bytes(STAGE_WRITE, output.file.tell())
+                output.commit()
+            progress(STAGE_WRITE, total, total)
+
+            return True, ""
+
+    except PdfReadError:
+        return False, "PDFファイルが壊れているかもしれません"
+    except _Stopped:
+        raise
+    except PermissionError:
+        return False, "このファイルは開けません（使用中の可能性）"
+    except Exception as e:
+        return False, f"エラーが発生しました: {str(e)}"
+
+
+def output_path_for(file_path: str, output_dir: Optional[str] = None, output_prefix: str = "鍵付き_") -> Path:
+    """
+    出力ファイルのパスを求める（process_file と同じ規則）
+
+    Args:
+        file_path: 入力ファイルパス
+        output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じ場所）
+        output_prefix: 出力ファイル名のプレフィックス
+
+    Returns:
+        出力PDFのパス
+    """
+    original_path = Path(file_path)
+    if output_dir is None:
+        output_dir = str(original_path.parent)
+    return Path(output_dir) / f"{output_prefix}{original_path.stem}.pdf"
+
+
+def plan_output_paths(
+    file_paths: Iterable[str],
+    output_dir: Optional[str] = None,
+    output_prefix: str = "鍵付き_",
+    relative_to: Optional[str] = None
+) -> Dict[str, Path]:
+    """
+    バッチ内で重複しない出力ファイルのパスを決める（process_files と同じ規則）
+
+    a.pdf と a.docx のように同じ出力先になるファイルは、2つ目以降を
+    「鍵付き_a (2).pdf」のように番号付きの名前にします（入力の順に決めます）。
+
+    Args:
+        file_paths: 入力ファイルパスのリスト
+        output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じ場所）
+        output_prefix: 出力ファイル名のプレフィックス
+        relative_to: 指定した場合、このディレクトリからの相対パスと同じ構成で output_dir の下に出力する
+
+    Returns:
+        入力ファイルパス → 出力PDFのパス
+    """
+    used: Dict[str, set] = {}
+    planned = {}
+    for path in file_paths:
+        output_path = output_path_for(str(path), mirrored_output_dir(str(path), output_dir, relative_to), output_prefix)
+        # 大文字と小文字を区別しないファイルシステム（Windows・macOS）でも重ならないよう小文字で比べる
+        names = used.setdefault(os.path.abspath(output_path.parent), set())
+        candidate = output_path
+        number = 2
+        while candidate.name.lower() in names:
+            candidate = output_path.with_name(f"{output_path.stem} ({number}){output_path.suffix}")
+            number += 1
+        names.add(candidate.name.lower())
+        planned[str(path)] = candidate
+    return planned
+
+
+def process_file(
+    file_path: str,
+    password: str,
+    output_dir: Optional[str] = None,
+    output_prefix: str = "鍵付き_",
+    streaming: bool = False,
+    use_mmap: bool = False,
+    on_stats: Optional[StatsCallback] = None,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel_event=None,
+    timeout: Optional[float] = None,
+    output_name: Optional[str] = None,
+    parallel: int = 1,
+    hash_input: bool = False
+) -> ProcessResult:
+    """
+    ファイルを処理してパスワード付きPDFを作成
+
+    Office文書の場合は自動的にPDFに変換してからパスワードを設定します。
+
+    Args:
+        file_path: 入力ファイルパス
+        password: 設定するパスワード
+        output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じ場所）
+        output_prefix: 出力ファイル名のプレフィックス
+        streaming: Trueの場合はストリーミングで暗号化（大きなPDF向け）
+        use_mmap: Trueの場合は入力PDFをメモリマップで開く
+        on_stats: 処理段階ごとの時間とバイト数を受け取るコールバック（省略可）
+        keys: パスワードから導出済みの鍵情報（derive_password_keys。省略時はこの処理で導出）
+        progress: 進み具合を受け取るコールバック（lock_pdf_file を参照）。
+            Office文書は変換中の進み具合が分からないため、変換の開始だけを知らせます
+        cancel_event: セットされたら処理を打ち切る（threading.Event または multiprocessing.Event）
+        timeout: 制限時間（秒）。過ぎたら打ち切ります。Office文書は変換と暗号化に
+            それぞれこの時間まで使え、変換が終わらない場合は変換用ワーカープロセスごと強制終了します
+            （他のファイルの変換が終わるのを待つ時間は含みません）
+        output_name: 出力ファイル名（省略時は output_prefix と入力ファイル名から決める。plan_output_paths を参照）
+        parallel: 2以上の場合は1つの文書をこの数のワーカープロセスで分担して暗号化（lock_pdf_file を参照）
+        hash_input: Trueの場合は成功したときに入力ファイルのSHA-256を求めて input_sha256 に入れる
+            （BatchManifest 用。ワーカープロセスで求めるため、呼び出し側で読み直さずに済みます）
+
+    Returns:
+        ProcessResult: 処理結果（statsに処理段階ごとの記録が入ります。
+            打ち切った場合は timed_out または cancelled がTrue）
+    """
+    original_path = Path(file_path)
+    file_ext = original_path.suffix.lower()
+    stats = StageStats()
+    stop = _StopCheck(cancel_event, timeout)
+    progress = _throttled(stop.wrap(progress))
+
+    def finish(result: ProcessResult) -> ProcessResult:
+        result.stats = stats
+        if on_stats is not None:
+            on_stats(result.original_filename, stats)
+        return result
+
+    # 出力ファイルパスを生成
+    output_path = output_path_for(file_path, output_dir, output_prefix)
+    if output_name is not None:
+        output_path = output_path.with_name(output_name)
+
+    temp_pdf = None
+
+    try:
+        # 順番待ちの間に取り消された場合などは始めない
+        stop.check()
+
+        # Office文書の場合、まずPDFに変換
+        if file_ext in OFFICE_EXTENSIONS:
+            # 一時ファイルを作成
+            temp_dir = tempfile.mkdtemp()
+            temp_pdf = Path(temp_dir) / f"{original_path.stem}.pdf"
+
+            progress(STAGE_CONVERT, 0, os.path.getsize(file_path))
+            with stats.measure(STAGE_CONVERT):
+                success, error_msg = convert_office_to_pdf(file_path, str(temp_pdf), timeout=timeout)
+            if success:
+                stats.add_bytes(STAGE_CONVERT, temp_pdf.stat().st_size)
+                stop.restart()
+            else:
+                # 一時ディレクトリをクリーンアップ
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                return finish(ProcessResult(
+                    success=False,
+                    error_message=error_msg,
+                    original_filename=original_path.name,
+                    input_path=file_path,
+                    timed_out=timeout is not None and stats.durations.get(STAGE_CONVERT, 0.0) >= timeout
+                ))
+
+            pdf_to_encrypt = str(temp_pdf)
+        else:
+            pdf_to_encrypt = file_path
+
+        # PDFにパスワードを設定
+        success, error_msg = lock_pdf_file(
+            pdf_to_encrypt,
+            str(output_path),
+            password,
+            streaming=streaming,
+            use_mmap=use_mmap,
+            stats=stats,
+            keys=keys,
+            progress=progress,
+            parallel=parallel
+        )
+
+        # 一時ファイルをクリーンアップ
+        if temp_pdf and temp_pdf.parent.exists():
+            shutil.rmtree(temp_pdf.parent, ignore_errors=True)
+
+        if success:
+            return finish(ProcessResult(
+                success=True,
+                output_path=str(output_path),
+                original_filename=original_path.name,
+                input_path=file_path,
+                input_sha256=file_sha256(file_path) if hash_input else None
+            ))
+        else:
+            return finish(ProcessResult(
+                success=False,
+                error_message=error_msg,
+                original_filename=original_path.name,
+                input_path=file_path
+            ))
+
+    except _Stopped as e:
+        # 一時ファイルをクリーンアップ
+        if temp_pdf and temp_pdf.parent.exists():
+            shutil.rmtree(temp_pdf.parent, ignore_errors=True)
+
+        return finish(ProcessResult(
+            success=False,
+            error_message=str(e),
+            original_filename=original_path.name,
+            input_path=file_path,
+            timed_out=e.timed_out,
+            cancelled=not e.timed_out
+        ))
+
+    except Exception as e:
         # 一時ファイルをクリーンアップ
         if temp_pdf and temp_pdf.parent.exists():
             shutil.rmtree(temp_pdf.parent, ignore_errors=True)
 
+        return finish(ProcessResult(
+            success=False,
+            error_message=f"予期しないエラー: {str(e)}",
+            original_filename=original_path.name,
+            input_path=file_path
+        ))
+
+
+def process_uploaded_file(
+    uploaded_file: BinaryIO,
+    filename: str,
+    password: str,
+    on_stats: Optional[StatsCallback] = None,
+    keys: Optional[PasswordKeys] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel_event=None
+) -> Tuple[bool, bytes, str]:
+    """
+    アップロードされたファイルを処理（Webアプリ用）
+
+    Args:
+        uploaded_file: アップロードされたファイルオブジェクト
+        filename: 元のファイル名
+        password: 設定するパスワード
+        on_stats: 処理段階ごとの時間とバイト数を受け取るコールバック（省略可）
+        keys: パスワードから導出済みの鍵情報（derive_password_keys。省略時はこの処理で導出）
+        progress: 進み具合を受け取るコールバック（process_file を参照）
+        cancel_event: セットされたら処理を打ち切る（threading.Event または multiprocessing.Event）
+
+    Returns:
+        (成功フラグ, 暗号化されたPDFバイト, エラーメッセージ)
+        打ち切った場合は成功フラグがFalseで、エラーメッセージは CANCELLED_MESSAGE
+    """
+    stats = StageStats()
+    stop = _StopCheck(cancel_event)
+    try:
+        return _process_uploaded_file(uploaded_file, filename, password, stats, keys, stop, progress)
+    except _Stopped as e:
+        return False, b"", str(e)
+    finally:
+        if on_stats is not None:
+            on_stats(filename, stats)
+
+
+def _process_uploaded_file(
+    uploaded_file: BinaryIO,
+    filename: str,
+    password: str,
+    stats: StageStats,
+    keys: Optional[PasswordKeys] = None,
+    stop: Optional[_StopCheck] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[bool, bytes, str]:
+    """process_uploaded_file の本体（処理段階ごとの記録をstatsに入れる）"""
+    file_ext = Path(filename).suffix.lower()
+    stop = stop if stop is not None else _StopCheck()
+    progress = _throttled(stop.wrap(progress))
+
+    # 順番待ちの間に取り消された場合などは始めない
+    stop.check()
+
+    # PDFの場合は直接処理
+    if file_ext == '.pdf':
+        with stats.measure(STAGE_READ):
+            pdf_bytes = uploaded_file.read()
+        return lock_pdf_bytes(pdf_bytes, password, stats, keys=keys, progress=progress)
+
+    # Office文書の場合は一時ファイル経由で変換
+    elif file_ext in OFFICE_EXTENSIONS:
+        temp_dir = None
+        try:
+            temp_dir = tempfile.mkdtemp()
+
+            # 入力ファイルを一時保存
+            input_temp = Path(temp_dir) / filename
+            with stats.measure(STAGE_READ), open(input_temp, 'wb') as f:
+                f.write(uploaded_file.read())
+
+            # PDFに変換（変換中の進み具合は分からないため、開始だけを知らせる）
+            pdf_temp = Path(temp_dir) / f"{Path(filename).stem}.pdf"
+            progress(STAGE_CONVERT, 0, input_temp.stat().st_size)
+            with stats.measure(STAGE_CONVERT):
+                success, error_msg = convert_office_to_pdf(str(input_temp), str(pdf_temp))
+
+            if not success:
+                return False, b"", error_msg
+            stats.add_bytes(STAGE_CONVERT, pdf_temp.stat().st_size)
+            stop.check()
+
+            # 変換されたPDFを読み込んでパスワード設定
+            with stats.measure(STAGE_READ), open(pdf_temp, 'rb') as f:
+                pdf_bytes = f.read()
+
+            return lock_pdf_bytes(pdf_bytes, password, stats, keys=keys, progress=progress)
+
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    else:
+        return False, b"", f"未対応のファイル形式です: {file_ext}"
+
+
+# ============================================================
+# 事前確認（処理時間の見積もり）
+# ============================================================
+#
+# 処理を始める前に各ファイルを軽く調べ、処理時間の目安を求めます。
+# バッチ処理では時間のかかるファイルから順にワーカーへ渡し（最後に大きなファイルが
+# 1つだけ残って待たされることを防ぐ）、GUIでは残り時間の目安の表示に使います。
+
+FILE_KIND_PDF = "pdf"
+FILE_KIND_OFFICE = "office"
+
+# 処理時間の目安の係数（秒。合成PDFでの測定値から求めた大まかな値）
+_COST_BASE_SECONDS = 0.005               # 1ファイルあたりの固定分
+_COST_PER_OBJECT_SECONDS = 0.00015       # PDFのオブジェクト1個あたり
+_COST_PER_BYTE_SECONDS = 1e-8            # PDFの1バイトあたり（約100MB/秒）
+_OFFICE_COST_BASE_SECONDS = 5.0          # Office文書の変換1件あたりの固定分
+_OFFICE_COST_PER_BYTE_SECONDS = 1e-6     # Office文書の1バイトあたり（約1MB/秒）
+# オブジェクト数が分からない場合の目安（1KBあたりのオブジェクト数）
+_OBJECTS_PER_KB = 0.5
+
+
+@dataclass
+class FileEstimate:
+    """事前確認の結果（1ファイル分）"""
+    path: str
+    kind: str                             # FILE_KIND_PDF または FILE_KIND_OFFICE
+    size: int = 0                         # ファイルサイズ（バイト）
+    page_count: Optional[int] = None      # ページ数（PDFのみ）
+    object_count: Optional[int] = None    # オブジェクト数（PDFのみ）
+    encrypted: bool = False               # すでに鍵がかかっている
+    error_message: str = ""               # 処理できないと分かった場合の理由
+    cost: float = 0.0                     # 処理時間の目安（秒）
+
+
+def estimate_cost(kind: str, size: int, object_count: Optional[int] = None) -> float:
+    """
+    処理時間の目安を求める
+
+    Args:
+        kind: FILE_KIND_PDF または FILE_KIND_OFFICE
+        size: ファイルサイズ（バイト）
+        object_count: PDFのオブジェクト数（分からない場合はサイズから見積もる）
+
+    Returns:
+        処理時間の目安（秒）
+    """
+    if kind == FILE_KIND_OFFICE:
+        # 変換後のPDFの処理は変換に比べて小さいので含めない
+        return _OFFICE_COST_BASE_SECONDS + size * _OFFICE_COST_PER_BYTE_SECONDS
+    if object_count is None:
+        object_count = int(size / 1024 * _OBJECTS_PER_KB)
+    return _COST_BASE_SECONDS + object_count * _COST_PER_OBJECT_SECONDS + size * _COST_PER_BYTE_SECONDS
+
+
+def preflight_file(file_path: str) -> FileEstimate:
+    """
+    ファイルを軽く調べて処理時間の目安を求める
+
+    PDFは相互参照表だけを読み（メモリマップ経由。ページの内容は読まない）、
+    ページ数とオブジェクト数を調べます。Office文書はサイズだけで見積もります。
+
+    Args:
+        file_path: 入力ファイルパス
+
+    Returns:
+        FileEstimate
+    """
+    ext = Path(file_path).suffix.lower()
+    kind = FILE_KIND_OFFICE if ext in OFFICE_EXTENSIONS else FILE_KIND_PDF
+    estimate = FileEstimate(path=file_path, kind=kind)
+    try:
+        estimate.size = os.path.getsize(file_path)
+    except OSError:
+        estimate.error_message = "このファイルは開けません（使用中の可能性）"
+        return estimate
+
+    if ext not in SUPPORTED_EXTENSIONS:
+        estimate.error_message = f"未対応のファイル形式です: {ext}"
+        return estimate
+
+    if kind == FILE_KIND_PDF:
+        ok, error_msg = prescan_pdf_file(file_path)
+        if not ok:
+            estimate.encrypted = error_msg == "すでに鍵がかかっています"
+            estimate.error_message = error_msg
+            return estimate
+        if _load_pypdf():
+            try:
+                with _map_file(file_path) as source:
+                    reader = PdfReader(source)
+                    estimate.object_count = len(_list_object_ids(reader))
+                    # len(reader.pages) は全ページをたどるため /Count を直接読む
+                    estimate.page_count = int(reader.trailer["/Root"]["/Pages"]["/Count"])
+            except Exception:
+                # 読めないファイルの扱いは本処理に任せる（見積もりはサイズから）
+                pass
+
+    estimate.cost = estimate_cost(kind, estimate.size, estimate.object_count)
+    return estimate
+
+
+def preflight_files(file_paths: Iterable[str]) -> List[FileEstimate]:
+    """
+    複数のファイルを事前確認する
+
+    Args:
+        file_paths: 入力ファイルパスのリスト
+
+    Returns:
+        FileEstimate のリスト（入力順）
+    """
+    return [preflight_file(str(path)) for path in file_paths]
+
+
+def estimate_batch_seconds(costs: Iterable[float], workers: Optional[int] = None) -> float:
+    """
+    バッチ全体の処理時間の目安を求める
+
+    process_files と同じく時間のかかるものから順に、空いたワーカーへ割り当てた場合の
+    最後のワーカーが終わるまでの時間です。
+
+    Args:
+        costs: 各ファイルの処理時間の目安（秒）
+        workers: ワーカープロセス数（Noneの場合はCPUコア数）
+
+    Returns:
+        処理時間の目安（秒）
+    """
+    loads = [0.0] * max(1, workers or default_worker_count())
+    for cost in sorted(costs, reverse=True):
+        loads[loads.index(min(loads))] += cost
+    return max(loads)
+
+
+# ============================================================
+# 複数ファイルの並列処理
+# ============================================================
+
+def _quick_cost(file_path: str) -> float:
+    """ファイルサイズだけから求めた処理時間の目安（順番を決めるため。ファイルは開かない）"""
+    kind = FILE_KIND_OFFICE if Path(file_path).suffix.lower() in OFFICE_EXTENSIONS else FILE_KIND_PDF
+    try:
+        return estimate_cost(kind, os.path.getsize(file_path))
+    except OSError:
+        return 0.0
+
+
+def _splits_well(file_path: str) -> bool:
+    """1つの文書を分担して暗号化したほうが速くなる大きさのPDFかどうか（ファイルは開かない）"""
+    if Path(file_path).suffix.lower() != PDF_EXTENSION:
+        return False
+    try:
+        return os.path.getsize(file_path) >= PARALLEL_MIN_BYTES
+    except OSError:
+        return False
+
+
+def default_worker_count() -> int:
+    """
+    バッチ処理のデフォルトのワーカー数を取得
+
+    Returns:
+        CPUコア数（取得できない場合は1）
+    """
+    return os.cpu_count() or 1
+
+
+def _start_shared_converter(stack: contextlib.ExitStack):
+    """
+    ワーカープロセス間で共有する変換プールを起動する
+
+    Word/PowerPointのCOMは1インスタンスを共有するため、ワーカーごとに変換すると失敗しやすい。
+    そのため変換プールはマネージャープロセスに1つだけ作り、各ワーカーからはプロキシ経由で使う。
+
+    Args:
+        stack: 終了処理を登録するExitStack（閉じると変換プールも終了する）
+
+    Returns:
+        変換プールのプロキシ（_init_pool_worker に渡す）
+    """
+    manager = _ConverterManager()
+    manager.start()
+    stack.callback(manager.shutdown)
+    converter_pool = manager.ConverterPool()
+    stack.callback(converter_pool.close)
+    return converter_pool
+
+
+# ワーカープロセスの状態（WorkerPool.state）
+WORKER_COLD = "cold"          # ワーカープロセスが起動していない
+WORKER_WARMING = "warming"    # 起動して pypdf などを読み込んでいる
+WORKER_WARM = "warm"          # すべてのワーカーが読み込みを終えている
+
+# 同時に実行できるバッチの数（取り消しの合図を共有メモリに置く枠の数）
+MAX_POOL_BATCHES = 64
+# 取り消しの合図を確かめる間隔（秒）
+_CANCEL_POLL_INTERVAL = 0.1
+
+# バッチ用ワーカープロセスの共有状態（_init_pool_worker で設定）
+_pool_queue = None
+_pool_cancel_flags = None
+# いま実行しているバッチの進み具合の送り先と取り消しの合図（スレッドごと）
+_local_batch = threading.local()
+
+
+def _warm_up_pdf_stack() -> None:
+    """pypdf と暗号化ライブラリを読み込み、小さなPDFに1度鍵をかけておく（最初のファイルを待たせない）"""
+    if not _load_pypdf():
+        return
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    lock_pdf_bytes(buffer.getvalue(), "warm-up")
+
+
+def _init_pool_worker(converter_pool, pool_queue, cancel_flags, generation: int) -> None:
+    """
+    バッチ用ワーカープロセスの初期化
+
+    親プロセスの変換プール・進み具合の送り先・取り消しの合図を受け取り、
+    PDFの処理に使うライブラリを読み込んでから、準備ができたことを親プロセスへ知らせる。
+    """
+    global _converter_pool, _pool_queue, _pool_cancel_flags
+    _converter_pool = converter_pool
+    _pool_queue = pool_queue
+    _pool_cancel_flags = cancel_flags
+    try:
+        _warm_up_pdf_stack()
+    except Exception:
+        # 読み込めない場合も、実際のファイルの処理でエラーとして返す
+        pass
+    pool_queue.put(("ready", generation, os.getpid()))
+
+
+def _worker_pid() -> int:
+    """ワーカープロセスを起動させるための空のジョブ（WorkerPool.warm）"""
+    return os.getpid()
+
+
+class _CancelFlag:
+    """共有メモリ上の取り消しの合図（ワーカープロセス側。threading.Event の is_set だけを持つ）"""
+
+    def __init__(self, flags, slot: int):
+        self._flags = flags
+        self._slot = slot
+
+    def is_set(self) -> bool:
+        return bool(self._flags[self._slot])
+
+
+def _pool_batch_job(batch_id: int, slot: int, func, *args):
+    """バッチのジョブを実行する（進み具合と取り消しの合図をバッチに結び付ける）"""
+    def send(event: ProgressEvent) -> None:
+        _pool_queue.put((batch_id, event))
+
+    _local_batch.on_progress = send
+    _local_batch.cancel_event = _CancelFlag(_pool_cancel_flags, slot)
+    try:
+        return func(*args)
+    finally:
+        _local_batch.on_progress = _local_batch.cancel_event = None
+
+
+def _process_file_job(
+    file_path: str,
+    password: str,
+    output_dir: Optional[str],
+    output_prefix: str,
+    streaming: bool,
+    use_mmap: bool,
+    keys: Optional[PasswordKeys],
+    timeout: Optional[float] = None,
+    output_name: Optional[str] = None,
+    parallel: int = 1,
+    hash_input: bool = False
+) -> ProcessResult:
+    """process_file を実行し、進み具合をバッチへ送る（バッチ用。引数は process_file を参照）"""
+    on_progress = getattr(_local_batch, "on_progress", None)
+    progress = None
+    if on_progress is not None:
+        def progress(stage: str, done_bytes: int, total_bytes: int) -> None:
+            on_progress(ProgressEvent(file_path, stage, done_bytes, total_bytes))
+    return process_file(
+        file_path, password, output_dir, output_prefix, streaming, use_mmap,
+        keys=keys, progress=progress, cancel_event=getattr(_local_batch, "cancel_event", None), timeout=timeout,
+        output_name=output_name, parallel=parallel, hash_input=hash_input
+    )
+
+
+class PoolBatch:
+    """
+    WorkerPool で実行する1つのバッチ（WorkerPool.open_batch で作る）
+
+    submit() したジョブの進み具合はこのバッチのコールバックだけに届き、
+    cancel_event をセットするとこのバッチのジョブだけが打ち切られます。
+    """
+
+    def __init__(self, pool: "WorkerPool", batch_id: int, slot: int, cancel_event=None):
+        self.pool = pool
+        self.batch_id = batch_id
+        self._slot = slot
+        self._closed = threading.Event()
+        if cancel_event is not None:
+            # 呼び出し側の合図はワーカーへ渡せないので、共有メモリの合図に写す
+            threading.Thread(
+                target=self._watch_cancel, args=(cancel_event,), name="batch-cancel", daemon=True
+            ).start()
+
+    def _watch_cancel(self, cancel_event) -> None:
+        while not self._closed.is_set():
+            if cancel_event.wait(_CANCEL_POLL_INTERVAL):
+                self.cancel()
+                return
+
+    def submit(self, func, *args) -> Future:
+        """
+        ジョブを依頼する
+
+        Args:
+            func: ワーカーで実行する関数（トップレベル関数であること）
+            *args: funcに渡す引数
+
+        Returns:
+            Future
+        """
+        return self.pool.submit(_pool_batch_job, self.batch_id, self._slot, func, *args)
+
+    def cancel(self) -> None:
+        """このバッチの処理中・順番待ちのジョブを打ち切る"""
+        self.pool._cancel_flags[self._slot] = 1
+
+    def close(self) -> None:
+        """バッチを終える（このあとに届いた進み具合は捨てる）"""
+        if not self._closed.is_set():
+            self._closed.set()
+            self.pool._close_batch(self.batch_id, self._slot)
+
+    def __enter__(self) -> "PoolBatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class WorkerPool:
+    """
+    常駐するバッチ処理用ワーカープロセスのプール
+
+    各ワーカーは起動時に pypdf と暗号化ライブラリを読み込み、小さなPDFに1度鍵をかけてから
+    ジョブを待ちます。GUI・Webアプリ・フォルダ監視のバッチで同じプールを使い回すため、
+    2回目以降のバッチではワーカーの起動とライブラリの読み込みを待ちません。
+    Office文書の変換はマネージャープロセスの変換プールを全ワーカーで共有します
+    （Word/PowerPointのCOMは1インスタンスを共有するため）。
+    ワーカーが異常終了してプールが使えなくなった場合は、次のジョブで作り直します。
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: ワーカープロセス数（Noneの場合はCPUコア数）
+        """
+        self.workers = workers or default_worker_count()
+        self._lock = threading.Lock()
+        self._ready_changed = threading.Condition(self._lock)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stack: Optional[contextlib.ExitStack] = None
+        self._converter_pool = None
+        self._queue = None
+        self._cancel_flags = None
+        self._relay: Optional[threading.Thread] = None
+        # 作り直すたびに増やす（古いプールのワーカーからの知らせを数えないように）
+        self._generation = 0
+        self._ready: set = set()
+        self._started_at = 0.0
+        self._batch_ids = 0
+        self._routes: Dict[int, Optional[ProgressEventCallback]] = {}
+        self._free_slots = list(range(MAX_POOL_BATCHES))
+        self._closed = False
+
+    @property
+    def state(self) -> str:
+        """ワーカーの状態（WORKER_COLD / WORKER_WARMING / WORKER_WARM）"""
+        with self._lock:
+            if self._executor is None:
+                return WORKER_COLD
+            return WORKER_WARM if len(self._ready) >= self.workers else WORKER_WARMING
+
+    @property
+    def ready_workers(self) -> int:
+        """ライブラリの読み込みを終えて待機しているワーカーの数"""
+        with self._lock:
+            return len(self._ready) if self._executor is not None else 0
+
+    def _start(self) -> None:
+        """ワーカーのプールを起動する（ロックを持って呼ぶ）"""
+        if self._closed:
+            raise RuntimeError("ワーカープールは終了しています")
+        if self._stack is None:
+            self._stack = contextlib.ExitStack()
+            self._converter_pool = _start_shared_converter(self._stack)
+            self._queue = multiprocessing.Queue()
+            self._cancel_flags = multiprocessing.Array("b", MAX_POOL_BATCHES, lock=False)
+            self._relay = threading.Thread(target=self._run_relay, name="worker-pool-relay", daemon=True)
+            self._relay.start()
+        self._generation += 1
+        self._ready = set()
+        self._started_at = time.monotonic()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_pool_worker,
+            initargs=(self._converter_pool, self._queue, self._cancel_flags, self._generation)
+        )
+        logger.info("Starting worker pool (%d workers)", self.workers)
+
+    def _run_relay(self) -> None:
+        """ワーカーからの知らせ（準備完了・進み具合）を受け取る"""
+        while True:
+            message = self._queue.get()
+            if message is None:
+                return
+            if message[0] == "ready":
+                _, generation, pid = message
+                with self._lock:
+                    if generation != self._generation:
+                        continue
+                    self._ready.add(pid)
+                    if len(self._ready) == self.workers:
+                        logger.info(
+                            "Worker pool warm: %d workers in %.2fs",
+                            self.workers, time.monotonic() - self._started_at
+                        )
+                    self._ready_changed.notify_all()
+                continue
+            batch_id, event = message
+            with self._lock:
+                callback = self._routes.get(batch_id)
+            if callback is not None:
+                try:
+                    callback(event)
+                except Exception:
+                    pass
+
+    def warm(self, timeout: Optional[float] = 0) -> bool:
+        """
+        ワーカーを起動してライブラリを読み込ませておく
+
+        Args:
+            timeout: すべてのワーカーの準備ができるまで待つ時間（秒。0の場合は待たない、Noneの場合は無制限）
+
+        Returns:
+            すべてのワーカーの準備ができている場合True
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            executor = self._executor
+        # 使うときに起動する方式（Windowsなど）でも全ワーカーが起動するよう、ワーカー数だけ空のジョブを渡す
+        for _ in range(self.workers):
+            executor.submit(_worker_pid)
+        with self._lock:
+            return self._ready_changed.wait_for(lambda: len(self._ready) >= self.workers, timeout)
+
+    def ensure_workers(self, workers: int) -> None:
+        """ワーカーを workers 個以上にする（足りない場合はプールを作り直す。処理中のジョブはそのまま続く）"""
+        with self._lock:
+            if workers <= self.workers:
+                return
+            self.workers = workers
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._start()
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """
+        ジョブを依頼する（プールが起動していなければ起動する。ProcessPoolExecutor.submit と同じ使い方）
+
+        Args:
+            func: ワーカーで実行する関数（トップレベル関数であること）
+            *args: funcに渡す引数
+            **kwargs: funcに渡すキーワード引数
+
+        Returns:
+            Future
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            try:
+                return self._executor.submit(func, *args, **kwargs)
+            except BrokenProcessPool:
+                logger.warning("Worker pool broken, restarting")
+                self._executor.shutdown(wait=False)
+                self._start()
+                return self._executor.submit(func, *args, **kwargs)
+
+    def open_batch(self, on_progress: Optional[ProgressEventCallback] = None, cancel_event=None) -> PoolBatch:
+        """
+        バッチを始める
+
+        Args:
+            on_progress: このバッチのジョブの進み具合（ProgressEvent）を受け取るコールバック
+                （"worker-pool-relay" スレッドから呼ばれます）
+            cancel_event: セットするとこのバッチのジョブを打ち切る（threading.Event または multiprocessing.Event）
+
+        Returns:
+            PoolBatch（終わったら close() するか with 文で使う）
+        """
+        with self._lock:
+            if self._executor is None:
+                self._start()
+            if not self._free_slots:
+                raise RuntimeError(f"同時に実行できるバッチは{MAX_POOL_BATCHES}個までです")
+            slot = self._free_slots.pop()
+            self._cancel_flags[slot] = 0
+            self._batch_ids += 1
+            batch_id = self._batch_ids
+            self._routes[batch_id] = on_progress
+        return PoolBatch(self, batch_id, slot, cancel_event)
+
+    def _close_batch(self, batch_id: int, slot: int) -> None:
+        with self._lock:
+            self._routes.pop(batch_id, None)
+            self._free_slots.append(slot)
+
+    def close(self) -> None:
+        """ワーカーと変換プールを終了する（処理中のジョブが終わるまで待つ）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if self._stack is not None:
+            self._queue.put(None)
+            self._relay.join()
+            self._stack.close()
+
+
+# このプロセスで使い回すワーカープール（get_worker_pool）
+_worker_pool: Optional[WorkerPool] = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool(workers: Optional[int] = None) -> WorkerPool:
+    """
+    このプロセスで使い回すワーカープールを取得（初回に作成。ワーカーは最初のジョブか warm() で起動）
+
+    Args:
+        workers: 必要なワーカー数（Noneの場合はCPUコア数。今のプールより多い場合は増やす）
+
+    Returns:
+        WorkerPool
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool(workers or default_worker_count())
+            # ジョブキュー（exitpriority=20）より後、変換プール（10）より先に止める
+            Finalize(_worker_pool, _worker_pool.close, exitpriority=15)
+        elif workers is not None:
+            _worker_pool.ensure_workers(workers)
+        return _worker_pool
+
+
+def _process_uploaded_bytes(
+    filename: str,
+    data: bytes,
+    password: str,
+    keys: Optional[PasswordKeys] = None
+) -> Tuple[str, bool, bytes, str]:
+    """アップロードされたバイトデータを処理し、進み具合をバッチへ送る（ワーカープロセス用）"""
+    on_progress = getattr(_local_batch, "on_progress", None)
+    progress = None
+    if on_progress is not None:
+        def progress(stage: str, done_bytes: int, total_bytes: int) -> None:
+            on_progress(ProgressEvent(filename, stage, done_bytes, total_bytes))
+    success, locked_bytes, error_msg = process_uploaded_file(
+        io.BytesIO(data), filename, password, keys=keys,
+        progress=progress, cancel_event=getattr(_local_batch, "cancel_event", None)
+    )
+    return filename, success, locked_bytes, error_msg
+
+
+def _run_batch(
+    func,
+    jobs: List[tuple],
+    workers: Optional[int],
+    ordered: bool,
+    on_error,
+    on_progress: Optional[ProgressEventCallback] = None,
+    cancel_event=None
+) -> Iterator:
+    """
+    ジョブをワーカープール（get_worker_pool）に振り分けて、終わったものから結果を返す
+
+    ワーカーに渡すのは同時に workers 件までで、1件終わるごとに次のジョブを渡します
+    （取り消したときや、途中で打ち切ったときに順番待ちが残らないように）。
+
+    Args:
+        func: 各ジョブで実行する関数（トップレベル関数であること）
+        jobs: funcに渡す引数のタプルのリスト
+        workers: 同時に処理する数（Noneの場合はCPUコア数）
+        ordered: Trueの場合は入力順に結果を返す
+        on_error: ワーカーが異常終了した場合に (ジョブ, 例外) から結果を作る関数
+        on_progress: _process_file_job・_process_uploaded_bytes の進み具合を受け取るコールバック（省略可）
+        cancel_event: _process_file_job・_process_uploaded_bytes が確かめる取り消しの合図（省略可）
+
+    Yields:
+        funcの戻り値
+    """
+    if workers is None:
+        workers = default_worker_count()
+    workers = max(1, min(workers, len(jobs)))
+
+    # 1プロセスで足りる場合はワーカーを使わずにその場で処理
+    if workers == 1:
+        for job in jobs:
+            _local_batch.on_progress = on_progress
+            _local_batch.cancel_event = cancel_event
+            try:
+                result = func(*job)
+            finally:
+                _local_batch.on_progress = _local_batch.cancel_event = None
+            yield result
+        return
+
+    pending = iter(jobs)
+    running: Dict[Future, tuple] = {}
+    order: "collections.deque[Future]" = collections.deque()
+    with get_worker_pool(workers).open_batch(on_progress, cancel_event) as batch:
+        def submit_next() -> None:
+            job = next(pending, None)
+            if job is not None:
+                future = batch.submit(func, *job)
+                running[future] = job
+                order.append(future)
+
+        for _ in range(workers):
+            submit_next()
+        try:
+            while running:
+                if ordered:
+                    done = [order[0]]
+                    wait(done)
+                else:
+                    done = wait(running, return_when=FIRST_COMPLETED).done
+                for future in done:
+                    job = running.pop(future)
+                    order.remove(future)
+                    submit_next()
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = on_error(job, e)
+                    yield result
+        finally:
+            # 途中で打ち切られた場合は未着手のジョブを取り消す
+            for future in running:
+                future.cancel()
+
+
+def mirrored_output_dir(file_path: str, output_dir: Optional[str], relative_to: Optional[str]) -> Optional[str]:
+    """
+    フォルダ構成を写す場合の出力ディレクトリを求める
+
+    Args:
+        file_path: 入力ファイルパス
+        output_dir: 出力ディレクトリ
+        relative_to: 入力側の基準ディレクトリ（Noneの場合は output_dir をそのまま返す）
+
+    Returns:
+        出力ディレクトリ（例: relative_to/a/b/x.pdf → output_dir/a/b）
+    """
+    if output_dir is None or relative_to is None:
+        return output_dir
+    return str(Path(output_dir) / Path(file_path).parent.relative_to(relative_to))
+
+
+def process_files(
+    file_paths: Iterable[str],
+    password: str,
+    output_dir: Optional[str] = None,
+    output_prefix: str = "鍵付き_",
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    streaming: bool = False,
+    use_mmap: bool = False,
+    on_stats: Optional[StatsCallback] = None,
+    relative_to: Optional[str] = None,
+    estimates: Optional[Iterable[FileEstimate]] = None,
+    on_progress: Optional[ProgressEventCallback] = None,
+    cancel_event=None,
+    file_timeout: Optional[float] = None,
+    output_paths: Optional[Dict[str, Path]] = None,
+    parallel: Optional[int] = None,
+    hash_inputs: bool = False
+) -> Iterator[ProcessResult]:
+    """
+    複数のファイルをワーカープール（get_worker_pool）で並列に処理
+
+    各ファイルは process_file と同じ処理を別プロセスで行います。ワーカーはバッチの後も
+    残るため、2回目以降のバッチではワーカーの起動とライブラリの読み込みを待ちません。
+    結果は終わったものから順に返すので、進捗表示にそのまま使えます。
+    入力順に返す必要がない場合は、時間のかかりそうなファイルから順にワーカーへ渡します。
+
+    Args:
+        file_paths: 入力ファイルパスのリスト
+        password: 設定するパスワード
+        output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じ場所）
+        output_prefix: 出力ファイル名のプレフィックス
+        workers: 同時に処理する数（Noneの場合はCPUコア数。1の場合はこのプロセスで処理）
+        ordered: Trueの場合は入力順に結果を返す
+        streaming: Trueの場合はストリーミングで暗号化（大きなPDF向け）
+        use_mmap: Trueの場合は入力PDFをメモリマップで開く
+        on_stats: 処理段階ごとの記録を受け取るコールバック（このプロセスで呼ばれます）
+        relative_to: 指定した場合、このディレクトリからの相対パスと同じ構成で
+            output_dir の下に出力する（フォルダ構成をそのまま写す）
+        estimates: preflight_files の結果（順番を決めるのに使う。省略時はファイルサイズから見積もる）
+        on_progress: 処理中のファイルの進み具合（ProgressEvent）を受け取るコールバック。
+            別スレッド（workers=1の場合は処理中のスレッド）から呼ばれ、ファイルの結果より後に届くこともあります
+        cancel_event: セットすると処理を打ち切る（threading.Event または multiprocessing.Event）。処理中のファイルは
+            途中で止め、まだ始めていないファイルは始めずに、どちらも cancelled の結果を返します
+            （Office文書の変換中の場合は、変換が終わるか制限時間を過ぎるまで待ちます）
+        file_timeout: 1ファイルあたりの制限時間（秒）。過ぎたファイルは timed_out の結果を返します
+        output_paths: 事前に決めた出力先（plan_output_paths の結果）。省略時は file_paths から決めます。
+            同じ出力先になるファイル（a.pdf と a.docx など）は番号付きの名前で別々に出力します
+        parallel: PARALLEL_MIN_BYTES 以上のPDFを分担して暗号化するプロセス数（1で無効）。
+            Noneの場合はファイル数が workers より少ないときに、余ったワーカーの分だけ自動で分担します
+        hash_inputs: Trueの場合は成功したファイルの入力のSHA-256をワーカーで求めて input_sha256 に入れる
+            （BatchManifest.record で使う）
+
+    Yields:
+        ProcessResult: 各ファイルの処理結果
+    """
+    file_paths = [str(path) for path in file_paths]
+    if output_paths is None:
+        output_paths = plan_output_paths(file_paths, output_dir, output_prefix, relative_to)
+    # パスワードからの鍵の導出はバッチ全体で1度だけ行う
+    keys = derive_password_keys(password)
+    jobs = []
+    rejected = []
+    for path in file_paths:
+        # すでに鍵がかかっているPDFなどはワーカーに渡す前に見分けて、先に結果を返す
+        # （入力順に返す場合は順番が変わるため、ワーカー側の確認に任せる）
+        if not ordered and Path(path).suffix.lower() == PDF_EXTENSION:
+            ok, error_msg = prescan_pdf_file(str(path))
+            if not ok:
+                rejected.append(ProcessResult(
+                    success=False,
+                    error_message=error_msg,
+                    original_filename=Path(path).name,
+                    input_path=str(path)
+                ))
+                continue
+        output_path = Path(output_paths[path])
+        if relative_to is not None:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        jobs.append((
+            path, password, str(output_path.parent), output_prefix, streaming, use_mmap, keys, file_timeout,
+            output_path.name
+        ))
+    yield from rejected
+
+    if parallel is None:
+        # ファイル数よりワーカーが多い場合は、余ったワーカーで大きなPDFを分担して暗号化する
+        parallel = (workers or default_worker_count()) // max(1, len(jobs))
+    jobs = [job + (parallel if _splits_well(job[0]) else 1, hash_inputs) for job in jobs]
+
+    if not ordered:
+        # 時間のかかるものから順に渡す（最後に大きなファイルだけが残って待たされないように）
+        costs = {estimate.path: estimate.cost for estimate in estimates or ()}
+        jobs.sort(key=lambda job: costs[job[0]] if job[0] in costs else _quick_cost(job[0]), reverse=True)
+
+    def on_error(job, error):
         return ProcessResult(
             success=False,
-            error_message=f"予期しないエラー: {str(e)}",
-            original_filename=original_path.name
+            error_message=f"予期しないエラー: {str(error)}",
+            original_filename=Path(job[0]).name,
+            input_path=job[0]
         )
 
+    for result in _run_batch(_process_file_job, jobs, workers, ordered, on_error, on_progress, cancel_event):
+        if on_stats is not None and result.stats is not None:
+            on_stats(result.original_filename, result.stats)
+        yield result
 
-def process_uploaded_file(
-    uploaded_file: BinaryIO,
-    filename: str,
-    password: str
-) -> Tuple[bool, bytes, str]:
+
+def process_uploaded_files(
+    uploaded_files: Iterable[Tuple[str, bytes]],
+    password: str,
+    workers: Optional[int] = None,
+    ordered: bool = False,
+    on_progress: Optional[ProgressEventCallback] = None,
+    cancel_event=None
+) -> Iterator[Tuple[str, bool, bytes, str]]:
     """
-    アップロードされたファイルを処理（Webアプリ用）
+    アップロードされた複数のファイルをワーカープール（get_worker_pool）で並列に処理（Webアプリ用）
 
     Args:
-        uploaded_file: アップロードされたファイルオブジェクト
-        filename: 元のファイル名
+        uploaded_files: (ファイル名, バイトデータ) のリスト
         password: 設定するパスワード
+        workers: 同時に処理する数（Noneの場合はCPUコア数）
+        ordered: Trueの場合は入力順に結果を返す
+        on_progress: 処理中のファイルの進み具合（ProgressEvent。input_path はファイル名）を受け取るコールバック
+            （process_files を参照）
+        cancel_event: セットすると処理を打ち切る（threading.Event または multiprocessing.Event）。
+            打ち切ったファイルはエラーメッセージが CANCELLED_MESSAGE の結果を返します
+
+    Yields:
+        (ファイル名, 成功フラグ, 暗号化されたPDFバイト, エラーメッセージ)
+    """
+    keys = derive_password_keys(password)
+    jobs = [(filename, data, password, keys) for filename, data in uploaded_files]
+
+    def on_error(job, error):
+        return job[0], False, b"", f"予期しないエラー: {str(error)}"
+
+    yield from _run_batch(_process_uploaded_bytes, jobs, workers, ordered, on_error, on_progress, cancel_event)
+
+
+def _unique_name(name: str, used: set) -> str:
+    """ZIP内で重複しない名前にする（例: 鍵付き_a.pdf → 鍵付き_a (2).pdf）"""
+    candidate = name
+    number = 2
+    while candidate in used:
+        candidate = f"{Path(name).stem} ({number}){Path(name).suffix}"
+        number += 1
+    used.add(candidate)
+    return candidate
+
+
+def write_results_zip(
+    results: Iterable[Tuple[str, Optional[ProcessResult]]],
+    zip_path: str,
+    report_name: str = "処理結果.csv"
+) -> int:
+    """
+    処理済みのPDFを1つのZIPファイルにまとめる
+
+    PDFは1つずつディスクから書き込むため、全体をメモリに読み込むことはありません。
+    処理できなかったファイルがある場合は、ファイルごとの結果をCSVで同梱します。
+
+    Args:
+        results: (元のファイル名, 処理結果) のリスト（取り消されたものは処理結果がNone）
+        zip_path: 出力するZIPファイルのパス
+        report_name: 結果一覧のCSVのファイル名
 
     Returns:
-        (成功フラグ, 暗号化されたPDFバイト, エラーメッセージ)
+        ZIPに入れたPDFの数
     """
-    file_ext = Path(filename).suffix.lower()
+    used = set()
+    rows = []
+    added = 0
+    # 暗号化したPDFはほとんど圧縮できないので、圧縮せずに格納する
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for filename, result in results:
+            if result is None:
+                rows.append((filename, "取り消し", ""))
+            elif result.success:
+                zf.write(result.output_path, _unique_name(Path(result.output_path).name, used))
+                rows.append((filename, "成功", ""))
+                added += 1
+            else:
+                rows.append((filename, "失敗", result.error_message.replace("\n", " ")))
 
-    # PDFの場合は直接処理
-    if file_ext == '.pdf':
-        pdf_bytes = uploaded_file.read()
-        return lock_pdf_bytes(pdf_bytes, password)
+        if any(status != "成功" for _, status, _ in rows):
+            report = io.StringIO()
+            writer = csv.writer(report)
+            writer.writerow(["ファイル名", "結果", "内容"])
+            writer.writerows(rows)
+            # Excelで文字化けしないようBOM付きUTF-8で保存
+            zf.writestr(_unique_name(report_name, used), report.getvalue().encode("utf-8-sig"))
+    return added
 
-    # Office文書の場合は一時ファイル経由で変換
-    elif file_ext in OFFICE_EXTENSIONS:
-        temp_dir = None
-        try:
-            temp_dir = tempfile.mkdtemp()
 
-            # 入力ファイルを一時保存
-            input_temp = Path(temp_dir) / filename
-            with open(input_temp, 'wb') as f:
-                f.write(uploaded_file.read())
+# ============================================================
+# バックグラウンドのジョブキュー（Webアプリ用）
+# ============================================================
 
-            # PDFに変換
-            pdf_temp = Path(temp_dir) / f"{Path(filename).stem}.pdf"
-            success, error_msg = convert_office_to_pdf(str(input_temp), str(pdf_temp))
+# ジョブの状態
+JOB_QUEUED = "queued"          # 順番待ち
+JOB_RUNNING = "running"        # 処理中
+JOB_DONE = "done"              # 成功
+JOB_FAILED = "failed"          # 失敗
+JOB_CANCELLED = "cancelled"    # 取り消し
+JOB_FINISHED_STATES = {JOB_DONE, JOB_FAILED, JOB_CANCELLED}
 
-            if not success:
-                return False, b"", error_msg
+# 終わったジョブの結果を残しておく時間（秒）
+DEFAULT_JOB_RESULT_TTL = 3600.0
 
-            # 変換されたPDFを読み込んでパスワード設定
-            with open(pdf_temp, 'rb') as f:
-                pdf_bytes = f.read()
 
-            return lock_pdf_bytes(pdf_bytes, password)
+@dataclass
+class Job:
+    """バックグラウンドで処理するジョブ1件分の情報"""
+    job_id: str
+    filename: str
+    input_size: int = 0
+    state: str = JOB_QUEUED
+    submitted_at: float = 0.0
+    finished_at: Optional[float] = None
+    result: Optional[ProcessResult] = None
+    stage: str = ""             # 処理中の段階（STAGE_READ など）
+    progress: float = 0.0       # 進み具合（0.0〜1.0）
 
-        finally:
-            if temp_dir:
-                shutil.rmtree(temp_dir, ignore_errors=True)
+    @property
+    def finished(self) -> bool:
+        return self.state in JOB_FINISHED_STATES
 
-    else:
-        return False, b"", f"未対応のファイル形式です: {file_ext}"
+    @property
+    def elapsed(self) -> float:
+        """受け付けてからの経過時間（終わったジョブは終わるまでの時間）"""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.submitted_at
+
+
+# ジョブが終わったときに呼ばれるコールバック
+JobCallback = Callable[[Job], None]
+
+
+class JobQueue:
+    """
+    ファイルを受け付けてワーカープール（get_worker_pool）で処理するジョブキュー
+
+    submit() はファイルを一時フォルダに保存してすぐに戻るので、呼び出し側は
+    status() で状態を確認し、終わったら result.output_path から結果を読み込みます。
+    結果のファイルは discard() を呼ぶか、result_ttl 秒が過ぎると削除されます。
+    すべてのメソッドは複数のスレッドから呼び出せます。
+
+    ワーカーに渡すのは同時に workers 件までで、ジョブごとにバッチ（PoolBatch）を開くため、
+    cancel() で処理中のジョブも1件ずつ打ち切れます。
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        streaming: bool = True,
+        result_ttl: float = DEFAULT_JOB_RESULT_TTL,
+        on_complete: Optional[JobCallback] = None,
+        file_timeout: Optional[float] = None
+    ):
+        """
+        Args:
+            workers: ワーカープロセス数（Noneの場合はCPUコア数。ワーカーは get_worker_pool と共有します）
+            streaming: Trueの場合はストリーミングで暗号化（メモリ使用量を抑える）
+            result_ttl: 終わったジョブの結果を残しておく時間（秒）
+            on_complete: ジョブが終わったときに呼ばれるコールバック（別スレッドから呼ばれます）
+            file_timeout: 1ファイルあたりの制限時間（秒。Noneの場合は制限なし）
+        """
+        self.workers = workers or default_worker_count()
+        self.streaming = streaming
+        self.result_ttl = result_ttl
+        self.file_timeout = file_timeout
+        self.on_complete = on_complete
+        self._root = Path(tempfile.mkdtemp(prefix="pdf_locker_jobs_"))
+        self._jobs: Dict[str, Job] = {}
+        # ワーカーに渡す前のジョブ（ジョブIDの順番と _process_file_job の引数）
+        self._waiting: "collections.deque[str]" = collections.deque()
+        self._job_args: Dict[str, tuple] = {}
+        # ワーカーに渡したジョブ（ジョブごとのバッチとFuture）
+        self._batches: Dict[str, PoolBatch] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._pool = get_worker_pool(self.workers)
+        # 最初の利用者を待たせないよう、ワーカーを先に起動しておく
+        self._pool.warm()
+        Finalize(self, self.shutdown, exitpriority=20)
+
+    def submit(
+        self,
+        source: BinaryIO,
+        filename: str,
+        password: str,
+        keys: Optional[PasswordKeys] = None
+    ) -> str:
+        """
+        ファイルを受け付ける
+
+        Args:
+            source: 入力ファイルのデータ（少しずつ一時フォルダに書き出します）
+            filename: 元のファイル名
+            password: 設定するパスワード
+            keys: パスワードから導出済みの鍵情報（同じパスワードで複数のファイルを受け付ける場合）
+
+        Returns:
+            ジョブID
+        """
+        self._expire()
+
+        job_id = uuid.uuid4().hex
+        job_dir = self._root / job_id
+        job_dir.mkdir()
+        name = Path(filename).name
+        input_path = job_dir / name
+        with open(input_path, 'wb') as f:
+            shutil.copyfileobj(source, f)
+
+        job = Job(
+            job_id=job_id,
+            filename=name,
+            input_size=input_path.stat().st_size,
+            submitted_at=time.monotonic()
+        )
+        with self._lock:
+            self._jobs[job_id] = job
+            self._job_args[job_id] = (
+                str(input_path), password, str(job_dir), "鍵付き_", self.streaming, False, keys, self.file_timeout
+            )
+            self._waiting.append(job_id)
+        self._dispatch()
+        return job_id
+
+    def _dispatch(self) -> None:
+        """ワーカーの空きの分だけ、順番待ちのジョブをワーカーに渡す"""
+        started = []
+        with self._lock:
+            while self._waiting and len(self._batches) < self.workers:
+                job_id = self._waiting.popleft()
+                batch = self._pool.open_batch(self._on_progress)
+                self._batches[job_id] = batch
+                future = batch.submit(_process_file_job, *self._job_args.pop(job_id))
+                self._futures[job_id] = future
+                started.append((job_id, future))
+        # すでに終わっていればその場で _finish が呼ばれるので、ロックを放してから登録する
+        for job_id, future in started:
+            future.add_done_callback(lambda f, job_id=job_id: self._finish(job_id, f))
+
+    def _on_progress(self, event: ProgressEvent) -> None:
+        """ワーカーから届いた進み具合をジョブに記録する（入力ファイルはジョブIDのフォルダにある）"""
+        with self._lock:
+            job = self._jobs.get(Path(event.input_path).parent.name)
+            # 結果より後に届いたものは無視する
+            if job is None or job.finished:
+                return
+            job.stage = event.stage
+            job.progress = event.fraction
+
+    def _finish(self, job_id: str, future: Future) -> None:
+        """ジョブが終わったときの処理（プールの管理スレッドから呼ばれる）"""
+        with self._lock:
+            batch = self._batches.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if future.cancelled():
+                    job.state = JOB_CANCELLED
+                else:
+                    try:
+                        job.result = future.result()
+                    except Exception as e:
+                        job.result = ProcessResult(
+                            success=False,
+                            error_message=f"予期しないエラー: {str(e)}",
+                            original_filename=job.filename
+                        )
+                    if job.result.cancelled:
+                        job.state = JOB_CANCELLED
+                    else:
+                        job.state = JOB_DONE if job.result.success else JOB_FAILED
+                    job.progress = 1.0
+                job.finished_at = time.monotonic()
+                snapshot = replace(job)
+        if batch is not None:
+            batch.close()
+        # 空いたワーカーに次のジョブを渡す
+        self._dispatch()
+        if job is not None:
+            self._notify(snapshot)
+
+    def _notify(self, snapshot: Job) -> None:
+        """on_complete を呼ぶ（コールバックの例外はジョブの処理に影響させない）"""
+        if self.on_complete is not None:
+            try:
+                self.on_complete(snapshot)
+            except Exception:
+                pass
+
+    def status(self, job_id: str) -> Optional[Job]:
+        """
+        ジョブの状態を取得
+
+        Returns:
+            ジョブ情報の写し（見つからない場合はNone）
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = replace(job)
+            future = self._futures.get(job_id)
+            if snapshot.state == JOB_QUEUED and future is not None and future.running():
+                snapshot.state = JOB_RUNNING
+            return snapshot
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        ジョブを取り消す
+
+        順番待ちのジョブはその場で取り消し、処理中のジョブにはそのジョブだけの取り消しの合図を送ります
+        （処理中のジョブは打ち切られてから JOB_CANCELLED になります）。
+
+        Returns:
+            取り消しを受け付けた場合True（見つからない場合や、すでに終わっている場合はFalse）
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            batch = self._batches.get(job_id)
+            if batch is None:
+                # まだワーカーに渡していない
+                self._waiting.remove(job_id)
+                self._job_args.pop(job_id, None)
+                job.state = JOB_CANCELLED
+                job.finished_at = time.monotonic()
+                snapshot = replace(job)
+            else:
+                future = self._futures[job_id]
+        if batch is None:
+            self._notify(snapshot)
+            return True
+        # プールの順番待ちならそのまま取り消し、処理中なら打ち切らせる
+        if not future.cancel():
+            batch.cancel()
+        return True
+
+    def discard(self, job_id: str) -> None:
+        """ジョブを取り消し、一時ファイルと記録を削除する"""
+        self.cancel(job_id)
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._jobs.pop(job_id, None)
+        shutil.rmtree(self._root / job_id, ignore_errors=True)
+
+    def make_archive(self, job_ids: List[str], zip_name: str = "鍵付きPDF.zip") -> Optional[str]:
+        """
+        終わったジョブの結果を1つのZIPファイルにまとめる（write_results_zip）
+
+        ZIPは最初のジョブの一時フォルダに作るため、そのジョブと一緒に削除されます。
+
+        Args:
+            job_ids: ジョブIDのリスト（すべて終わっていること）
+            zip_name: ZIPファイル名
+
+        Returns:
+            ZIPファイルのパス（ジョブが見つからない場合はNone）
+        """
+        jobs = [self.status(job_id) for job_id in job_ids]
+        if not jobs or any(job is None or not job.finished for job in jobs):
+            return None
+        zip_path = self._root / job_ids[0] / zip_name
+        if not zip_path.exists():
+            temp_path = zip_path.with_suffix(".part")
+            write_results_zip([(job.filename, job.result) for job in jobs], str(temp_path))
+            os.replace(temp_path, zip_path)
+        return str(zip_path)
+
+    def active_count(self) -> int:
+        """順番待ち・処理中のジョブの件数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _expire(self) -> None:
+        """保存期間を過ぎたジョブを削除する"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and now - job.finished_at > self.result_ttl
+            ]
+        for job_id in expired:
+            self.discard(job_id)
+
+    def shutdown(self) -> None:
+        """順番待ちのジョブを取り消し、処理中のジョブが終わってから一時ファイルをすべて削除する"""
+        with self._lock:
+            self._waiting.clear()
+            self._job_args.clear()
+            futures = list(self._futures.values())
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        shutil.rmtree(self._root, ignore_errors=True)
 
 
 def get_default_output_dir() -> Path:
@@ -455,3 +3742,433 @@ def get_default_output_dir() -> Path:
     output_dir = Path.home() / "Desktop" / "パスワード付きPDF"
     output_dir.mkdir(parents=True, exist_ok=True)
     return output_dir
+
+
+# ============================================================
+# バッチ処理の記録（マニフェスト）
+# ============================================================
+
+# マニフェストに保存するパスワード確認用ハッシュの反復回数
+_MANIFEST_PBKDF2_ITERATIONS = 200_000
+
+
+def _password_check(password: str, salt: bytes) -> str:
+    """パスワードの確認用ハッシュ（パスワードそのものは保存しない）"""
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, _MANIFEST_PBKDF2_ITERATIONS).hex()
+
+
+class BatchManifest:
+    """
+    バッチ処理の記録（JSON Lines形式で、1ファイル処理するごとに追記）
+
+    入力ファイルのパス・サイズ・更新日時・SHA-256と出力ファイルを記録しておき、
+    途中で止まったバッチをやり直すときに、入力も出力も変わっていないファイルを飛ばします。
+
+    パスワードを変えてやり直した場合は、前回までの記録は使いません
+    （記録にはパスワードの確認用ハッシュのみを保存します）。
+    """
+
+    def __init__(self, path: str, password: str):
+        """
+        Args:
+            path: マニフェストファイルのパス（なければ作成）
+            password: 今回のバッチで設定するパスワード
+        """
+        self.path = Path(path)
+        self._records: Dict[str, dict] = {}
+        self._salt: Optional[bytes] = None
+        self._load(password)
+
+        if self._salt is None:
+            self._salt = os.urandom(16)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not self._ends_with_newline():
+            # 前回が行の途中で止まっていた場合は、その行と混ざらないよう改行する
+            self._file.write("\n")
+        self._append({
+            "type": "batch",
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "salt": self._salt.hex(),
+            "password_check": _password_check(password, self._salt),
+        })
+
+    def _load(self, password: str) -> None:
+        """これまでの記録を読み込む（同じパスワードで処理したものだけ）"""
+        if not self.path.exists():
+            return
+        checks: Dict[str, str] = {}
+        current_matches = False
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 書き込み途中で止まった行（次のバッチの開始行までの記録は使わない）
+                    current_matches = False
+                    continue
+                if entry.get("type") == "batch":
+                    salt = entry.get("salt", "")
+                    if self._salt is None:
+                        self._salt = bytes.fromhex(salt)
+                    if salt not in checks:
+                        checks[salt] = _password_check(password, bytes.fromhex(salt))
+                    current_matches = entry.get("password_check") == checks[salt]
+                elif entry.get("type") == "file" and current_matches:
+                    self._records[entry["input"]] = entry
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(0, io.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, io.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _append(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    @staticmethod
+    def _key(input_path: str) -> str:
+        return str(Path(input_path).resolve())
+
+    def is_complete(self, input_path: str, output_path: str) -> bool:
+        """
+        前回までに処理済みで、入力も出力も変わっていないかどうか
+
+        入力のサイズと更新日時が同じなら変わっていないとみなし、
+        更新日時だけが変わっている場合はSHA-256で確認します。
+
+        Args:
+            input_path: 入力ファイルパス
+            output_path: 出力ファイルパス
+
+        Returns:
+            飛ばしてよい場合True
+        """
+        record = self._records.get(self._key(input_path))
+        if record is None or record.get("status") != "success" or record.get("output") != str(output_path):
+            return False
+        try:
+            input_stat = os.stat(input_path)
+            output_stat = os.stat(output_path)
+        except OSError:
+            return False
+        if (output_stat.st_size, output_stat.st_mtime_ns) != (record.get("output_size"), record.get("output_mtime_ns")):
+            return False
+        if input_stat.st_size != record.get("size"):
+            return False
+        if input_stat.st_mtime_ns == record.get("mtime_ns"):
+            return True
+        try:
+            return file_sha256(input_path) == record.get("sha256")
+        except OSError:
+            return False
+
+    def record(self, result: ProcessResult) -> None:
+        """
+        1ファイル分の処理結果を追記する
+
+        Args:
+            result: process_file（process_files）の処理結果
+        """
+        entry = {
+            "type": "file",
+            "input": self._key(result.input_path),
+            "output": result.output_path,
+            "status": "success" if result.success else "failed",
+            "error": result.error_message or None,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        try:
+            input_stat = os.stat(result.input_path)
+            entry.update(size=input_stat.st_size, mtime_ns=input_stat.st_mtime_ns)
+            if result.success:
+                output_stat = os.stat(result.output_path)
+                entry.update(
+                    # ワーカーで求めたもの（process_files(hash_inputs=True)）があればそれを使う
+                    sha256=result.input_sha256 or file_sha256(result.input_path),
+                    output_size=output_stat.st_size,
+                    output_mtime_ns=output_stat.st_mtime_ns,
+                )
+        except OSError:
+            entry["status"] = "failed"
+        self._records[entry["input"]] = entry
+        self._append(entry)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "BatchManifest":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# ============================================================
+# コマンドライン（スケジューラーなどからの一括処理用）
+# ============================================================
+
+def find_input_files(input_dir: str, exclude: Optional[str] = None) -> List[str]:
+    """
+    ディレクトリの中の対応ファイルをサブフォルダも含めて探す
+
+    Officeが編集中に作る一時ファイル（~$ で始まるもの）は除きます。
+
+    Args:
+        input_dir: 探すディレクトリ
+        exclude: 探さないディレクトリ（出力先が入力の中にある場合など）
+
+    Returns:
+        ファイルパスのリスト（名前順）
+    """
+    excluded = Path(exclude).resolve() if exclude else None
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        if excluded is not None:
+            dirs[:] = [d for d in dirs if (Path(root) / d).resolve() != excluded]
+        dirs.sort()
+        for name in sorted(files):
+            if name.startswith("~$") or not is_supported_file(name):
+                continue
+            found.append(os.path.join(root, name))
+    return found
+
+
+def read_password_file(path: str) -> str:
+    """
+    パスワードファイルの1行目を読み込む（"-" の場合は標準入力）
+
+    Args:
+        path: パスワードファイルのパス
+
+    Returns:
+        パスワード（末尾の改行は除く）
+    """
+    if path == "-":
+        line = sys.stdin.readline()
+    else:
+        with open(path, encoding="utf-8") as f:
+            line = f.readline()
+    return line.rstrip("\r\n")
+
+
+def _result_record(result: ProcessResult) -> dict:
+    """処理結果をJSON出力用の辞書にする"""
+    return {
+        "input": result.input_path,
+        "output": result.output_path,
+        "success": result.success,
+        "error": result.error_message or None,
+        "seconds": round(result.stats.total_seconds, 3) if result.stats is not None else None,
+        "skipped": False,
+        "timed_out": result.timed_out,
+    }
+
+
+def _cli_password(args) -> Optional[str]:
+    """--password-file のパスワードを読み込んで確認する（問題があれば標準エラーに出してNone）"""
+    try:
+        password = read_password_file(args.password_file)
+    except OSError as e:
+        print(f"パスワードファイルを読み込めませんでした: {e}", file=sys.stderr)
+        return None
+    is_valid, error_msg = validate_password(password)
+    if not is_valid:
+        print(error_msg, file=sys.stderr)
+        return None
+
+    deps_ok, deps_error = check_dependencies()
+    if not deps_ok:
+        print(deps_error, file=sys.stderr)
+        return None
+    return password
+
+
+def _command_lock(args) -> int:
+    """lock サブコマンド: フォルダ内のファイルにまとめて鍵をかける"""
+    password = _cli_password(args)
+    if password is None:
+        return 2
+
+    input_dir = Path(args.input_dir)
+    if not input_dir.is_dir():
+        print(f"入力フォルダが見つかりません: {input_dir}", file=sys.stderr)
+        return 2
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    files = find_input_files(str(input_dir), exclude=str(output_dir))
+
+    with contextlib.ExitStack() as stack:
+        manifest = None
+        skipped = 0
+        # 処理済みのファイルを省いても出力先が変わらないよう、全体で先に決める
+        output_paths = plan_output_paths(files, str(output_dir), args.prefix, str(input_dir))
+        if args.manifest:
+            manifest = stack.enter_context(BatchManifest(args.manifest, password))
+            pending = []
+            for path in files:
+                output_path = output_paths[path]
+                if manifest.is_complete(path, str(output_path)):
+                    skipped += 1
+                    record = {"input": path, "output": str(output_path), "success": True,
+                              "error": None, "seconds": None, "skipped": True, "timed_out": False}
+                    print(json.dumps(record, ensure_ascii=False), flush=True)
+                else:
+                    pending.append(path)
+            files = pending
+
+        succeeded = failed = 0
+        for result in process_files(
+            files,
+            password,
+            output_dir=str(output_dir),
+            output_prefix=args.prefix,
+            workers=args.jobs,
+            streaming=args.streaming,
+            relative_to=str(input_dir),
+            file_timeout=args.timeout,
+            output_paths=output_paths,
+            parallel=args.parallel,
+            hash_inputs=manifest is not None
+        ):
+            if result.success:
+                succeeded += 1
+            else:
+                failed += 1
+            if manifest is not None:
+                manifest.record(result)
+            print(json.dumps(_result_record(result), ensure_ascii=False), flush=True)
+
+    print(f"完了: {succeeded}件 / 失敗: {failed}件 / 処理済みのため省略: {skipped}件", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _command_watch(args) -> int:
+    """watch サブコマンド: 受け取りフォルダを監視して、置かれたファイルに鍵をかける"""
+    password = _cli_password(args)
+    if password is None:
+        return 2
+    if not Path(args.inbox).is_dir():
+        print(f"受け取りフォルダが見つかりません: {args.inbox}", file=sys.stderr)
+        return 2
+
+    # folder_watcher は core_logic を読み込むため、ここで読み込む
+    from folder_watcher import FolderWatcher
+
+    def on_result(result: ProcessResult, destination: Optional[str]) -> None:
+        print(json.dumps(_result_record(result), ensure_ascii=False), flush=True)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    watcher = FolderWatcher(
+        args.inbox,
+        args.output_dir,
+        password,
+        processed_dir=args.processed_dir,
+        failed_dir=args.failed_dir,
+        workers=args.jobs,
+        output_prefix=args.prefix,
+        streaming=args.streaming,
+        settle_seconds=args.settle,
+        report_seconds=args.report_interval,
+        use_inotify=not args.poll,
+        on_result=on_result
+    )
+    watcher.run()
+    return 0
+
+
+def _command_serve(args) -> int:
+    """serve サブコマンド: Unixドメインソケットで依頼を受け付けるデーモンを起動する"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("この環境ではUnixドメインソケットを使えません", file=sys.stderr)
+        return 2
+    deps_ok, deps_error = check_dependencies()
+    if not deps_ok:
+        print(deps_error, file=sys.stderr)
+        return 2
+
+    # lock_daemon は core_logic を読み込むため、ここで読み込む
+    from lock_daemon import LockDaemon
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    daemon = LockDaemon(
+        socket_path=args.socket,
+        workers=args.jobs,
+        max_jobs=args.max_jobs,
+        max_jobs_per_connection=args.max_jobs_per_connection,
+        max_upload_bytes=args.max_upload_mb * 1024 * 1024
+    )
+    try:
+        daemon.run()
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    コマンドラインのエントリーポイント
+
+    例:
+        python -m core_logic lock --password-file pw.txt --jobs 8 入力フォルダ 出力フォルダ
+
+    結果は1ファイルごとに1行のJSONで標準出力に出します。
+    1件でも失敗した場合は終了コード1、引数などの誤りは2を返します。
+    """
+    parser = argparse.ArgumentParser(prog="python -m core_logic", description="PDFにパスワードをかけます")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    lock_parser = subparsers.add_parser("lock", help="フォルダ内のファイルにまとめて鍵をかける")
+    lock_parser.add_argument("input_dir", help="入力フォルダ（サブフォルダも処理します）")
+    lock_parser.add_argument("output_dir", help="出力フォルダ（入力と同じフォルダ構成で保存します）")
+    lock_parser.add_argument("--password-file", required=True, help="パスワードを1行目に書いたファイル（- で標準入力）")
+    lock_parser.add_argument("--jobs", "-j", type=int, default=None, help="並列数（既定: CPUコア数）")
+    lock_parser.add_argument("--prefix", default="鍵付き_", help="出力ファイル名のプレフィックス")
+    lock_parser.add_argument("--streaming", action="store_true", help="ストリーミングで暗号化（大きなPDF向け）")
+    lock_parser.add_argument("--timeout", type=float, default=None, help="1ファイルあたりの制限時間（秒。既定: 制限なし）")
+    lock_parser.add_argument(
+        "--parallel", type=int, default=None,
+        help="大きなPDF（8MB以上）1つを分担して暗号化するプロセス数（既定: ファイル数が並列数より少ないときに自動。1で無効）"
+    )
+    lock_parser.add_argument(
+        "--manifest",
+        help="処理の記録を残すファイル（JSON Lines）。やり直したときに処理済みのファイルを飛ばします"
+    )
+    lock_parser.set_defaults(handler=_command_lock)
+
+    watch_parser = subparsers.add_parser("watch", help="受け取りフォルダを監視して、置かれたファイルに鍵をかける")
+    watch_parser.add_argument("inbox", help="受け取りフォルダ（スキャナーの保存先など）")
+    watch_parser.add_argument("output_dir", help="鍵付きPDFの出力フォルダ")
+    watch_parser.add_argument("--password-file", required=True, help="パスワードを1行目に書いたファイル（- で標準入力）")
+    watch_parser.add_argument("--jobs", "-j", type=int, default=None, help="並列数（既定: CPUコア数）")
+    watch_parser.add_argument("--prefix", default="鍵付き_", help="出力ファイル名のプレフィックス")
+    watch_parser.add_argument("--streaming", action="store_true", help="ストリーミングで暗号化（大きなPDF向け）")
+    watch_parser.add_argument("--processed-dir", help="処理が終わった元ファイルの移動先（既定: 出力フォルダ/処理済み）")
+    watch_parser.add_argument("--failed-dir", help="処理できなかった元ファイルの移動先（既定: 出力フォルダ/処理できなかったファイル）")
+    watch_parser.add_argument("--settle", type=float, default=2.0, help="書き込みが終わったとみなすまでの秒数")
+    watch_parser.add_argument("--report-interval", type=float, default=60.0, help="処理状況をログに出す間隔（秒）")
+    watch_parser.add_argument("--poll", action="store_true", help="inotifyを使わず一定間隔で確認する")
+    watch_parser.set_defaults(handler=_command_watch)
+
+    serve_parser = subparsers.add_parser("serve", help="Unixドメインソケットで依頼を受け付けるデーモンを起動する")
+    serve_parser.add_argument("--socket", help="ソケットのパス（既定: $PDF_LOCKER_SOCKET または $XDG_RUNTIME_DIR/pdf_locker.sock）")
+    serve_parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカープロセス数（既定: CPUコア数）")
+    serve_parser.add_argument("--max-jobs", type=int, default=None, help="処理中と順番待ちを合わせて受け付ける依頼の数（既定: ワーカー数の4倍）")
+    serve_parser.add_argument("--max-jobs-per-connection", type=int, default=None, help="1つの接続から受け付ける依頼の数")
+    serve_parser.add_argument("--max-upload-mb", type=int, default=200, help="受け付けるファイルの最大サイズ（MB）")
+    serve_parser.set_defaults(handler=_command_serve)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    # ワーカープロセスに渡す関数が「__main__」ではなく「core_logic」から読み込まれるよう、
+    # モジュールとして読み込み直したものを実行する
+    from core_logic import main as _main
+    sys.exit(_main())
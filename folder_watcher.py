@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+PDF Locker - フォルダ監視（受け取りフォルダに置かれたファイルに自動で鍵をかける）
+
+スキャナーなどが受け取りフォルダにファイルを置くと、書き込みが終わるのを待ってから
+（サイズと更新日時が一定時間変わらず、ファイルの末尾まで書き込まれていること）
+ワーカープロセスで鍵をかけ、鍵付きのPDFを出力フォルダへ、元のファイルを処理済みフォルダへ移します。
+
+使い方:
+    python -m core_logic watch --password-file pw.txt 受け取りフォルダ 出力フォルダ
+
+変更の検知:
+- Linux: inotify（ctypes経由、追加のライブラリは不要）
+- その他の環境、またはinotifyが使えない場合: 一定間隔でフォルダを確認
+- ネットワークドライブでは他のパソコンからの書き込みを検知できないことがあるため、
+  inotifyが使える場合も一定間隔でフォルダ全体を確認し直します
+"""
+
+import ctypes
+import ctypes.util
+import contextlib
+import logging
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core_logic import (
+    ProcessResult,
+    default_worker_count,
+    derive_password_keys,
+    get_worker_pool,
+    is_supported_file,
+    output_path_for,
+    process_file,
+)
+
+logger = logging.getLogger("pdf_locker.watch")
+
+# 作業用フォルダ（受け取りフォルダの中に作る。隠しフォルダなので監視対象にはならない）
+WORK_DIR_NAME = ".pdf_locker_work"
+# 受け取ったファイルを置くフォルダ（作業用フォルダ/<ファイルごとのフォルダ>/input/元の名前）。
+# 鍵付きPDFはその1つ上（ファイルごとのフォルダ）に書き出すため、名前が出力ファイル名のように
+# 見えるファイルでも、受け取ったファイルと出力を取り違えない
+CLAIM_INPUT_DIR_NAME = "input"
+# 書き込み途中の一時ファイルの拡張子（途中で止まったワーカーが残したものは使わない）
+PARTIAL_SUFFIX = ".part"
+
+# 書き込みが終わったとみなすまでの時間（秒）：この間サイズと更新日時が変わらなければ処理する
+DEFAULT_SETTLE_SECONDS = 2.0
+# 末尾まで書き込まれていないように見えるファイルを待つ最大の時間（秒）。過ぎたらそのまま処理する
+DEFAULT_INCOMPLETE_WAIT_SECONDS = 120.0
+# フォルダ全体を確認し直す間隔（秒）
+DEFAULT_RESCAN_SECONDS = 30.0
+# ポーリングのみの場合の確認間隔（秒）
+DEFAULT_POLL_SECONDS = 2.0
+# 処理状況をログに出す間隔（秒）
+DEFAULT_REPORT_SECONDS = 60.0
+
+
+class _Inotify:
+    """Linuxのinotifyで、フォルダにファイルが置かれたことを検知する"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def wait(self, timeout: float) -> List[str]:
+        """
+        変更を待つ
+
+        Args:
+            timeout: 最大の待ち時間（秒）
+
+        Returns:
+            書き込みが終わった、または移動されてきたファイル名のリスト
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            _, _, _, length = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _open_inotify(directory: str) -> Optional[_Inotify]:
+    """inotifyが使えればそれを返す（使えない場合はNone）"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify(directory)
+    except (OSError, AttributeError) as e:
+        logger.info("inotify is not available, falling back to polling: %s", e)
+        return None
+
+
+def _looks_complete(path: Path) -> bool:
+    """
+    ファイルの末尾まで書き込まれているように見えるか
+
+    PDFは末尾の %%EOF、Office文書（ZIP形式）は末尾の「セントラルディレクトリ終端」で判定します。
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            tail_size = 1024 if path.suffix.lower() == ".pdf" else 65536 + 22
+            f.seek(max(0, size - tail_size))
+            tail = f.read()
+    except OSError:
+        return False
+    if path.suffix.lower() == ".pdf":
+        return b"%%EOF" in tail
+    return b"PK\x05\x06" in tail
+
+
+def _unique_path(directory: Path, name: str) -> Path:
+    """同じ名前のファイルがあれば「名前 (2).pdf」のように番号を付ける"""
+    candidate = directory / name
+    number = 2
+    while candidate.exists():
+        candidate = directory / f"{Path(name).stem} ({number}){Path(name).suffix}"
+        number += 1
+    return candidate
+
+
+@dataclass
+class _Pending:
+    """書き込みが終わるのを待っているファイル"""
+    size: int
+    mtime_ns: int
+    stable_since: float
+    first_seen: float
+
+
+@dataclass
+class WatchStats:
+    """処理状況（スループットと待ち件数）"""
+    settling: int = 0        # 書き込みが終わるのを待っている件数
+    queued: int = 0          # ワーカーの空きを待っている件数
+    running: int = 0         # 処理中の件数
+    succeeded: int = 0       # 成功した件数（累計）
+    failed: int = 0          # 失敗した件数（累計）
+    files_per_minute: float = 0.0   # 直近の処理件数（件/分）
+    mb_per_second: float = 0.0      # 直近の処理量（入力MB/秒）
+
+
+# 1ファイルの処理が終わったときに呼ばれるコールバック（処理結果, 移動先）
+ResultCallback = Callable[[ProcessResult, Optional[str]], None]
+
+
+class FolderWatcher:
+    """
+    受け取りフォルダを監視して、置かれたファイルに鍵をかける
+
+    受け取ったファイルはまず作業用フォルダ（受け取りフォルダ内の .pdf_locker_work）の
+    ファイルごとのフォルダに移してから処理するため、同じ名前のファイルが続けて置かれても上書きされません。
+    途中で止まった場合は、次回の起動時に作業用フォルダに残っているファイルから処理します
+    （鍵付きPDFがすでにできているものは、作り直さずに移すだけにします）。
+    """
+
+    def __init__(
+        self,
+        inbox: str,
+        output_dir: str,
+        password: str,
+        processed_dir: Optional[str] = None,
+        failed_dir: Optional[str] = None,
+        workers: Optional[int] = None,
+        output_prefix: str = "鍵付き_",
+        streaming: bool = False,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        incomplete_wait_seconds: float = DEFAULT_INCOMPLETE_WAIT_SECONDS,
+        rescan_seconds: float = DEFAULT_RESCAN_SECONDS,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        report_seconds: float = DEFAULT_REPORT_SECONDS,
+        use_inotify: bool = True,
+        on_result: Optional[ResultCallback] = None
+    ):
+        """
+        Args:
+            inbox: 受け取りフォルダ
+            output_dir: 鍵付きPDFの出力フォルダ
+            password: 設定するパスワード
+            processed_dir: 処理が終わった元ファイルの移動先（既定: 出力フォルダ/処理済み）
+            failed_dir: 処理できなかった元ファイルの移動先（既定: 出力フォルダ/処理できなかったファイル）
+            workers: ワーカープロセス数（Noneの場合はCPUコア数）
+            output_prefix: 出力ファイル名のプレフィックス
+            streaming: Trueの場合はストリーミングで暗号化（大きなPDF向け）
+            settle_seconds: 書き込みが終わったとみなすまでの時間（秒）
+            incomplete_wait_seconds: 末尾まで書き込まれていないように見えるファイルを待つ最大の時間（秒）
+            rescan_seconds: フォルダ全体を確認し直す間隔（秒）
+            poll_seconds: inotifyが使えない場合の確認間隔（秒）
+            report_seconds: 処理状況をログに出す間隔（秒）
+            use_inotify: Falseの場合はinotifyを使わずに一定間隔で確認する
+            on_result: 1ファイルの処理が終わるたびに呼ばれるコールバック
+        """
+        self.inbox = Path(inbox)
+        self.output_dir = Path(output_dir)
+        self.processed_dir = Path(processed_dir) if processed_dir else self.output_dir / "処理済み"
+        self.failed_dir = Path(failed_dir) if failed_dir else self.output_dir / "処理できなかったファイル"
+        self.work_dir = self.inbox / WORK_DIR_NAME
+        self.password = password
+        # パスワードからの鍵の導出は起動時に1度だけ行う
+        self.keys = derive_password_keys(password)
+        self.workers = workers or default_worker_count()
+        self.output_prefix = output_prefix
+        self.streaming = streaming
+        self.settle_seconds = settle_seconds
+        self.incomplete_wait_seconds = incomplete_wait_seconds
+        self.rescan_seconds = rescan_seconds
+        self.poll_seconds = poll_seconds
+        self.report_seconds = report_seconds
+        self.use_inotify = use_inotify
+        self.on_result = on_result
+
+        self._pending: Dict[str, _Pending] = {}
+        # 処理中のファイル（ファイルごとのフォルダ, 受け取ったときの名前, サイズ）
+        self._running: Dict[Future, Tuple[Path, str, int]] = {}
+        self._stats = WatchStats()
+        self._window_files = 0
+        self._window_bytes = 0
+        self._window_started = time.monotonic()
+
+    def stats(self) -> WatchStats:
+        """現在の処理状況"""
+        self._stats.settling = len(self._pending)
+        self._stats.running = sum(1 for future in self._running if future.running())
+        self._stats.queued = len(self._running) - self._stats.running
+        return self._stats
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        監視を開始する（stop_event が設定されるか、Ctrl+Cで止まるまで戻らない）
+
+        止めるときは処理中のファイルが終わるのを待ちます。
+
+        Args:
+            stop_event: 監視を止めるためのイベント（省略可）
+        """
+        for directory in (self.output_dir, self.processed_dir, self.failed_dir, self.work_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        stop_event = stop_event or threading.Event()
+
+        with contextlib.ExitStack() as stack:
+            # ワーカーは監視を止めた後も残し、同じプロセスの次の監視やバッチで使い回す
+            executor = get_worker_pool(self.workers)
+            inotify = _open_inotify(str(self.inbox)) if self.use_inotify else None
+            if inotify is not None:
+                stack.callback(inotify.close)
+            logger.info(
+                "Watching %s (%s, %d workers)", self.inbox, "inotify" if inotify else "polling", self.workers
+            )
+
+            # 前回の途中で残ったファイルから処理する
+            self._resume(executor)
+
+            self._scan()
+            last_scan = last_report = time.monotonic()
+            try:
+                while not stop_event.is_set():
+                    # 待ち時間: 書き込み待ちのファイルがあればその確認に間に合うように
+                    timeout = self.poll_seconds if inotify is None else self.rescan_seconds
+                    if self._pending or self._running:
+                        timeout = min(timeout, max(0.1, self.settle_seconds / 2))
+                    if inotify is not None:
+                        for name in inotify.wait(timeout):
+                            self._consider(self.inbox / name)
+                    else:
+                        stop_event.wait(timeout)
+
+                    now = time.monotonic()
+                    if inotify is None or now - last_scan >= self.rescan_seconds:
+                        self._scan()
+                        last_scan = now
+                    self._submit_settled(executor, now)
+                    self._collect()
+                    if now - last_report >= self.report_seconds:
+                        self._report(now)
+                        last_report = now
+            except KeyboardInterrupt:
+                logger.info("Stopping: waiting for %d files in progress", len(self._running))
+            finally:
+                wait(list(self._running))
+                self._collect()
+                self._report(time.monotonic())
+
+    def _scan(self) -> None:
+        """受け取りフォルダ全体を確認する"""
+        try:
+            entries = list(os.scandir(self.inbox))
+        except OSError as e:
+            logger.warning("Cannot read %s: %s", self.inbox, e)
+            return
+        for entry in entries:
+            if entry.is_file():
+                self._consider(Path(entry.path))
+
+    def _consider(self, path: Path) -> None:
+        """処理対象のファイルなら書き込み待ちに加える"""
+        name = path.name
+        if name.startswith((".", "~$")) or not is_supported_file(name):
+            return
+        key = str(path)
+        if key in self._pending:
+            return
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+        now = time.monotonic()
+        self._pending[key] = _Pending(stat.st_size, stat.st_mtime_ns, now, now)
+
+    def _submit_settled(self, executor, now: float) -> None:
+        """一定時間変化のないファイルを作業用フォルダに移して処理を依頼する"""
+        for key, pending in list(self._pending.items()):
+            # ワーカーに渡しすぎない（止まったときに受け取りフォルダに残る方が扱いやすい）
+            if len(self._running) >= self.workers * 2:
+                return
+            path = Path(key)
+            try:
+                stat = path.stat()
+            except OSError:
+                del self._pending[key]  # すでに移動・削除された
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (pending.size, pending.mtime_ns):
+                self._pending[key] = _Pending(stat.st_size, stat.st_mtime_ns, now, pending.first_seen)
+                continue
+            if now - pending.stable_since < self.settle_seconds:
+                continue
+            # 書き込みが一時的に止まっているだけの場合もあるので、末尾まであるかも確認する
+            if not _looks_complete(path) and now - pending.first_seen < self.incomplete_wait_seconds:
+                continue
+
+            del self._pending[key]
+            claim_dir = self.work_dir / uuid.uuid4().hex
+            claimed = claim_dir / CLAIM_INPUT_DIR_NAME / path.name
+            claimed.parent.mkdir(parents=True)
+            try:
+                # 同じドライブ内の移動なので一瞬で終わる（書き込み中のWindowsのファイルは移動できない）
+                os.replace(path, claimed)
+            except OSError:
+                shutil.rmtree(claim_dir, ignore_errors=True)
+                continue
+            self._submit(executor, claim_dir, path.name)
+
+    def _submit(self, executor, claim_dir: Path, name: str) -> None:
+        claimed = claim_dir / CLAIM_INPUT_DIR_NAME / name
+        future = executor.submit(
+            process_file, str(claimed), self.password, str(claim_dir), self.output_prefix, self.streaming,
+            keys=self.keys
+        )
+        self._running[future] = (claim_dir, name, claimed.stat().st_size)
+
+    def _resume(self, executor) -> None:
+        """
+        前回の途中で作業用フォルダに残ったファイルを処理し直す
+
+        鍵付きPDFがすでにできている場合は作り直さずに移すだけにし、
+        途中で止まったワーカーが残した書きかけの一時ファイル（*.part）は削除します。
+        """
+        for claim_dir in sorted(p for p in self.work_dir.iterdir() if p.is_dir()):
+            for partial in claim_dir.glob(f"*{PARTIAL_SUFFIX}"):
+                with contextlib.suppress(OSError):
+                    partial.unlink()
+            input_dir = claim_dir / CLAIM_INPUT_DIR_NAME
+            inputs = [p for p in input_dir.iterdir() if p.is_file()] if input_dir.is_dir() else []
+            if not inputs:
+                # 元のファイルは移し終えている（鍵付きPDFが残っていれば移すだけ）
+                try:
+                    for output in (p for p in claim_dir.iterdir() if p.is_file()):
+                        shutil.move(str(output), str(_unique_path(self.output_dir, output.name)))
+                except OSError as e:
+                    logger.error("could not move files out of %s: %s", claim_dir, e)
+                    continue
+                shutil.rmtree(claim_dir, ignore_errors=True)
+                continue
+            claimed = inputs[0]
+            if output_path_for(str(claimed), str(claim_dir), self.output_prefix).exists():
+                logger.info("%s: already locked, moving the output", claimed.name)
+                self._finish(claim_dir, claimed.name, claimed.stat().st_size, ProcessResult(
+                    success=True, original_filename=claimed.name, input_path=str(claimed)
+                ))
+            else:
+                self._submit(executor, claim_dir, claimed.name)
+
+    def _collect(self) -> None:
+        """終わったファイルを出力フォルダ・処理済みフォルダに移す"""
+        for future in [f for f in self._running if f.done()]:
+            claim_dir, name, size = self._running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = ProcessResult(
+                    success=False,
+                    error_message=f"予期しないエラー: {str(e)}",
+                    original_filename=name,
+                    input_path=str(claim_dir / CLAIM_INPUT_DIR_NAME / name)
+                )
+            self._finish(claim_dir, name, size, result)
+
+    def _finish(self, claim_dir: Path, name: str, size: int, result: ProcessResult) -> None:
+        """
+        1ファイル分の処理結果に応じてファイルを移し、ファイルごとのフォルダを削除する
+
+        元のファイルを先に移すため、鍵付きPDFを移す前に止まっても、次回の起動時に
+        鍵をかけ直すことはありません（作業用フォルダに残った鍵付きPDFを移すだけになります）。
+
+        Args:
+            claim_dir: ファイルごとのフォルダ
+            name: 受け取ったときのファイル名
+            size: 入力のサイズ（処理量の集計用）
+            result: 処理結果
+        """
+        claimed = claim_dir / CLAIM_INPUT_DIR_NAME / name
+        destination = None
+        try:
+            if result.success:
+                output = output_path_for(str(claimed), str(claim_dir), self.output_prefix)
+                shutil.move(str(claimed), str(_unique_path(self.processed_dir, name)))
+                destination = str(_unique_path(self.output_dir, output.name))
+                shutil.move(str(output), destination)
+                result.output_path = destination
+                self._stats.succeeded += 1
+            else:
+                shutil.move(str(claimed), str(_unique_path(self.failed_dir, name)))
+                self._stats.failed += 1
+                logger.warning("%s: %s", name, result.error_message)
+        except OSError as e:
+            # 作業用フォルダに残しておけば、次回の起動時にやり直される
+            logger.error("%s: could not move files out of %s: %s", name, claim_dir, e)
+            return
+        shutil.rmtree(claim_dir, ignore_errors=True)
+
+        result.input_path = str(self.inbox / name)
+        self._window_files += 1
+        self._window_bytes += size
+        if self.on_result is not None:
+            self.on_result(result, destination)
+
+    def _report(self, now: float) -> None:
+        """スループットと待ち件数をログに出す"""
+        elapsed = max(now - self._window_started, 1e-6)
+        stats = self.stats()
+        stats.files_per_minute = self._window_files * 60 / elapsed
+        stats.mb_per_second = self._window_bytes / (1024 * 1024) / elapsed
+        self._window_files = self._window_bytes = 0
+        self._window_started = now
+        logger.info(
+            "settling=%d queued=%d running=%d succeeded=%d failed=%d throughput=%.1f files/min %.2f MB/s",
+            stats.settling, stats.queued, stats.running, stats.succeeded, stats.failed,
+            stats.files_per_minute, stats.mb_per_second
+        )
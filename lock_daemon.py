@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+"""
+PDF Locker - 常駐デーモン（Unixドメインソケットで鍵をかける依頼を受け付ける）
+
+同じサーバーのWebアプリやスクリプトから依頼を受け付け、1つのワーカープール（get_worker_pool）で
+処理します。ワーカーはライブラリを読み込んだまま待機するため、依頼のたびに
+プロセスの起動やpypdfの読み込みを待ちません。
+
+使い方:
+    python -m core_logic serve --jobs 4             # デーモンを起動
+    python -m core_logic serve --socket /run/pdf_locker.sock
+
+    from lock_daemon import LockClient
+    with LockClient() as client:
+        result = client.lock_file("/data/a.pdf", password, output_dir="/data/out")
+        ok, locked_bytes, error_msg = client.lock_bytes(data, "a.pdf", password)
+
+通信の形式（1行に1つのJSON。UTF-8）:
+- 依頼には "id"（接続内で重複しない文字列）を付けます。1つの接続で複数の依頼を同時に送れ、
+  返事は終わったものから、同じ "id" を付けて返します
+- {"id", "op": "lock_file", "path", "password", "output_dir", "output_prefix", "streaming", "timeout", "progress"}
+  サーバー上のファイルに鍵をかけ、出力ファイルのパスを返します
+- {"id", "op": "lock_bytes", "filename", "size", "password", "timeout", "progress"}
+  の行の直後に size バイトのファイルの内容を続けます。鍵付きPDFは返事の行の直後に
+  返事の "size" バイトで返します
+- {"id", "op": "cancel", "target"}: 処理中・順番待ちの依頼（target）を打ち切る
+- {"id", "op": "status"}: ワーカーの状態（cold / warming / warm）と依頼の件数を返す
+- 返事: {"id", "event": "progress", "stage", "done_bytes", "total_bytes"}（"progress": true の場合のみ）、
+  {"id", "event": "result", "success", "output_path", "error", "timed_out", "cancelled", "stats", "size"}、
+  {"id", "event": "status", ...}、{"id", "event": "error", "error"}
+
+受け付けすぎないための制限:
+- 処理中・順番待ちの依頼が --max-jobs 件（1つの接続では --max-jobs-per-connection 件）に達すると、
+  空きができるまでその接続からの読み込みを止めます。クライアントの送信はソケットの
+  バッファが埋まったところで待たされるため、サーバーのメモリ使用量は増えません
+- 返事の送信も、クライアントが読み込むのに合わせて少しずつ行います
+
+ソケットは起動したユーザーだけが読み書きできるようにして作ります（パスワードを送るため）。
+WindowsではUnixドメインソケットを使えないため動きません。
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core_logic import (
+    MAX_POOL_BATCHES,
+    PoolBatch,
+    ProcessResult,
+    ProgressEvent,
+    StageStats,
+    _process_file_job,
+    default_worker_count,
+    derive_password_keys,
+    get_worker_pool,
+    is_supported_file,
+    validate_password,
+)
+
+logger = logging.getLogger("pdf_locker.daemon")
+
+# ソケットのパスを指定する環境変数
+SOCKET_ENV = "PDF_LOCKER_SOCKET"
+# 受け付けるファイルの最大サイズ（MB）の既定値
+DEFAULT_MAX_UPLOAD_MB = 200
+# ワーカー1つあたりに受け付ける依頼の数の既定値（処理中と順番待ちの合計）
+DEFAULT_JOBS_PER_WORKER = 4
+# ファイルの内容を読み書きする単位（バイト）
+_CHUNK_SIZE = 1024 * 1024
+# 1行のJSONの最大の長さ（バイト）
+_LINE_LIMIT = 64 * 1024
+
+
+def default_socket_path() -> str:
+    """
+    ソケットの既定のパスを取得
+
+    Returns:
+        環境変数 PDF_LOCKER_SOCKET、XDG_RUNTIME_DIR/pdf_locker.sock、
+        一時フォルダ/pdf_locker-<ユーザーID>.sock の順で最初に決まったもの
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "pdf_locker.sock")
+    return os.path.join(tempfile.gettempdir(), f"pdf_locker-{os.getuid()}.sock")
+
+
+class _ProtocolError(Exception):
+    """通信の形式の誤りやクライアントの切断（その接続を閉じる）"""
+
+
+@dataclass
+class _Request:
+    """受け付けた鍵をかける依頼"""
+    request_id: str
+    input_path: str
+    password: str
+    output_dir: Optional[str]
+    output_prefix: str
+    streaming: bool
+    timeout: Optional[float]
+    progress: bool
+    # lock_bytes の場合の作業用フォルダ（返事を送ったら削除する）
+    work_dir: Optional[Path] = None
+
+
+class _Connection:
+    """1つのクライアントとの接続"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_jobs: int):
+        self.reader = reader
+        self.writer = writer
+        self.slots = asyncio.Semaphore(max_jobs)
+        self.batches: Dict[str, PoolBatch] = {}
+        self.tasks: Set[asyncio.Task] = set()
+        # 返事の行と、その後に続くファイルの内容が他の返事と混ざらないように
+        self._write_lock = asyncio.Lock()
+
+    async def send(self, message: dict, body_path: Optional[str] = None) -> None:
+        """返事を送る（body_path を指定した場合はその内容を続けて送る）"""
+        async with self._write_lock:
+            if body_path is not None:
+                message["size"] = os.path.getsize(body_path)
+            self.writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            await self.writer.drain()
+            if body_path is not None:
+                with open(body_path, "rb") as f:
+                    while True:
+                        chunk = f.read(_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        self.writer.write(chunk)
+                        await self.writer.drain()
+
+
+class LockDaemon:
+    """
+    Unixドメインソケットで依頼を受け付けて、ワーカープールで鍵をかけるデーモン
+
+    依頼ごとにワーカープールのバッチ（PoolBatch）を開くため、進み具合と取り消しは依頼ごとに扱えます。
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_jobs: Optional[int] = None,
+        max_jobs_per_connection: Optional[int] = None,
+        max_upload_bytes: int = DEFAULT_MAX_UPLOAD_MB * 1024 * 1024
+    ):
+        """
+        Args:
+            socket_path: ソケットのパス（Noneの場合は default_socket_path()）
+            workers: ワーカープロセス数（Noneの場合はCPUコア数）
+            max_jobs: 処理中と順番待ちを合わせて受け付ける依頼の数（Noneの場合はワーカー数の4倍）
+            max_jobs_per_connection: 1つの接続から受け付ける依頼の数（Noneの場合は max_jobs と同じ）
+            max_upload_bytes: lock_bytes で受け付けるファイルの最大サイズ（バイト）
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.workers = workers or default_worker_count()
+        self.max_jobs = min(max_jobs or self.workers * DEFAULT_JOBS_PER_WORKER, MAX_POOL_BATCHES)
+        self.max_jobs_per_connection = min(max_jobs_per_connection or self.max_jobs, self.max_jobs)
+        self.max_upload_bytes = max_upload_bytes
+        self._pool = get_worker_pool(self.workers)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._connections: Set[_Connection] = set()
+        self._active_jobs = 0
+        self._root: Optional[Path] = None
+
+    def status(self) -> dict:
+        """ワーカーの状態と依頼の件数"""
+        return {
+            "state": self._pool.state,
+            "workers": self._pool.workers,
+            "ready_workers": self._pool.ready_workers,
+            "active_jobs": self._active_jobs,
+            "max_jobs": self.max_jobs,
+            "connections": len(self._connections),
+        }
+
+    def run(self) -> None:
+        """デーモンを起動する（SIGTERM か Ctrl+C で止まるまで戻らない）"""
+        asyncio.run(self.serve())
+
+    async def serve(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """
+        依頼の受け付けを始める
+
+        止めるときは新しい接続を受け付けるのをやめ、受け付けた依頼が終わってから接続を閉じます。
+
+        Args:
+            stop_event: 設定されると止まるイベント（省略時は SIGTERM / SIGINT で止まる）
+        """
+        loop = asyncio.get_running_loop()
+        if stop_event is None:
+            stop_event = asyncio.Event()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, stop_event.set)
+
+        _remove_stale_socket(self.socket_path)
+        self._slots = asyncio.Semaphore(self.max_jobs)
+        self._root = Path(tempfile.mkdtemp(prefix="pdf_locker_daemon_"))
+        # パスワードを受け取るため、起動したユーザーだけが接続できるようにする
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=_LINE_LIMIT)
+        finally:
+            os.umask(old_umask)
+        self._pool.warm()
+        logger.info(
+            "Listening on %s (%d workers, up to %d jobs)", self.socket_path, self.workers, self.max_jobs
+        )
+        try:
+            await stop_event.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            logger.info("Stopping: waiting for %d jobs in progress", self._active_jobs)
+            tasks = [task for conn in self._connections for task in conn.tasks]
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for conn in list(self._connections):
+                conn.writer.close()
+            with contextlib.suppress(OSError):
+                os.remove(self.socket_path)
+            shutil.rmtree(self._root, ignore_errors=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """1つの接続の依頼を読み込む"""
+        conn = _Connection(reader, writer, self.max_jobs_per_connection)
+        self._connections.add(conn)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError(request)
+                except ValueError:
+                    # lock_bytes の内容が続いているかもしれず、区切りが分からなくなるので接続を閉じる
+                    await conn.send({"id": None, "event": "error", "error": "依頼をJSONとして読み込めません"})
+                    break
+                try:
+                    await self._dispatch(conn, request)
+                except _ProtocolError:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            # 切断したクライアントの依頼は打ち切る
+            for batch in list(conn.batches.values()):
+                batch.cancel()
+            await asyncio.gather(*conn.tasks, return_exceptions=True)
+            self._connections.discard(conn)
+            writer.close()
+
+    async def _dispatch(self, conn: _Connection, request: dict) -> None:
+        """1つの依頼を処理する（鍵をかける依頼は受け付けたらすぐに戻る）"""
+        request_id = request.get("id")
+        op = request.get("op")
+        if op == "status":
+            await conn.send(dict(self.status(), id=request_id, event="status"))
+            return
+        if op == "cancel":
+            batch = conn.batches.get(request.get("target"))
+            if batch is not None:
+                batch.cancel()
+            await conn.send({"id": request_id, "event": "cancel", "found": batch is not None})
+            return
+        if op not in ("lock_file", "lock_bytes"):
+            await conn.send({"id": request_id, "event": "error", "error": f"未対応の依頼です: {op}"})
+            return
+
+        # 空きができるまでこの接続からの読み込みを止める（クライアントの送信が待たされる）
+        await conn.slots.acquire()
+        await self._slots.acquire()
+        try:
+            job = await self._accept(conn, request)
+        except BaseException:
+            self._release(conn)
+            raise
+        if job is None:
+            self._release(conn)
+            return
+        self._active_jobs += 1
+        task = asyncio.ensure_future(self._run(conn, job))
+        conn.tasks.add(task)
+        task.add_done_callback(conn.tasks.discard)
+
+    def _release(self, conn: _Connection) -> None:
+        conn.slots.release()
+        self._slots.release()
+
+    async def _accept(self, conn: _Connection, request: dict) -> Optional[_Request]:
+        """
+        依頼の内容を確かめる（lock_bytes の場合はファイルの内容を作業用フォルダに受け取る）
+
+        Returns:
+            受け付けた依頼（誤りがあって返事を送った場合はNone）
+        """
+        request_id = request.get("id")
+        op = request["op"]
+        size = request.get("size", 0) if op == "lock_bytes" else 0
+        if not _is_int(size) or size < 0:
+            # 続く内容の長さが分からないため、内容は続いていないものとして次の依頼を読む
+            await conn.send({"id": request_id, "event": "error", "error": "size には0以上の整数を指定してください"})
+            return None
+
+        error = None
+        password = request.get("password")
+        timeout = request.get("timeout")
+        output_dir = request.get("output_dir")
+        output_prefix = request.get("output_prefix") or "鍵付き_"
+        if not isinstance(request_id, str) or not request_id:
+            error = "id を指定してください"
+        elif request_id in conn.batches:
+            error = f"同じ id の依頼を処理中です: {request_id}"
+        elif not isinstance(password, str):
+            error = "password を指定してください"
+        else:
+            is_valid, error_msg = validate_password(password)
+            if not is_valid:
+                error = error_msg
+        if error is None and timeout is not None and (
+            isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 < timeout < float("inf")
+        ):
+            error = "timeout には正の秒数を指定してください"
+        if error is None and op == "lock_bytes":
+            filename = request.get("filename")
+            filename = Path(filename).name if isinstance(filename, str) else ""
+            if not is_supported_file(filename):
+                error = f"対応していないファイル形式です: {filename}"
+            elif size > self.max_upload_bytes:
+                error = f"ファイルが大きすぎます（上限 {self.max_upload_bytes // (1024 * 1024)}MB）"
+        if error is None and op == "lock_file":
+            path = request.get("path")
+            if not isinstance(path, str) or not os.path.isabs(path):
+                error = "path には絶対パスを指定してください"
+            elif not os.path.isfile(path):
+                error = f"ファイルが見つかりません: {path}"
+            elif not is_supported_file(path):
+                error = f"対応していないファイル形式です: {Path(path).name}"
+            elif output_dir is not None and (not isinstance(output_dir, str) or not os.path.isabs(output_dir)):
+                error = "output_dir には絶対パスを指定してください"
+            elif output_dir is not None and not os.path.isdir(output_dir):
+                error = f"出力フォルダが見つかりません: {output_dir}"
+            elif not isinstance(output_prefix, str) or Path(output_prefix).name != output_prefix:
+                error = "output_prefix にフォルダの区切りは使えません"
+
+        if error is not None:
+            await self._discard_body(conn, size)
+            await conn.send({"id": request_id, "event": "error", "error": error})
+            return None
+
+        job = _Request(
+            request_id=request_id,
+            input_path=request.get("path", ""),
+            password=password,
+            output_dir=output_dir,
+            output_prefix=output_prefix,
+            streaming=bool(request.get("streaming", False)),
+            timeout=float(timeout) if timeout is not None else None,
+            progress=bool(request.get("progress", False)),
+        )
+        if op == "lock_bytes":
+            job.work_dir = self._root / uuid.uuid4().hex
+            job.work_dir.mkdir()
+            job.input_path = str(job.work_dir / filename)
+            job.output_dir = str(job.work_dir)
+            job.output_prefix = "鍵付き_"
+            try:
+                await self._receive_body(conn, size, job.input_path)
+            except BaseException:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+                raise
+        return job
+
+    async def _receive_body(self, conn: _Connection, size: int, path: str) -> None:
+        """依頼の行に続くファイルの内容を受け取る"""
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining:
+                try:
+                    chunk = await conn.reader.readexactly(min(_CHUNK_SIZE, remaining))
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    raise _ProtocolError()
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    async def _discard_body(self, conn: _Connection, size: int) -> None:
+        """受け付けなかった依頼のファイルの内容を読み捨てる"""
+        remaining = size
+        while remaining:
+            try:
+                chunk = await conn.reader.readexactly(min(_CHUNK_SIZE, remaining))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                raise _ProtocolError()
+            remaining -= len(chunk)
+
+    async def _run(self, conn: _Connection, job: _Request) -> None:
+        """ワーカーで鍵をかけて、結果を返す"""
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue[ProgressEvent]" = asyncio.Queue()
+        on_progress = None
+        if job.progress:
+            def on_progress(event: ProgressEvent) -> None:
+                loop.call_soon_threadsafe(events.put_nowait, event)
+
+        batch = self._pool.open_batch(on_progress)
+        conn.batches[job.request_id] = batch
+        try:
+            try:
+                keys = await loop.run_in_executor(None, derive_password_keys, job.password)
+                future = asyncio.wrap_future(batch.submit(
+                    _process_file_job, job.input_path, job.password, job.output_dir, job.output_prefix,
+                    job.streaming, False, keys, job.timeout
+                ))
+                while not future.done():
+                    next_event = asyncio.ensure_future(events.get())
+                    await asyncio.wait({future, next_event}, return_when=asyncio.FIRST_COMPLETED)
+                    if not next_event.done():
+                        next_event.cancel()
+                        continue
+                    event = next_event.result()
+                    await conn.send({
+                        "id": job.request_id,
+                        "event": "progress",
+                        "stage": event.stage,
+                        "done_bytes": event.done_bytes,
+                        "total_bytes": event.total_bytes,
+                    })
+                result = future.result()
+            except Exception as e:
+                result = ProcessResult(
+                    success=False,
+                    error_message=f"予期しないエラー: {str(e)}",
+                    original_filename=Path(job.input_path).name,
+                    input_path=job.input_path
+                )
+            finally:
+                batch.close()
+                conn.batches.pop(job.request_id, None)
+
+            message = {
+                "id": job.request_id,
+                "event": "result",
+                "success": result.success,
+                "output_path": result.output_path if job.work_dir is None else None,
+                "error": result.error_message or None,
+                "timed_out": result.timed_out,
+                "cancelled": result.cancelled,
+                "stats": result.stats.to_dict() if result.stats is not None else None,
+            }
+            if job.work_dir is not None and result.success:
+                message["filename"] = Path(result.output_path).name
+                await conn.send(message, body_path=result.output_path)
+            else:
+                await conn.send(message)
+        except ConnectionError:
+            pass
+        finally:
+            if job.work_dir is not None:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+            self._active_jobs -= 1
+            self._release(conn)
+
+
+def _is_int(value) -> bool:
+    """JSONの整数かどうか（true / false は含めない）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _remove_stale_socket(path: str) -> None:
+    """前回のデーモンが残したソケットを削除する（動いているデーモンのソケットの場合はエラー）"""
+    if not os.path.exists(path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"デーモンはすでに起動しています: {path}")
+
+
+# ============================================================
+# クライアント
+# ============================================================
+
+# 進み具合を受け取るコールバック
+ClientProgressCallback = Callable[[ProgressEvent], None]
+
+
+class LockClient:
+    """
+    デーモンに鍵をかける依頼を送るクライアント
+
+    1つの接続を複数のスレッドから同時に使えます（依頼ごとに id を付けて、返事を振り分けます）。
+    デーモンが混んでいる場合は、空きができるまで依頼の送信が待たされます。
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Args:
+            socket_path: デーモンのソケットのパス（Noneの場合は default_socket_path()）
+            timeout: 1つの依頼の返事を待つ時間（秒。Noneの場合は無制限）
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(self.socket_path)
+        self._file = self._sock.makefile("rb")
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, "queue.Queue[Optional[Tuple[dict, bytes]]]"] = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="lock-client-reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self) -> None:
+        """デーモンからの返事を読み込んで、依頼ごとに振り分ける"""
+        try:
+            while True:
+                line = self._file.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                size = message.get("size") or 0
+                body = self._file.read(size) if size else b""
+                if len(body) < size:
+                    break
+                with self._lock:
+                    replies = self._pending.get(message.get("id"))
+                if replies is not None:
+                    replies.put((message, body))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._closed = True
+                waiting = list(self._pending.values())
+            for replies in waiting:
+                replies.put(None)
+
+    def _request(
+        self,
+        request: dict,
+        body: bytes = b"",
+        on_progress: Optional[ClientProgressCallback] = None,
+        input_path: str = ""
+    ) -> Tuple[dict, bytes]:
+        """依頼を送って、最後の返事（result / status / error）を待つ"""
+        request_id = uuid.uuid4().hex
+        replies: "queue.Queue[Optional[Tuple[dict, bytes]]]" = queue.Queue()
+        with self._lock:
+            if self._closed:
+                raise ConnectionError("デーモンとの接続が切れています")
+            self._pending[request_id] = replies
+        try:
+            request = dict(request, id=request_id)
+            if on_progress is not None:
+                request["progress"] = True
+            data = json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+            with self._send_lock:
+                self._sock.sendall(data)
+                if body:
+                    self._sock.sendall(body)
+            while True:
+                try:
+                    reply = replies.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError("デーモンからの返事がありません")
+                if reply is None:
+                    raise ConnectionError("デーモンとの接続が切れました")
+                message, reply_body = reply
+                if message.get("event") == "progress":
+                    if on_progress is not None:
+                        on_progress(ProgressEvent(
+                            input_path, message["stage"], message["done_bytes"], message["total_bytes"]
+                        ))
+                    continue
+                return message, reply_body
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def status(self) -> dict:
+        """デーモンのワーカーの状態（state: cold / warming / warm）と依頼の件数"""
+        message, _ = self._request({"op": "status"})
+        return message
+
+    def lock_file(
+        self,
+        path: str,
+        password: str,
+        output_dir: Optional[str] = None,
+        output_prefix: str = "鍵付き_",
+        streaming: bool = False,
+        timeout: Optional[float] = None,
+        on_progress: Optional[ClientProgressCallback] = None
+    ) -> ProcessResult:
+        """
+        サーバー上のファイルに鍵をかける（デーモンと同じパソコンのファイルであること）
+
+        Args:
+            path: 入力ファイルパス
+            password: 設定するパスワード
+            output_dir: 出力ディレクトリ（Noneの場合は入力ファイルと同じ場所）
+            output_prefix: 出力ファイル名のプレフィックス
+            streaming: Trueの場合はストリーミングで暗号化（大きなPDF向け）
+            timeout: このファイルの制限時間（秒）
+            on_progress: 進み具合を受け取るコールバック（返事を読み込むスレッドではなく、このスレッドで呼ばれます）
+
+        Returns:
+            ProcessResult: 処理結果
+        """
+        path = os.path.abspath(path)
+        message, _ = self._request({
+            "op": "lock_file",
+            "path": path,
+            "password": password,
+            "output_dir": os.path.abspath(output_dir) if output_dir else None,
+            "output_prefix": output_prefix,
+            "streaming": streaming,
+            "timeout": timeout,
+        }, on_progress=on_progress, input_path=path)
+        return _result_from_message(message, path)
+
+    def lock_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        password: str,
+        timeout: Optional[float] = None,
+        on_progress: Optional[ClientProgressCallback] = None
+    ) -> Tuple[bool, bytes, str]:
+        """
+        ファイルの内容を送って鍵をかける（process_uploaded_file と同じ戻り値）
+
+        Args:
+            data: ファイルの内容（PDFまたはOffice文書）
+            filename: ファイル名（拡張子で形式を判断します）
+            password: 設定するパスワード
+            timeout: このファイルの制限時間（秒）
+            on_progress: 進み具合を受け取るコールバック
+
+        Returns:
+            (成功フラグ, 暗号化されたPDFバイト, エラーメッセージ)
+        """
+        message, body = self._request({
+            "op": "lock_bytes",
+            "filename": filename,
+            "size": len(data),
+            "password": password,
+            "timeout": timeout,
+        }, body=data, on_progress=on_progress, input_path=filename)
+        if message.get("event") == "result" and message.get("success"):
+            return True, body, ""
+        return False, b"", message.get("error") or ""
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        self._reader.join()
+        self._file.close()
+
+    def __enter__(self) -> "LockClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _result_from_message(message: dict, input_path: str) -> ProcessResult:
+    """デーモンの返事を ProcessResult にする"""
+    stats = message.get("stats")
+    return ProcessResult(
+        success=bool(message.get("success")),
+        output_path=message.get("output_path"),
+        error_message=message.get("error") or "",
+        original_filename=Path(input_path).name,
+        input_path=input_path,
+        stats=StageStats(stats["durations"], stats["byte_counts"]) if stats else None,
+        timed_out=bool(message.get("timed_out")),
+        cancelled=bool(message.get("cancelled")),
+    )
@@ -25,10 +25,11 @@ import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
-from typing import Optional, List, Tuple
+from typing import Optional, List
 import threading
-import tempfile
-import shutil
+import logging
+import multiprocessing
+import time
 
 
 def _setup_tkdnd_path():
@@ -49,123 +50,51 @@ def _setup_tkdnd_path():
 # PyInstallerの場合、tkdndパスを先に設定
 _setup_tkdnd_path()
 
-# tkinterdnd2のインポート（ドラッグ&ドロップ機能）
-try:
-    from tkinterdnd2 import TkinterDnD, DND_FILES
-    DND_AVAILABLE = True
-except ImportError:
-    DND_AVAILABLE = False
-except Exception:
-    # その他のエラー（DLLロードエラーなど）
-    DND_AVAILABLE = False
-
-# pypdfのインポート
-try:
-    from pypdf import PdfReader, PdfWriter
-    from pypdf.errors import PdfReadError
-except ImportError:
-    messagebox.showerror(
-        "エラー",
-        "pypdfライブラリが見つかりません。\n"
-        "pip install pypdf[crypto] を実行してください。"
-    )
-    sys.exit(1)
-
-# Office文書変換用ライブラリ
-# docx2pdf（Word用）
-try:
-    from docx2pdf import convert as docx2pdf_convert
-    DOCX2PDF_AVAILABLE = True
-except ImportError:
-    DOCX2PDF_AVAILABLE = False
-
-# comtypes（Excel/PowerPoint用・Windows専用）
-if sys.platform == "win32":
-    try:
-        import comtypes.client
-        COMTYPES_AVAILABLE = True
-    except ImportError:
-        COMTYPES_AVAILABLE = False
-else:
-    COMTYPES_AVAILABLE = False
-
-
-def convert_office_to_pdf(input_path: str, output_path: str) -> Tuple[bool, str]:
-    """
-    Office文書をPDFに変換する
+# ドラッグ&ドロップ機能（tkinterdnd2）もtkdndライブラリの読み込みに時間がかかるため、
+# ウィンドウを表示してから読み込む（_load_drag_and_drop）
 
-    Args:
-        input_path: 入力ファイルパス（.docx, .xlsx, .pptx）
-        output_path: 出力PDFパス
+# 共通ロジック（core_logic）はpypdfと暗号化ライブラリを読み込むため時間がかかる。
+# 起動を速くするため、ウィンドウを表示してからバックグラウンドで読み込み、
+# 各メソッドでは使うときにインポートする（読み込み中の場合は終わるまで待つ）
 
-    Returns:
-        (成功フラグ, エラーメッセージ)
-    """
-    file_ext = Path(input_path).suffix.lower()
+# 起動時間の測定用（benchmarks/startup.py）。ファイル名を指定すると、ウィンドウが表示された時刻と
+# 共通ロジックを読み込み終えた時刻を書き込み、読み込み終えたら終了する
+STARTUP_PROBE_ENV = "PDF_LOCKER_STARTUP_PROBE"
 
-    # Word文書の変換
-    if file_ext == '.docx':
-        if DOCX2PDF_AVAILABLE:
-            try:
-                docx2pdf_convert(input_path, output_path)
-                return True, ""
-            except Exception as e:
-                return False, f"Word文書の変換に失敗しました: {str(e)}"
-        else:
-            return False, "Word文書の変換機能が利用できません。\ndocx2pdfライブラリをインストールしてください。"
+# 処理時間の内訳などのログ（環境変数 PDF_LOCKER_LOG にファイル名を指定すると保存されます）
+logger = logging.getLogger("pdf_locker")
 
-    # Excel/PowerPointの変換（Windows専用）
-    elif file_ext in ['.xlsx', '.pptx']:
-        if not sys.platform == "win32":
-            return False, "Excel/PowerPoint変換はWindows専用です。"
+# これより時間がかかりそうなファイルは、処理を始める前に知らせる（秒）
+LONG_FILE_SECONDS = 60
+# 1ファイルあたりの制限時間（秒）。止まってしまったファイルのために全体が終わらなくならないように
+FILE_TIMEOUT_SECONDS = 30 * 60
 
-        if not COMTYPES_AVAILABLE:
-            return False, "Office変換機能が利用できません。\ncomtypesライブラリをインストールしてください。"
-
-        try:
-            if file_ext == '.xlsx':
-                # Excel変換
-                excel = comtypes.client.CreateObject('Excel.Application')
-                excel.Visible = False
-                excel.DisplayAlerts = False
 
-                wb = excel.Workbooks.Open(str(Path(input_path).absolute()))
-                wb.ExportAsFixedFormat(0, str(Path(output_path).absolute()))
-                wb.Close(False)
-                excel.Quit()
-
-                return True, ""
-
-            elif file_ext == '.pptx':
-                # PowerPoint変換
-                powerpoint = comtypes.client.CreateObject('PowerPoint.Application')
-                powerpoint.Visible = 1
-
-                presentation = powerpoint.Presentations.Open(str(Path(input_path).absolute()))
-                presentation.SaveAs(str(Path(output_path).absolute()), 32)  # 32 = ppSaveAsPDF
-                presentation.Close()
-                powerpoint.Quit()
-
-                return True, ""
+def format_duration(seconds: float) -> str:
+    """
+    所要時間をわかりやすい言葉にする
 
-        except Exception as e:
-            error_msg = str(e)
-            if "Microsoft Office" in error_msg or "Excel" in error_msg or "PowerPoint" in error_msg:
-                return False, f"{file_ext}の変換に失敗しました。\nMicrosoft Officeがインストールされているか確認してください。"
-            return False, f"{file_ext}の変換に失敗しました: {error_msg}"
+    Args:
+        seconds: 秒数
 
-    return False, f"未対応の形式です: {file_ext}"
+    Returns:
+        「約30秒」「約5分」「約1時間20分」のような文字列
+    """
+    if seconds < 60:
+        return f"約{max(1, round(seconds))}秒"
+    minutes = round(seconds / 60)
+    if minutes < 60:
+        return f"約{minutes}分"
+    return f"約{minutes // 60}時間{minutes % 60}分"
 
 
 class PDFLockerApp:
     """PDF Lockerメインアプリケーション（シニア向けシンプル版）"""
 
     def __init__(self):
-        # TkinterDnDが利用可能な場合はそちらを使用（ドラッグ&ドロップ対応）
-        if DND_AVAILABLE:
-            self.root = TkinterDnD.Tk()
-        else:
-            self.root = tk.Tk()
+        # ドラッグ&ドロップ（tkinterdnd2）はウィンドウを表示してから組み込む
+        self.root = tk.Tk()
+        self.dnd_available = False
         self.root.title("PDFに鍵をかけるツール")
         self.root.geometry("700x550")
         self.root.minsize(700, 550)
@@ -182,6 +111,8 @@ class PDFLockerApp:
         self.current_step = 1  # 1: ファイル選択, 2: パスワード入力, 3: 完了
         self.selected_files: List[str] = []
         self.password: str = ""
+        self.output_folder: Optional[Path] = None  # 保存先（処理を始めたときに決まる）
+        self._core_loading = False
 
         self._create_widgets()
         self._show_step(1)
@@ -417,6 +348,19 @@ class PDFLockerApp:
             foreground="blue"
         )
 
+        # 処理をやめるボタン（処理中だけ表示）
+        self.cancel_event = multiprocessing.Event()
+        self.cancel_btn = tk.Button(
+            self.step2_frame,
+            text="やめる",
+            command=self._cancel_processing,
+            font=("Yu Gothic UI", 12),
+            bg="#9E9E9E",
+            fg="white",
+            activebackground="#757575",
+            cursor="hand2"
+        )
+
     def _create_step3_widgets(self):
         """ステップ3: 完了画面"""
         # 完了アイコンと メッセージ
@@ -526,8 +470,8 @@ class PDFLockerApp:
 
     def _open_output_folder(self):
         """出力フォルダを開く"""
-        output_dir = Path.home() / "Desktop" / "パスワード付きPDF"
-        if output_dir.exists():
+        output_dir = self.output_folder
+        if output_dir is not None and output_dir.exists():
             if sys.platform == "win32":
                 os.startfile(output_dir)
             elif sys.platform == "darwin":
@@ -561,14 +505,11 @@ class PDFLockerApp:
         )
 
         if files:
-            # サポートされている拡張子
-            supported_extensions = {'.pdf', '.docx', '.xlsx', '.pptx'}
+            from core_logic import is_supported_file
             unsupported_files = []
 
             for file in files:
-                file_ext = Path(file).suffix.lower()
-
-                if file_ext not in supported_extensions:
+                if not is_supported_file(file):
                     unsupported_files.append(Path(file).name)
                     continue
 
@@ -602,18 +543,8 @@ class PDFLockerApp:
 
     def _get_file_display_name(self, file_path: str) -> str:
         """ファイルの表示名を取得（アイコン付き）"""
-        file_ext = Path(file_path).suffix.lower()
-        file_name = Path(file_path).name
-
-        icon_map = {
-            '.pdf': '📄',
-            '.docx': '📝',
-            '.xlsx': '📊',
-            '.pptx': '📽️'
-        }
-
-        icon = icon_map.get(file_ext, '📁')
-        return f"{icon} {file_name}"
+        from core_logic import get_file_type_icon
+        return f"{get_file_type_icon(file_path)} {Path(file_path).name}"
 
     def _clear_files(self):
         """ファイルリストをクリア"""
@@ -661,6 +592,9 @@ class PDFLockerApp:
         self.finish_btn.config(state=tk.DISABLED)
         self.progress_bar.pack(fill=tk.X, pady=(20, 5))
         self.status_label.pack(pady=(0, 10))
+        self.cancel_event.clear()
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.cancel_btn.pack(pady=(0, 10))
         self.progress_var.set(0)
         self.status_var.set("処理を始めます...")
 
@@ -672,12 +606,19 @@ class PDFLockerApp:
         )
         thread.start()
 
+    def _cancel_processing(self):
+        """処理をやめる（処理中のファイルは途中で止め、残りのファイルは処理しない）"""
+        self.cancel_event.set()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.status_var.set("やめています...しばらくお待ちください")
+
     def _process_files(self, password: str):
         """ファイルを処理（バックグラウンドスレッド・シンプル版・Office文書対応）"""
+        from core_logic import get_default_output_dir, process_files, preflight_files, estimate_batch_seconds
+
         # 保存先フォルダを作成（デスクトップに固定）
-        output_dir = Path.home() / "Desktop" / "パスワード付きPDF"
         try:
-            output_dir.mkdir(parents=True, exist_ok=True)
+            output_dir = get_default_output_dir()
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror(
                 "エラー",
@@ -685,129 +626,93 @@ class PDFLockerApp:
             ))
             return
 
-        # 一時ファイル用ディレクトリ
-        temp_dir = None
-        try:
-            temp_dir = tempfile.mkdtemp()
-        except Exception:
-            pass
-
         total = len(self.selected_files)
         success_count = 0
+        cancelled_count = 0
         error_files = []
         self.output_folder = output_dir  # 完了画面で使用
 
-        for i, file_path in enumerate(self.selected_files):
-            pdf_path_to_encrypt = None
-            is_temp_pdf = False
-
-            try:
-                file_name = Path(file_path).name
-                file_ext = Path(file_path).suffix.lower()
-
-                self.root.after(0, lambda name=file_name: self.status_var.set(
-                    f"処理中: {name}"
-                ))
-
-                # Office文書の場合、まずPDFに変換
-                if file_ext in ['.docx', '.xlsx', '.pptx']:
-                    if temp_dir is None:
-                        error_files.append((file_path, "一時ファイルの作成に失敗しました"))
-                        continue
-
-                    # Word/Excel/PowerPointをPDFに変換
-                    temp_pdf = Path(temp_dir) / f"{Path(file_path).stem}.pdf"
-
-                    # 変換状況をステータスに表示
-                    self.root.after(0, lambda name=file_name: self.status_var.set(
-                        f"PDFに変換中: {name}"
-                    ))
-
-                    success, error_msg = convert_office_to_pdf(file_path, str(temp_pdf))
-
-                    if not success:
-                        error_files.append((file_path, error_msg))
-                        continue
-
-                    pdf_path_to_encrypt = str(temp_pdf)
-                    is_temp_pdf = True
-
-                    # 変換完了後、暗号化処理に移る
-                    self.root.after(0, lambda name=file_name: self.status_var.set(
-                        f"鍵をかけています: {name}"
-                    ))
-                else:
-                    # 既にPDFの場合
-                    pdf_path_to_encrypt = file_path
-
-                # PDFを読み込む
-                reader = PdfReader(pdf_path_to_encrypt)
-
-                # 既に暗号化されている場合
-                if reader.is_encrypted:
-                    error_files.append((file_path, "すでに鍵がかかっています"))
-                    continue
-
-                # 新しいPDFを作成
-                writer = PdfWriter()
-
-                # すべてのページをコピー
-                for page in reader.pages:
-                    writer.add_page(page)
-
-                # メタデータをコピー
-                if reader.metadata:
-                    writer.add_metadata(reader.metadata)
-
-                # AES-256で暗号化
-                writer.encrypt(
-                    user_password=password,
-                    owner_password=password,
-                    algorithm="AES-256"
-                )
-
-                # 保存先を決定（デスクトップの「パスワード付きPDF」フォルダ）
-                # 元のファイル名を使用（拡張子はpdfに変更）
-                original_path = Path(file_path)
-                output_filename = f"鍵付き_{original_path.stem}.pdf"
-                output_path = output_dir / output_filename
-
-                # ファイルを保存
-                with open(output_path, "wb") as f:
-                    writer.write(f)
-
+        # 処理を始める前にファイルを確認して、かかる時間の目安を求める
+        self.root.after(0, lambda: self.status_var.set("ファイルを確認しています..."))
+        estimates = preflight_files(self.selected_files)
+        remaining = {estimate.path: estimate.cost for estimate in estimates}
+        # 進捗バーは、かかる時間の目安で重み付けした各ファイルの進み具合の合計で表す
+        weights = {estimate.path: max(estimate.cost, 0.001) for estimate in estimates}
+        fractions = {path: 0.0 for path in weights}
+        finished = set()
+        fractions_lock = threading.Lock()
+
+        def update_progress(path: str, fraction: float, final: bool = False) -> None:
+            with fractions_lock:
+                # 結果より後に届いた進み具合（終わったファイル）は無視する
+                if path not in fractions or path in finished:
+                    return
+                if final:
+                    finished.add(path)
+                fractions[path] = fraction
+                progress = sum(weights[p] * f for p, f in fractions.items()) / sum(weights.values()) * 100
+            self.root.after(0, lambda: self.progress_var.set(progress))
+
+        def on_progress(event: "ProgressEvent") -> None:
+            update_progress(event.input_path, event.fraction)
+
+        message = f"鍵をかけています... (0/{total})　あと{format_duration(estimate_batch_seconds(remaining.values()))}"
+        long_files = [estimate for estimate in estimates if estimate.cost >= LONG_FILE_SECONDS]
+        if long_files:
+            slowest = max(long_files, key=lambda estimate: estimate.cost)
+            message += f"\n時間がかかりそうなファイル: {Path(slowest.path).name}（{format_duration(slowest.cost)}）"
+        self.root.after(0, lambda: self.status_var.set(message))
+
+        # 複数のファイルを並列で処理（時間のかかるものから始め、終わったものから結果が返る）
+        results = process_files(
+            self.selected_files,
+            password,
+            output_dir=str(output_dir),
+            on_stats=self._log_stats,
+            estimates=estimates,
+            on_progress=on_progress,
+            cancel_event=self.cancel_event,
+            file_timeout=FILE_TIMEOUT_SECONDS
+        )
+        for i, result in enumerate(results):
+            if result.success:
                 success_count += 1
+            elif result.cancelled:
+                cancelled_count += 1
+            else:
+                error_files.append((result.input_path, result.error_message))
 
-            except PdfReadError:
-                error_files.append((file_path, "PDFファイルが壊れているかもしれません"))
-            except PermissionError:
-                error_files.append((file_path, "このファイルは開けません（使用中の可能性）"))
-            except Exception as e:
-                error_msg = str(e)
-                if "Office" in error_msg or "Excel" in error_msg or "PowerPoint" in error_msg:
-                    error_files.append((file_path, "Office文書の処理に失敗しました"))
-                else:
-                    error_files.append((file_path, "エラーが発生しました"))
-
-            # 進捗を更新
-            progress = ((i + 1) / total) * 100
-            self.root.after(0, lambda p=progress: self.progress_var.set(p))
-
-        # 一時ディレクトリをクリーンアップ
-        if temp_dir and os.path.exists(temp_dir):
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception:
-                pass
+            remaining.pop(result.input_path, None)
+            update_progress(result.input_path, 1.0, final=True)
+            eta = format_duration(estimate_batch_seconds(remaining.values())) if remaining else ""
+            self.root.after(0, lambda name=result.original_filename, done=i + 1, eta=eta: self.status_var.set(
+                f"終わりました: {name} ({done}/{total})" + (f"　あと{eta}" if eta else "")
+            ))
 
         # 完了処理
         self.root.after(0, lambda: self._on_process_complete(
-            success_count, error_files
+            success_count, error_files, cancelled_count
         ))
 
-    def _on_process_complete(self, success_count: int, error_files: List[tuple]):
+    def _log_stats(self, file_name: str, stats: "StageStats"):
+        """ファイルごとの処理時間の内訳をログに残す（遅いときの原因調査用）"""
+        logger.info("%s: %.2fs %s", file_name, stats.total_seconds, stats.summary())
+
+    def _on_process_complete(self, success_count: int, error_files: List[tuple], cancelled_count: int = 0):
         """処理完了時のコールバック（シンプル版）"""
         self.finish_btn.config(state=tk.NORMAL)
+        self.cancel_btn.pack_forget()
+
+        # 途中でやめた場合
+        if cancelled_count:
+            self.status_var.set("やめました")
+            messagebox.showinfo(
+                "やめました",
+                f"{success_count}個のファイルに鍵をかけたところでやめました。\n\n"
+                f"{cancelled_count}個のファイルには鍵をかけていません。"
+            )
+            if success_count == 0:
+                return
 
         # エラーがあった場合
         if error_files:
@@ -830,7 +735,7 @@ class PDFLockerApp:
                 return
 
         # 完了画面に情報を設定
-        output_dir = Path.home() / "Desktop" / "パスワード付きPDF"
+        output_dir = self.output_folder
         result_text = f"✓ {success_count}個のPDFファイルに鍵をかけました\n\n"
         result_text += f"保存した場所:\n{output_dir}\n\n"
         result_text += "ファイル名の最初に「鍵付き_」が付いています。"
@@ -853,11 +758,81 @@ class PDFLockerApp:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f"{width}x{height}+{x}+{y}")
 
+        # ウィンドウが表示されてから共通ロジックを読み込む
+        self.root.bind("<Map>", self._on_first_map, add="+")
         self.root.mainloop()
 
+    def _on_first_map(self, event):
+        """最初にウィンドウが表示されたときの処理（子ウィジェットの表示でも呼ばれるため1回だけ）"""
+        if event.widget is not self.root or self._core_loading:
+            return
+        self._core_loading = True
+        self._record_startup("window")
+        threading.Thread(target=self._load_core, name="core-loader", daemon=True).start()
+        # Tclの処理はメインスレッドで行う必要があるため、最初の描画が終わってから読み込む
+        self.root.after_idle(self._load_drag_and_drop)
+
+    def _load_drag_and_drop(self):
+        """ドラッグ&ドロップ機能（tkinterdnd2）を表示済みのウィンドウに組み込む"""
+        try:
+            from tkinterdnd2 import TkinterDnD
+            # TkinterDnD.Tk() が作成時に行うのと同じ読み込みを、作成済みのウィンドウに対して行う
+            # （古い版の tkinterdnd2 には公開の require がなく、同じ処理が _require の名前で入っている）
+            require = getattr(TkinterDnD, "require", None) or TkinterDnD._require
+            require(self.root)
+            self.dnd_available = True
+        except Exception as e:
+            # 未インストール・DLLの読み込みエラーなど（ドラッグ&ドロップなしで使える）
+            logger.info("Drag and drop is not available: %s", e)
+            self.dnd_available = False
+
+    def _load_core(self):
+        """共通ロジック（pypdf・暗号化ライブラリ）を読み込む（バックグラウンドスレッド）"""
+        try:
+            from core_logic import check_dependencies, default_worker_count, get_worker_pool
+            ok, error_msg = check_dependencies()
+        except Exception as e:
+            ok, error_msg = False, f"プログラムの読み込みに失敗しました: {str(e)}"
+        self.root.after(0, lambda: self._on_core_loaded(ok, error_msg))
+
+        # ファイルを選んでいる間にワーカーを起動しておく（最初のバッチでワーカーの起動を待たない）
+        if ok and not os.environ.get(STARTUP_PROBE_ENV) and default_worker_count() > 1:
+            try:
+                get_worker_pool().warm()
+            except Exception as e:
+                logger.warning("Could not start worker pool: %s", e)
+
+    def _on_core_loaded(self, ok: bool, error_msg: str):
+        """共通ロジックを読み込み終えたときの処理"""
+        self._record_startup("ready")
+        if not ok:
+            messagebox.showerror("エラー", error_msg)
+            self.root.destroy()
+            return
+        if os.environ.get(STARTUP_PROBE_ENV):
+            self.root.destroy()
+
+    def _record_startup(self, event: str):
+        """起動時間の測定用に時刻を書き込む（STARTUP_PROBE_ENV が指定された場合のみ）"""
+        probe_path = os.environ.get(STARTUP_PROBE_ENV)
+        if probe_path:
+            with open(probe_path, "a", encoding="utf-8") as f:
+                f.write(f"{event} {time.time()}\n")
+
 
 def main():
     """メインエントリーポイント"""
+    # exe化した場合にワーカープロセスが自分自身を起動できるようにする
+    multiprocessing.freeze_support()
+
+    log_file = os.environ.get("PDF_LOCKER_LOG")
+    if log_file:
+        logging.basicConfig(
+            filename=log_file,
+            level=logging.INFO,
+            format="%(asctime)s %(levelname)s %(message)s"
+        )
+
     app = PDFLockerApp()
     app.run()
 
@@ -0,0 +1,48 @@
+"""
+テストの共通設定
+
+Officeを使わずにOffice文書の処理を確かめられるよう、変換には FakeConverterBackend を使い、
+変換結果のキャッシュは使わないようにします（ワーカープロセスにも引き継がれるよう、読み込み時に設定）。
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ["PDF_LOCKER_CONVERTER"] = "fake"
+os.environ["PDF_LOCKER_CACHE_MAX_MB"] = "0"
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+PASSWORD = "test-password"
+
+
+def write_pdf(path: Path, pages: int = 1) -> Path:
+    """空白ページだけのPDFを作る"""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def assert_locked(path, password: str = PASSWORD) -> None:
+    """鍵がかかっていて、パスワードで開けることを確かめる"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(path))
+    assert reader.is_encrypted
+    assert reader.decrypt(password)
+    assert len(reader.pages) >= 1
+
+
+@pytest.fixture
+def pdf_file(tmp_path) -> Path:
+    return write_pdf(tmp_path / "input.pdf", pages=3)
@@ -0,0 +1,29 @@
+"""BatchManifest（バッチ処理の記録）の動作確認"""
+
+import core_logic
+from conftest import PASSWORD, write_pdf
+
+
+def test_manifest_uses_hash_from_worker(tmp_path, monkeypatch):
+    inputs = [str(write_pdf(tmp_path / f"{name}.pdf")) for name in ("a", "b")]
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    results = list(core_logic.process_files(
+        inputs, PASSWORD, output_dir=str(output_dir), workers=2, hash_inputs=True
+    ))
+    assert all(result.input_sha256 == core_logic.file_sha256(result.input_path) for result in results)
+
+    # 親プロセスでは読み直さない
+    def fail(path):
+        raise AssertionError(f"rehashed {path}")
+
+    monkeypatch.setattr(core_logic, "file_sha256", fail)
+    manifest_path = tmp_path / "manifest.jsonl"
+    with core_logic.BatchManifest(str(manifest_path), PASSWORD) as manifest:
+        for result in results:
+            manifest.record(result)
+    monkeypatch.undo()
+
+    with core_logic.BatchManifest(str(manifest_path), PASSWORD) as manifest:
+        for result in results:
+            assert manifest.is_complete(result.input_path, result.output_path)
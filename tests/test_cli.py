@@ -0,0 +1,79 @@
+"""コマンドライン（python -m core_logic lock）の動作確認"""
+
+import json
+
+import pytest
+
+import core_logic
+from conftest import PASSWORD, assert_locked, write_pdf
+
+OFFICE_STUB = b"PK\x05\x06" + b"\0" * 18
+
+
+@pytest.fixture
+def password_file(tmp_path):
+    path = tmp_path / "password.txt"
+    path.write_text(PASSWORD + "\n", encoding="utf-8")
+    return path
+
+
+def _run(capsys, argv):
+    """main を実行し、(終了コード, JSON Linesの記録) を返す"""
+    code = core_logic.main(argv)
+    out = capsys.readouterr().out
+    return code, [json.loads(line) for line in out.splitlines()]
+
+
+def test_lock_writes_json_lines(tmp_path, capsys, password_file):
+    input_dir = tmp_path / "in"
+    (input_dir / "sub").mkdir(parents=True)
+    write_pdf(input_dir / "a.pdf")
+    (input_dir / "sub" / "b.docx").write_bytes(OFFICE_STUB)
+    (input_dir / "notes.txt").write_text("対象外")
+    output_dir = tmp_path / "out"
+
+    code, records = _run(capsys, [
+        "lock", "--password-file", str(password_file), "--jobs", "2", str(input_dir), str(output_dir)
+    ])
+
+    assert code == 0
+    assert sorted(record["input"] for record in records) == [
+        str(input_dir / "a.pdf"), str(input_dir / "sub" / "b.docx")
+    ]
+    for record in records:
+        assert record["success"] and record["error"] is None and not record["skipped"]
+        assert_locked(record["output"])
+    # 入力と同じフォルダ構成で保存する
+    assert (output_dir / "sub" / "鍵付き_b.pdf").exists()
+
+
+def test_lock_exits_with_1_on_failure(tmp_path, capsys, password_file):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_pdf(input_dir / "a.pdf")
+    (input_dir / "x_fail.docx").write_bytes(OFFICE_STUB)
+
+    code, records = _run(capsys, [
+        "lock", "--password-file", str(password_file), str(input_dir), str(tmp_path / "out")
+    ])
+
+    assert code == 1
+    results = {record["input"]: record for record in records}
+    assert results[str(input_dir / "a.pdf")]["success"]
+    failed = results[str(input_dir / "x_fail.docx")]
+    assert not failed["success"]
+    assert failed["error"]
+    assert failed["output"] is None
+
+
+def test_lock_rejects_bad_password_file(tmp_path, capsys):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    short = tmp_path / "short.txt"
+    short.write_text("abc\n", encoding="utf-8")
+
+    assert core_logic.main(["lock", "--password-file", str(short), str(input_dir), str(tmp_path / "out")]) == 2
+    assert core_logic.main([
+        "lock", "--password-file", str(tmp_path / "missing.txt"), str(input_dir), str(tmp_path / "out")
+    ]) == 2
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,63 @@
+"""ConversionCache（Office文書の変換結果のキャッシュ）の動作確認"""
+
+import stat
+import sys
+
+import pytest
+
+import core_logic
+from conftest import write_pdf
+
+
+@pytest.fixture
+def fresh_cache_settings(monkeypatch):
+    monkeypatch.setattr(core_logic, "_conversion_cache", None)
+    monkeypatch.setattr(core_logic, "_conversion_cache_loaded", False)
+    return monkeypatch
+
+
+def test_cache_is_disabled_by_default(fresh_cache_settings, tmp_path):
+    fresh_cache_settings.delenv("PDF_LOCKER_CACHE_MAX_MB", raising=False)
+    fresh_cache_settings.setenv("PDF_LOCKER_CACHE_DIR", str(tmp_path / "cache"))
+    assert core_logic.get_conversion_cache() is None
+
+
+def test_cache_is_enabled_with_a_size_limit(fresh_cache_settings, tmp_path):
+    fresh_cache_settings.setenv("PDF_LOCKER_CACHE_MAX_MB", "10")
+    fresh_cache_settings.setenv("PDF_LOCKER_CACHE_DIR", str(tmp_path / "cache"))
+    cache = core_logic.get_conversion_cache()
+    assert cache is not None
+    assert cache.max_bytes == 10 * 1024 * 1024
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIXのアクセス権で確かめる")
+def test_cache_directories_are_private(tmp_path):
+    base = tmp_path / "home" / "pdf_locker"
+    root = base / "conversion_cache"
+    cache = core_logic.ConversionCache(root, 10 * 1024 * 1024)
+    key = cache.make_key("0" * 64, ".docx", "fake")
+
+    cache.put(key, str(write_pdf(tmp_path / "a.pdf")))
+
+    for path in (tmp_path / "home", base, root, root / "v1", root / "v1" / key[:2]):
+        assert stat.S_IMODE(path.stat().st_mode) == 0o700, path
+    assert cache.get(key, str(tmp_path / "copy.pdf"))
+
+
+def test_converter_version_is_looked_up_once(monkeypatch):
+    calls = []
+
+    class CountingBackend(core_logic.FakeConverterBackend):
+        name = "counting"
+
+        def version(self):
+            calls.append(self.name)
+            return "counting 1.0"
+
+    monkeypatch.setitem(core_logic.CONVERTER_BACKENDS, "counting", CountingBackend)
+    monkeypatch.setattr(core_logic, "_converter_versions", {})
+    first = core_logic.ConverterPool("counting")
+    second = core_logic.ConverterPool("counting")
+
+    assert [first.version(), first.version(), second.version()] == ["counting 1.0"] * 3
+    assert calls == ["counting"]
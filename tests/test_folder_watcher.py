@@ -0,0 +1,90 @@
+"""フォルダ監視（FolderWatcher）の動作確認"""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from conftest import PASSWORD, assert_locked, write_pdf
+from folder_watcher import FolderWatcher
+
+
+def _wait_for(predicate, timeout: float = 30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+@pytest.mark.parametrize("use_inotify", [True, False], ids=["inotify", "polling"])
+def test_watch_locks_dropped_files(tmp_path, use_inotify):
+    inbox = tmp_path / "inbox"
+    output = tmp_path / "out"
+    inbox.mkdir()
+    watcher = FolderWatcher(
+        str(inbox), str(output), PASSWORD,
+        workers=2, settle_seconds=0.2, poll_seconds=0.2, rescan_seconds=0.5, use_inotify=use_inotify
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        assert _wait_for(lambda: (inbox / ".pdf_locker_work").is_dir())
+        write_pdf(inbox / "x.pdf")
+        (inbox / "y_fail.docx").write_bytes(b"PK\x05\x06" + b"\0" * 18)
+        (inbox / "z.docx").write_bytes(b"PK\x05\x06" + b"\0" * 18)
+
+        assert _wait_for(lambda: watcher.stats().succeeded == 2 and watcher.stats().failed == 1)
+    finally:
+        stop.set()
+        thread.join(timeout=30)
+    assert not thread.is_alive()
+
+    assert_locked(output / "鍵付き_x.pdf")
+    assert_locked(output / "鍵付き_z.pdf")
+    assert (output / "処理できなかったファイル" / "y_fail.docx").exists()
+    assert sorted(p.name for p in (output / "処理済み").iterdir()) == ["x.pdf", "z.docx"]
+    assert list(Path(inbox / ".pdf_locker_work").iterdir()) == []
+
+
+def test_watch_resumes_leftover_work(tmp_path):
+    inbox = tmp_path / "inbox"
+    output = tmp_path / "out"
+    work = inbox / ".pdf_locker_work"
+
+    # 出力ファイル名のように見える名前の入力（まだ処理していない）
+    (work / "a" / "input").mkdir(parents=True)
+    write_pdf(work / "a" / "input" / "鍵付き_a.pdf")
+    # 鍵付きPDFはできているが、移す前に止まった（書きかけの一時ファイルも残っている）
+    (work / "b" / "input").mkdir(parents=True)
+    write_pdf(work / "b" / "input" / "b.pdf")
+    (work / "b" / "鍵付き_b.pdf").write_bytes(b"already locked")
+    (work / "b" / "tmp1234.part").write_bytes(b"partial")
+    # 元のファイルは移し終えたが、鍵付きPDFを移す前に止まった
+    (work / "c").mkdir()
+    (work / "c" / "鍵付き_c.pdf").write_bytes(b"already locked")
+
+    watcher = FolderWatcher(
+        str(inbox), str(output), PASSWORD,
+        workers=2, settle_seconds=0.2, poll_seconds=0.2, rescan_seconds=0.5, use_inotify=False
+    )
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        assert _wait_for(lambda: not any(work.iterdir()))
+    finally:
+        stop.set()
+        thread.join(timeout=30)
+    assert not thread.is_alive()
+
+    assert_locked(output / "鍵付き_鍵付き_a.pdf")
+    assert (output / "鍵付き_b.pdf").read_bytes() == b"already locked"
+    assert (output / "鍵付き_c.pdf").read_bytes() == b"already locked"
+    assert sorted(p.name for p in (output / "処理済み").iterdir()) == ["b.pdf", "鍵付き_a.pdf"]
+    assert sorted(p.name for p in output.iterdir() if p.is_file()) == [
+        "鍵付き_b.pdf", "鍵付き_c.pdf", "鍵付き_鍵付き_a.pdf"
+    ]
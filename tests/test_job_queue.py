@@ -0,0 +1,75 @@
+"""JobQueue（Webアプリ用のバックグラウンド処理）の動作確認"""
+
+import time
+
+import pytest
+
+import core_logic
+from conftest import PASSWORD, assert_locked, write_pdf
+
+
+def _wait_for(predicate, timeout: float = 60.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def job_queue():
+    completed = []
+    queue = core_logic.JobQueue(workers=1, on_complete=completed.append)
+    queue.completed = completed
+    yield queue
+    queue.shutdown()
+
+
+def _submit(queue, path):
+    with open(path, "rb") as f:
+        return queue.submit(f, path.name, PASSWORD)
+
+
+def test_submit_poll_and_result(job_queue, tmp_path):
+    job_ids = [_submit(job_queue, write_pdf(tmp_path / f"{name}.pdf", pages=2)) for name in ("a", "b")]
+
+    assert _wait_for(lambda: all(job_queue.status(job_id).finished for job_id in job_ids))
+    for job_id in job_ids:
+        job = job_queue.status(job_id)
+        assert job.state == core_logic.JOB_DONE, job.result.error_message
+        assert job.progress == 1.0
+        assert_locked(job.result.output_path)
+    assert sorted(job.job_id for job in job_queue.completed) == sorted(job_ids)
+    assert job_queue.active_count() == 0
+
+    job_queue.discard(job_ids[0])
+    assert job_queue.status(job_ids[0]) is None
+    assert job_queue.status("missing") is None
+
+
+def test_cancel_running_and_queued_jobs(job_queue, tmp_path):
+    running = _submit(job_queue, write_pdf(tmp_path / "big.pdf", pages=3000))
+    queued = _submit(job_queue, write_pdf(tmp_path / "queued.pdf"))
+    assert _wait_for(lambda: job_queue.status(running).progress > 0)
+
+    # 処理中のジョブにも取り消しの合図が届く
+    assert job_queue.cancel(running)
+    # まだワーカーに渡していないジョブはその場で取り消される
+    assert job_queue.cancel(queued)
+    assert job_queue.status(queued).state == core_logic.JOB_CANCELLED
+
+    assert _wait_for(lambda: job_queue.status(running).finished)
+    job = job_queue.status(running)
+    assert job.state == core_logic.JOB_CANCELLED
+    assert job.result.cancelled
+    assert not job_queue.cancel(running)
+    assert not job_queue.cancel("missing")
+
+    # 取り消しの合図はそのジョブだけのもので、あとのジョブは処理される
+    after = _submit(job_queue, write_pdf(tmp_path / "after.pdf"))
+    assert _wait_for(lambda: job_queue.status(after).finished)
+    assert job_queue.status(after).state == core_logic.JOB_DONE
+    assert {job.job_id: job.state for job in job_queue.completed} == {
+        running: core_logic.JOB_CANCELLED, queued: core_logic.JOB_CANCELLED, after: core_logic.JOB_DONE
+    }
@@ -0,0 +1,154 @@
+"""lock_daemon（Unixドメインソケットで依頼を受け付けるデーモン）の動作確認"""
+
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import PASSWORD, assert_locked, write_pdf
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unixドメインソケットを使う")
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    """デーモンを別スレッドで動かし、ソケットのパスを返す"""
+    from lock_daemon import LockDaemon
+
+    socket_path = str(tmp_path / "daemon.sock")
+    lock_daemon = LockDaemon(socket_path=socket_path, workers=2)
+    loop = asyncio.new_event_loop()
+    stop_event = asyncio.Event()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_until_complete(lock_daemon.serve(stop_event))
+
+    thread = threading.Thread(target=run, name="lock-daemon", daemon=True)
+    thread.start()
+    started.wait(10)
+    for _ in range(100):
+        if (tmp_path / "daemon.sock").exists():
+            break
+        time.sleep(0.05)
+    yield socket_path
+    loop.call_soon_threadsafe(stop_event.set)
+    thread.join(30)
+    loop.close()
+
+
+class RawConnection:
+    """通信の形式を直接確かめるための接続"""
+
+    def __init__(self, socket_path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(30)
+        self.sock.connect(socket_path)
+        self.file = self.sock.makefile("rb")
+
+    def send(self, message, body=b""):
+        self.sock.sendall(json.dumps(message).encode("utf-8") + b"\n" + body)
+
+    def receive(self):
+        message = json.loads(self.file.readline())
+        body = self.file.read(message["size"]) if message.get("size") else b""
+        return message, body
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def test_status_lock_file_and_lock_bytes(daemon, tmp_path):
+    from lock_daemon import LockClient
+
+    source = write_pdf(tmp_path / "a.pdf", pages=2)
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    with LockClient(daemon, timeout=60) as client:
+        status = client.status()
+        assert status["event"] == "status"
+        assert status["workers"] >= 2
+
+        result = client.lock_file(str(source), PASSWORD, output_dir=str(output_dir), timeout=60)
+        assert result.success, result.error_message
+        assert_locked(result.output_path)
+
+        success, locked, error_msg = client.lock_bytes(source.read_bytes(), "a.pdf", PASSWORD)
+        assert success, error_msg
+        (tmp_path / "from_bytes.pdf").write_bytes(locked)
+        assert_locked(tmp_path / "from_bytes.pdf")
+
+
+@pytest.mark.parametrize("field, value", [
+    ("timeout", "abc"),
+    ("timeout", 0),
+    ("timeout", -1),
+    ("output_dir", "relative/out"),
+    ("output_dir", 5),
+    ("path", None),
+    ("path", "relative.pdf"),
+])
+def test_malformed_request_keeps_connection_open(daemon, tmp_path, field, value):
+    source = write_pdf(tmp_path / "a.pdf")
+    request = {"id": "bad", "op": "lock_file", "path": str(source), "password": PASSWORD}
+    request[field] = value
+    conn = RawConnection(daemon)
+    try:
+        conn.send(request)
+        message, _ = conn.receive()
+        assert message["id"] == "bad"
+        assert message["event"] == "error"
+
+        # 同じ接続で次の依頼を受け付ける
+        conn.send({"id": "next", "op": "status"})
+        message, _ = conn.receive()
+        assert message == dict(message, id="next", event="status")
+    finally:
+        conn.close()
+
+
+def test_malformed_size_keeps_connection_open(daemon):
+    conn = RawConnection(daemon)
+    try:
+        conn.send({"id": "bad", "op": "lock_bytes", "filename": "a.pdf", "size": "10", "password": PASSWORD})
+        message, _ = conn.receive()
+        assert (message["id"], message["event"]) == ("bad", "error")
+        conn.send({"id": "next", "op": "status"})
+        assert conn.receive()[0]["event"] == "status"
+    finally:
+        conn.close()
+
+
+def test_cancel(daemon, tmp_path):
+    source = write_pdf(tmp_path / "big.pdf", pages=3000)
+    conn = RawConnection(daemon)
+    try:
+        conn.send({"id": "missing", "op": "cancel", "target": "nothing"})
+        assert conn.receive()[0] == {"id": "missing", "event": "cancel", "found": False}
+
+        conn.send({
+            "id": "job", "op": "lock_file", "path": str(source), "password": PASSWORD,
+            "output_dir": str(tmp_path), "progress": True,
+        })
+        message, _ = conn.receive()
+        assert (message["id"], message["event"]) == ("job", "progress")
+        conn.send({"id": "stop", "op": "cancel", "target": "job"})
+
+        replies = {}
+        while "job" not in replies or "stop" not in replies:
+            message, _ = conn.receive()
+            if message["event"] != "progress":
+                replies[message["id"]] = message
+        assert replies["stop"]["found"] is True
+        assert replies["job"]["event"] == "result"
+        assert replies["job"]["cancelled"] is True
+        assert not replies["job"]["success"]
+    finally:
+        conn.close()
@@ -0,0 +1,148 @@
+"""lock_pdf_file の各方式（通常・ストリーミング・メモリマップ）の動作確認"""
+
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+import core_logic
+from conftest import PASSWORD, assert_locked, write_pdf
+
+
+@pytest.mark.parametrize("streaming", [False, True], ids=["normal", "streaming"])
+@pytest.mark.parametrize("use_mmap", [False, True], ids=["read", "mmap"])
+def test_lock_pdf_file(tmp_path, pdf_file, streaming, use_mmap):
+    output = tmp_path / "locked.pdf"
+    success, error_msg = core_logic.lock_pdf_file(
+        str(pdf_file), str(output), PASSWORD, streaming=streaming, use_mmap=use_mmap
+    )
+    assert success, error_msg
+    assert_locked(output)
+
+
+def test_lock_pdf_file_rejects_locked_pdf(tmp_path, pdf_file):
+    locked = tmp_path / "locked.pdf"
+    assert core_logic.lock_pdf_file(str(pdf_file), str(locked), PASSWORD)[0]
+    success, error_msg = core_logic.lock_pdf_file(str(locked), str(tmp_path / "again.pdf"), PASSWORD, streaming=True)
+    assert not success
+    assert "鍵" in error_msg
+
+
+def test_lock_pdf_stream_reports_progress(tmp_path):
+    source = write_pdf(tmp_path / "pages.pdf", pages=20)
+    events = []
+    output = tmp_path / "locked.pdf"
+    with open(source, "rb") as src, open(output, "wb") as dst:
+        success, error_msg = core_logic.lock_pdf_stream(src, dst, PASSWORD, progress=lambda *event: events.append(event))
+    assert success, error_msg
+    assert events and events[-1][1] == events[-1][2]
+    assert_locked(output)
+
+
+def test_lock_pdf_file_leaves_no_partial_output_on_cancel(tmp_path):
+    source = write_pdf(tmp_path / "pages.pdf", pages=20)
+    output = tmp_path / "out" / "locked.pdf"
+    output.parent.mkdir()
+
+    def progress(stage, done, total):
+        if stage == core_logic.STAGE_WRITE and done:
+            raise core_logic._Stopped("取り消しました", timed_out=False)
+
+    with pytest.raises(core_logic._Stopped):
+        core_logic.lock_pdf_file(str(source), str(output), PASSWORD, progress=progress)
+    assert list(output.parent.iterdir()) == []
+
+
+def test_plan_output_paths_makes_names_unique(tmp_path):
+    paths = [str(tmp_path / "a.pdf"), str(tmp_path / "a.docx"), str(tmp_path / "A.xlsx"), str(tmp_path / "b.pdf")]
+    planned = core_logic.plan_output_paths(paths, str(tmp_path / "out"))
+    assert [planned[path].name for path in paths] == ["鍵付き_a.pdf", "鍵付き_a (2).pdf", "鍵付き_A (3).pdf", "鍵付き_b.pdf"]
+
+
+def test_lock_pdf_file_stops_while_cloning(tmp_path):
+    source = write_pdf(tmp_path / "pages.pdf", pages=300)
+    stop = core_logic._StopCheck(threading.Event())
+    stages = []
+
+    def progress(stage, done, total):
+        stages.append((stage, done))
+        if stage == core_logic.STAGE_COPY_PAGES and done:
+            # コピーの途中で取り消す（次の知らせで打ち切られる）
+            stop.cancel_event.set()
+
+    checked = core_logic._ProgressThrottle(stop.wrap(progress), interval=0)
+    with pytest.raises(core_logic._Stopped):
+        core_logic.lock_pdf_file(str(source), str(tmp_path / "locked.pdf"), PASSWORD, progress=checked)
+    assert stages[-1][0] == core_logic.STAGE_COPY_PAGES
+    assert not (tmp_path / "locked.pdf").exists()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIXのアクセス権で確かめる")
+def test_streaming_output_has_default_mode(tmp_path, pdf_file, monkeypatch):
+    old_umask = os.umask(0o022)
+    try:
+        assert core_logic._default_file_mode() == 0o644
+    finally:
+        os.umask(old_umask)
+    # 一時ファイル（0600）のままではなく、open() で作った場合と同じアクセス権にする
+    monkeypatch.setattr(core_logic, "_OUTPUT_FILE_MODE", 0o644)
+    output = tmp_path / "locked.pdf"
+    assert core_logic.lock_pdf_file(str(pdf_file), str(output), PASSWORD, streaming=True)[0]
+    assert stat.S_IMODE(output.stat().st_mode) == 0o644
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".part"] == []
+
+
+def test_streaming_missing_input_leaves_no_temp_file(tmp_path):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    with pytest.raises(OSError):
+        core_logic._lock_pdf_file_streaming(str(tmp_path / "missing.pdf"), str(output_dir / "locked.pdf"), PASSWORD)
+    assert list(output_dir.iterdir()) == []
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIXのアクセス権で確かめる")
+@pytest.mark.parametrize("options", [{}, {"streaming": True}, {"parallel": 2}], ids=["normal", "streaming", "parallel"])
+def test_output_mode_matches_open(tmp_path, pdf_file, monkeypatch, options):
+    monkeypatch.setattr(core_logic, "_OUTPUT_FILE_MODE", 0o644)
+    monkeypatch.setattr(core_logic, "PARALLEL_MIN_BYTES", 1)
+    monkeypatch.setattr(core_logic, "PARALLEL_MIN_OBJECTS", 1)
+    output = tmp_path / "out" / "locked.pdf"
+    output.parent.mkdir()
+
+    success, error_msg = core_logic.lock_pdf_file(str(pdf_file), str(output), PASSWORD, **options)
+
+    assert success, error_msg
+    assert stat.S_IMODE(output.stat().st_mode) == 0o644
+    assert [path.name for path in output.parent.iterdir()] == ["locked.pdf"]
+    assert_locked(output)
+
+
+def test_lock_pdf_bytes_deduplicates_by_default(tmp_path):
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, NameObject
+
+    if not hasattr(PdfWriter, "compress_identical_objects"):
+        pytest.skip("compress_identical_objects は pypdf 5.0以降")
+
+    # 同じ内容のページ内容ストリームをページごとに別オブジェクトとして持つPDF
+    writer = PdfWriter()
+    for _ in range(10):
+        page = writer.add_blank_page(width=200, height=200)
+        content = DecodedStreamObject()
+        content.set_data(b"0 0 m 200 200 l S\n" * 50)
+        page[NameObject("/Contents")] = writer._add_object(content)
+    source = tmp_path / "shared.pdf"
+    with open(source, "wb") as f:
+        writer.write(f)
+    data = source.read_bytes()
+
+    success, deduplicated, error_msg = core_logic.lock_pdf_bytes(data, PASSWORD)
+    assert success, error_msg
+    success, kept, error_msg = core_logic.lock_pdf_bytes(data, PASSWORD, deduplicate=False)
+    assert success, error_msg
+    # 同じ内容のストリームが1つにまとまる分、出力が小さくなる
+    assert len(deduplicated) < len(kept)
+    (tmp_path / "locked.pdf").write_bytes(deduplicated)
+    assert_locked(tmp_path / "locked.pdf")
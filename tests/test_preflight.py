@@ -0,0 +1,86 @@
+"""事前確認（preflight_files）と、見積もりを使った処理順の確認"""
+
+from pathlib import Path
+
+import core_logic
+from conftest import PASSWORD, assert_locked, write_pdf
+
+OFFICE_STUB = b"PK\x05\x06" + b"\0" * 18
+
+
+def make_batch(directory: Path):
+    """小さなPDF・大きなPDF・Office文書を作る"""
+    directory.mkdir(exist_ok=True)
+    small = write_pdf(directory / "small.pdf", pages=1)
+    large = write_pdf(directory / "large.pdf", pages=300)
+    office = directory / "slides.pptx"
+    office.write_bytes(OFFICE_STUB)
+    return small, large, office
+
+
+def test_preflight_files_estimates_mixed_batch(tmp_path):
+    small, large, office = make_batch(tmp_path)
+    locked = tmp_path / "locked.pdf"
+    assert core_logic.lock_pdf_file(str(small), str(locked), PASSWORD)[0]
+    unsupported = tmp_path / "notes.txt"
+    unsupported.write_text("対象外")
+
+    estimates = core_logic.preflight_files([small, large, office, locked, unsupported])
+
+    assert [estimate.path for estimate in estimates] == [str(p) for p in (small, large, office, locked, unsupported)]
+    small_est, large_est, office_est, locked_est, unsupported_est = estimates
+    assert (small_est.kind, small_est.page_count) == (core_logic.FILE_KIND_PDF, 1)
+    assert (large_est.kind, large_est.page_count) == (core_logic.FILE_KIND_PDF, 300)
+    assert large_est.object_count > small_est.object_count > 0
+    assert large_est.cost == core_logic.estimate_cost(core_logic.FILE_KIND_PDF, large_est.size, large_est.object_count)
+    assert (office_est.kind, office_est.page_count, office_est.size) == (core_logic.FILE_KIND_OFFICE, None, len(OFFICE_STUB))
+    # Office文書は変換の分だけ時間がかかる見積もりになる
+    assert office_est.cost > large_est.cost > small_est.cost > 0
+    assert locked_est.encrypted and locked_est.error_message
+    assert unsupported_est.error_message and unsupported_est.cost == 0
+
+
+def test_estimate_batch_seconds_assigns_largest_first():
+    assert core_logic.estimate_batch_seconds([1.0, 5.0, 2.0], workers=2) == 5.0
+    assert core_logic.estimate_batch_seconds([4.0, 3.0, 3.0, 2.0, 2.0], workers=2) == 8.0
+    assert core_logic.estimate_batch_seconds([1.0, 2.0], workers=1) == 3.0
+
+
+def _record_job_order(monkeypatch):
+    """_run_batch に渡されたジョブの順番（入力ファイル名）を記録する"""
+    order = []
+    run_batch = core_logic._run_batch
+
+    def spy(func, jobs, *args):
+        order.extend(Path(job[0]).name for job in jobs)
+        return run_batch(func, jobs, *args)
+
+    monkeypatch.setattr(core_logic, "_run_batch", spy)
+    return order
+
+
+def test_process_files_schedules_largest_first(tmp_path, monkeypatch):
+    paths = make_batch(tmp_path / "in")
+    (tmp_path / "out").mkdir()
+    order = _record_job_order(monkeypatch)
+
+    results = list(core_logic.process_files(paths, PASSWORD, output_dir=str(tmp_path / "out"), workers=1))
+
+    assert order == ["slides.pptx", "large.pdf", "small.pdf"]
+    assert all(result.success for result in results), [result.error_message for result in results]
+    for result in results:
+        assert_locked(result.output_path)
+
+
+def test_process_files_uses_preflight_estimates(tmp_path, monkeypatch):
+    paths = make_batch(tmp_path / "in")
+    (tmp_path / "out").mkdir()
+    estimates = core_logic.preflight_files(paths)
+    # 見積もりを渡した場合はその順番（ここでは逆順にした見積もり）に従う
+    for estimate, cost in zip(estimates, (3.0, 2.0, 1.0)):
+        estimate.cost = cost
+    order = _record_job_order(monkeypatch)
+
+    list(core_logic.process_files(paths, PASSWORD, output_dir=str(tmp_path / "out"), workers=1, estimates=estimates))
+
+    assert order == ["small.pdf", "large.pdf", "slides.pptx"]
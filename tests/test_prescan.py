@@ -0,0 +1,39 @@
+"""prescan_pdf（先頭と末尾だけを読む事前確認）の動作確認"""
+
+import io
+import mmap
+
+import pytest
+
+import core_logic
+from conftest import PASSWORD
+
+
+def _prescan_mmap(path):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        mapped.seek(5)
+        result = core_logic.prescan_pdf(mapped)
+        assert mapped.tell() == 5
+        return result
+
+
+@pytest.mark.parametrize("open_source", ["file", "mmap"])
+def test_prescan_accepts_plain_pdf(pdf_file, open_source):
+    if open_source == "mmap":
+        assert _prescan_mmap(pdf_file) == (True, "")
+    else:
+        with open(pdf_file, "rb") as f:
+            assert core_logic.prescan_pdf(f) == (True, "")
+
+
+def test_prescan_rejects_locked_pdf_from_mmap(tmp_path, pdf_file):
+    locked = tmp_path / "locked.pdf"
+    assert core_logic.lock_pdf_file(str(pdf_file), str(locked), PASSWORD)[0]
+    ok, error_msg = _prescan_mmap(locked)
+    assert not ok
+    assert "すでに鍵" in error_msg
+
+
+def test_prescan_rejects_empty_and_non_pdf():
+    assert not core_logic.prescan_pdf(io.BytesIO(b""))[0]
+    assert not core_logic.prescan_pdf(io.BytesIO(b"hello world"))[0]
@@ -0,0 +1,128 @@
+"""process_files（複数ファイルのまとめ処理）の動作確認"""
+
+import threading
+import time
+
+import pytest
+
+import core_logic
+from conftest import PASSWORD, assert_locked, write_pdf
+
+OFFICE_STUB = b"PK\x05\x06" + b"\0" * 18
+
+
+def make_inputs(directory, names):
+    """PDFと（FakeConverterBackend で変換する）Office文書を作る"""
+    paths = []
+    for name in names:
+        path = directory / name
+        if path.suffix == ".pdf":
+            write_pdf(path, pages=5)
+        else:
+            path.write_bytes(OFFICE_STUB)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("workers", [1, 2], ids=["inline", "pool"])
+def test_process_files_ordered_with_office_documents(tmp_path, workers):
+    inputs = make_inputs(tmp_path, ["a.pdf", "b.docx", "c_fail.xlsx", "d.pdf", "e.pptx"])
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    results = list(core_logic.process_files(
+        inputs, PASSWORD, output_dir=str(output_dir), workers=workers, ordered=True
+    ))
+
+    assert [result.input_path for result in results] == inputs
+    assert [result.success for result in results] == [True, True, False, True, True]
+    assert "fake" in results[2].error_message
+    for result in results:
+        if result.success:
+            assert_locked(result.output_path)
+
+
+def test_process_files_reports_progress(tmp_path):
+    inputs = make_inputs(tmp_path, ["a.pdf", "b.pdf", "c.docx"])
+    events = []
+
+    results = list(core_logic.process_files(
+        inputs, PASSWORD, output_dir=str(tmp_path), workers=2, on_progress=events.append
+    ))
+
+    assert all(result.success for result in results)
+    # 進み具合は結果より後に届くことがある
+    deadline = time.monotonic() + 10
+    while {event.input_path for event in events} != set(inputs) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert {event.input_path for event in events} == set(inputs)
+    assert any(event.stage == core_logic.STAGE_CONVERT for event in events if event.input_path == inputs[2])
+
+
+@pytest.mark.parametrize("workers", [1, 2], ids=["inline", "pool"])
+def test_process_files_cancelled(tmp_path, workers):
+    inputs = make_inputs(tmp_path, ["a.pdf", "b.pdf", "c.docx"])
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    results = list(core_logic.process_files(
+        inputs, PASSWORD, output_dir=str(tmp_path), workers=workers, cancel_event=cancel_event
+    ))
+
+    assert len(results) == 3
+    assert all(result.cancelled and not result.success for result in results)
+    assert not list(tmp_path.glob("鍵付き_*"))
+
+
+def test_process_files_keeps_outputs_with_same_stem_apart(tmp_path):
+    pdf = write_pdf(tmp_path / "a.pdf")
+    docx = tmp_path / "a.docx"
+    docx.write_bytes(OFFICE_STUB)
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    results = list(core_logic.process_files([str(pdf), str(docx)], PASSWORD, output_dir=str(output_dir), workers=2))
+
+    assert all(result.success for result in results), [result.error_message for result in results]
+    outputs = sorted(result.output_path for result in results)
+    assert len(set(outputs)) == 2
+    assert sorted(path.name for path in output_dir.iterdir()) == ["鍵付き_a (2).pdf", "鍵付き_a.pdf"]
+    for output in outputs:
+        assert_locked(output)
+
+
+def test_process_files_splits_large_pdf_across_spare_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(core_logic, "PARALLEL_MIN_BYTES", 1)
+    monkeypatch.setattr(core_logic, "PARALLEL_MIN_OBJECTS", 1)
+    split_into = []
+    lock_parallel = core_logic._lock_pdf_file_parallel
+
+    def spy(input_path, output_path, password, workers, *args):
+        split_into.append(workers)
+        return lock_parallel(input_path, output_path, password, workers, *args)
+
+    monkeypatch.setattr(core_logic, "_lock_pdf_file_parallel", spy)
+    pdf = write_pdf(tmp_path / "big.pdf", pages=10)
+
+    # 1ファイルだけなのでバッチはこのプロセスで処理され、余ったワーカーが分担に回る
+    [result] = core_logic.process_files([str(pdf)], PASSWORD, output_dir=str(tmp_path), workers=2)
+
+    assert result.success, result.error_message
+    assert split_into == [2]
+    assert_locked(result.output_path)
+
+
+def test_get_worker_pool_starts_requested_workers_and_grows(monkeypatch):
+    monkeypatch.setattr(core_logic, "_worker_pool", None)
+    monkeypatch.setattr(core_logic, "default_worker_count", lambda: 4)
+
+    pool = core_logic.get_worker_pool(1)
+    try:
+        # 必要な数だけ用意し、CPUコア数まで増やさない
+        assert pool.workers == 1
+        assert core_logic.get_worker_pool(2) is pool
+        assert pool.workers == 2
+        # 少ない数を求められても減らさない
+        assert core_logic.get_worker_pool(1).workers == 2
+    finally:
+        pool.close()
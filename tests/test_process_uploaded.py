@@ -0,0 +1,55 @@
+"""process_uploaded_file / process_uploaded_files（Webアプリ用）の動作確認"""
+
+import io
+import threading
+import time
+
+import core_logic
+from conftest import PASSWORD, assert_locked, write_pdf
+
+
+def test_process_uploaded_file_reports_progress(tmp_path):
+    data = write_pdf(tmp_path / "pages.pdf", pages=20).read_bytes()
+    events = []
+
+    success, locked, error_msg = core_logic.process_uploaded_file(
+        io.BytesIO(data), "pages.pdf", PASSWORD, progress=lambda *event: events.append(event)
+    )
+
+    assert success, error_msg
+    assert events[-1] == (core_logic.STAGE_WRITE, len(data), len(data))
+    output = tmp_path / "locked.pdf"
+    output.write_bytes(locked)
+    assert_locked(output)
+
+
+def test_process_uploaded_file_cancelled(tmp_path):
+    data = write_pdf(tmp_path / "a.pdf").read_bytes()
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    success, locked, error_msg = core_logic.process_uploaded_file(
+        io.BytesIO(data), "a.pdf", PASSWORD, cancel_event=cancel_event
+    )
+
+    assert not success
+    assert locked == b""
+    assert error_msg == core_logic.CANCELLED_MESSAGE
+
+
+def test_process_uploaded_files_forwards_progress_and_cancel(tmp_path):
+    files = [(f"{name}.pdf", write_pdf(tmp_path / f"{name}.pdf").read_bytes()) for name in ("a", "b")]
+    events = []
+
+    results = list(core_logic.process_uploaded_files(files, PASSWORD, workers=2, on_progress=events.append))
+    assert all(success for _, success, _, _ in results)
+    # 進み具合は結果より後に届くことがある
+    deadline = time.monotonic() + 10
+    while {event.input_path for event in events} != {"a.pdf", "b.pdf"} and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert {event.input_path for event in events} == {"a.pdf", "b.pdf"}
+
+    cancel_event = threading.Event()
+    cancel_event.set()
+    results = list(core_logic.process_uploaded_files(files, PASSWORD, workers=2, cancel_event=cancel_event))
+    assert [error for _, success, _, error in results if not success] == [core_logic.CANCELLED_MESSAGE] * 2
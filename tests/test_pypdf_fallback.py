@@ -0,0 +1,42 @@
+"""pypdfの内部の機能が使えない場合に、公開の PdfWriter.encrypt で暗号化できることの確認"""
+
+import pytest
+
+import core_logic
+from conftest import PASSWORD, assert_locked
+
+
+@pytest.fixture
+def without_private_api(monkeypatch):
+    core_logic._load_pypdf()
+    monkeypatch.setattr(core_logic, "_private_api_usable", lambda: False)
+    monkeypatch.setattr(core_logic, "_pypdf_loaded", False)
+    # 元の値は monkeypatch で戻す（_load_pypdf が書き換えるため）
+    monkeypatch.setattr(core_logic, "STREAMING_AVAILABLE", core_logic.STREAMING_AVAILABLE)
+    assert core_logic._load_pypdf()
+    assert not core_logic.STREAMING_AVAILABLE
+
+
+def test_private_api_is_usable_with_supported_pypdf():
+    core_logic._load_pypdf()
+    assert core_logic._private_api_usable()
+
+
+def test_derive_password_keys_falls_back(without_private_api):
+    assert core_logic.derive_password_keys(PASSWORD) is None
+
+
+@pytest.mark.parametrize("streaming", [False, True], ids=["normal", "streaming"])
+def test_lock_pdf_file_falls_back_to_public_encrypt(without_private_api, tmp_path, pdf_file, streaming):
+    output = tmp_path / "locked.pdf"
+    success, error_msg = core_logic.lock_pdf_file(
+        str(pdf_file), str(output), PASSWORD, streaming=streaming, parallel=2
+    )
+    assert success, error_msg
+    assert_locked(output)
+
+
+def test_process_files_falls_back_to_public_encrypt(without_private_api, tmp_path, pdf_file):
+    [result] = core_logic.process_files([str(pdf_file)], PASSWORD, output_dir=str(tmp_path), workers=1)
+    assert result.success, result.error_message
+    assert_locked(result.output_path)
@@ -0,0 +1,75 @@
+"""web_metrics（Prometheus形式のメトリクス）の出力の確認"""
+
+import socket
+import urllib.request
+
+import web_metrics
+from web_metrics import Counter, Gauge, Histogram
+
+
+def test_counter_renders_labels_with_escaping():
+    counter = Counter("test_files_total", "Files.", ["file_type", "reason"])
+    counter.inc(file_type="pdf", reason="ok")
+    counter.inc(2, file_type="pdf", reason="ok")
+    counter.inc(file_type='a"b\\c\nd', reason="x")
+
+    assert counter.render().splitlines() == [
+        "# HELP test_files_total Files.",
+        "# TYPE test_files_total counter",
+        'test_files_total{file_type="a\\"b\\\\c\\nd",reason="x"} 1',
+        'test_files_total{file_type="pdf",reason="ok"} 3',
+    ]
+
+
+def test_gauge_renders_value_and_function():
+    gauge = Gauge("test_in_flight", "In flight.")
+    gauge.inc()
+    gauge.inc(2)
+    gauge.dec()
+    assert gauge.render().splitlines()[1:] == ["# TYPE test_in_flight gauge", "test_in_flight 2"]
+
+    gauge.set_function(lambda: 0.5)
+    assert gauge.render().splitlines()[-1] == "test_in_flight 0.5"
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Latency.", [1.0, 0.1], ["stage"])
+    histogram.observe(0.05, stage="read")
+    histogram.observe(0.5, stage="read")
+    histogram.observe(7, stage="read")
+
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds Latency.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="read",le="0.1"} 1',
+        'test_seconds_bucket{stage="read",le="1"} 2',
+        'test_seconds_bucket{stage="read",le="+Inf"} 3',
+        'test_seconds_sum{stage="read"} 7.55',
+        'test_seconds_count{stage="read"} 3',
+    ]
+
+
+def test_record_result_and_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(web_metrics, "_server", None)
+    monkeypatch.setattr(web_metrics, "_server_started", False)
+    web_metrics.record_result("pdf", 2048, 0.2, True, output_size=4096)
+    web_metrics.record_result("docx", 100, 1.5, False, error_message="Office文書の変換に失敗しました")
+
+    # 空いているポートを探す（0 はメトリクスの無効化を表すため直接は渡せない）
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = web_metrics.start_metrics_server("127.0.0.1", port)
+    assert server is not None
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert body == web_metrics.render_metrics()
+    assert 'pdf_locker_failures_total{file_type="docx",reason="conversion"}' in body
+    assert 'pdf_locker_input_size_bytes_bucket{file_type="pdf",le="16384"}' in body
+    assert "# TYPE pdf_locker_lock_duration_seconds histogram" in body
@@ -12,8 +12,11 @@ Docker環境での起動:
     docker run -p 8501:8501 pdf-locker-web
 """
 
+import logging
+import time
 import streamlit as st
 from pathlib import Path
+from typing import List
 
 # 共通ロジックをインポート
 from core_logic import (
@@ -21,16 +24,205 @@ from core_logic import (
     is_supported_file,
     get_file_type_icon,
     validate_password,
-    lock_pdf_bytes,
-    process_uploaded_file,
+    derive_password_keys,
+    JobQueue,
+    Job,
+    get_worker_pool,
+    JOB_QUEUED,
+    JOB_DONE,
+    StageStats,
     SUPPORTED_EXTENSIONS,
-    PYPDF_AVAILABLE
 )
+import web_metrics
+
+
+logger = logging.getLogger("pdf_locker.web")
+
+# ジョブの状態を確認する間隔（秒）
+POLL_INTERVAL = 0.5
+
+# 複数ファイルをまとめてダウンロードするときのファイル名
+ZIP_FILENAME = "鍵付きPDF.zip"
+
+
+def log_stats(file_name: str, stats: StageStats) -> None:
+    """ファイルごとの処理時間の内訳をサーバーのログに残す（遅いときの原因調査用）"""
+    logger.info("%s: %.2fs %s", file_name, stats.total_seconds, stats.summary())
+
+
+def record_job(job: Job) -> None:
+    """ジョブが終わったときにログとメトリクスに記録する（ジョブキューのスレッドから呼ばれる）"""
+    result = job.result
+    if result is None:
+        return  # 取り消されたジョブ
+    if result.stats is not None:
+        log_stats(job.filename, result.stats)
+    output_size = Path(result.output_path).stat().st_size if result.success else 0
+    web_metrics.record_result(
+        file_type=Path(job.filename).suffix.lower().lstrip("."),
+        input_size=job.input_size,
+        duration=job.elapsed,
+        success=result.success,
+        output_size=output_size,
+        error_message=result.error_message,
+        stats=result.stats
+    )
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """
+    全セッションで共有するジョブキューを取得（サーバープロセスで1回だけ作成）
+
+    重い処理はジョブキューのワーカープロセスで行うため、大きなファイルを処理中でも
+    他の利用者の画面は待たされません。
+    """
+    queue = JobQueue(streaming=True, on_complete=record_job)
+    web_metrics.IN_FLIGHT.set_function(queue.active_count)
+    web_metrics.WARM_WORKERS.set_function(lambda: get_worker_pool().ready_workers)
+    return queue
+
+
+def upload_key(uploaded_files) -> str:
+    """アップロードされたファイルの組み合わせを見分けるためのキー"""
+    return "|".join(f"{f.name}:{f.size}" for f in uploaded_files)
+
+
+def forget_jobs(queue: JobQueue) -> None:
+    """このセッションのジョブを片付ける"""
+    job_ids = st.session_state.pop("job_ids", None) or []
+    st.session_state.pop("job_upload", None)
+    for job_id in job_ids:
+        queue.discard(job_id)
+
+
+def show_single_result(job: Job) -> None:
+    """1ファイルだけの場合の結果表示（PDFをそのままダウンロード）"""
+    result = job.result
+    if job.state == JOB_DONE:
+        # 成功メッセージ
+        st.markdown("""
+            <div class="success-box">
+                <h3>✅ 鍵をかけ終わりました！</h3>
+                <p>下のボタンからダウンロードしてください。</p>
+            </div>
+        """, unsafe_allow_html=True)
+
+        # ダウンロードボタン
+        output_filename = f"鍵付き_{Path(job.filename).stem}.pdf"
+
+        with open(result.output_path, "rb") as f:
+            st.download_button(
+                label="📥 ダウンロード",
+                data=f,
+                file_name=output_filename,
+                mime="application/pdf",
+                type="primary"
+            )
+
+        st.info(f"💡 ダウンロードされるファイル名: **{output_filename}**")
+
+    elif result is not None:
+        # エラーメッセージ
+        st.error(f"❌ 処理できませんでした\n\n{result.error_message}")
+
+
+def show_batch_result(queue: JobQueue, job_ids: List[str], jobs: List[Job]) -> None:
+    """複数ファイルの場合の結果表示（ZIPでまとめてダウンロード＋ファイルごとの結果）"""
+    succeeded = sum(1 for job in jobs if job.state == JOB_DONE)
+    failed = [job for job in jobs if job.state != JOB_DONE]
+
+    if succeeded:
+        st.markdown(f"""
+            <div class="success-box">
+                <h3>✅ {succeeded}個のファイルに鍵をかけ終わりました！</h3>
+                <p>下のボタンからまとめてダウンロードしてください。</p>
+            </div>
+        """, unsafe_allow_html=True)
+
+        zip_path = queue.make_archive(job_ids, ZIP_FILENAME)
+        if zip_path is not None:
+            with open(zip_path, "rb") as f:
+                st.download_button(
+                    label=f"📥 まとめてダウンロード（{succeeded}ファイル）",
+                    data=f,
+                    file_name=ZIP_FILENAME,
+                    mime="application/zip",
+                    type="primary"
+                )
+            st.info(f"💡 ダウンロードされるファイル名: **{ZIP_FILENAME}**")
+
+    if failed:
+        st.error(f"❌ {len(failed)}個のファイルは処理できませんでした（ZIPの中の「処理結果.csv」にも記録しています）")
+        st.table([
+            {
+                "ファイル名": job.filename,
+                "理由": job.result.error_message if job.result is not None else "取り消しました",
+            }
+            for job in failed
+        ])
+
+
+def show_jobs(queue: JobQueue, job_ids: List[str]) -> None:
+    """
+    ジョブの状態を表示（すべて終わるまで一定間隔で画面を更新する）
+
+    Args:
+        queue: ジョブキュー
+        job_ids: このセッションのジョブIDのリスト
+    """
+    jobs = [queue.status(job_id) for job_id in job_ids]
+    if any(job is None for job in jobs):
+        forget_jobs(queue)
+        st.warning("処理結果の保存期間が過ぎました。もう一度お試しください。")
+        return
+
+    finished = sum(1 for job in jobs if job.finished)
+    if finished < len(jobs):
+        elapsed = max(job.elapsed for job in jobs)
+        if all(job.state == JOB_QUEUED for job in jobs):
+            message = "順番待ちです...しばらくお待ちください"
+        else:
+            message = "処理中です...しばらくお待ちください"
+        # 大きなファイルほど時間がかかるため、ファイルサイズで重み付けした進み具合を表示する
+        total_size = sum(max(job.input_size, 1) for job in jobs)
+        done_size = sum(max(job.input_size, 1) * (1.0 if job.finished else job.progress) for job in jobs)
+        st.progress(min(1.0, done_size / total_size), text=f"⏳ {message}（{finished}/{len(jobs)}、{elapsed:.0f}秒）")
+        if st.button("やめる"):
+            for job_id in job_ids:
+                queue.cancel(job_id)
+            forget_jobs(queue)
+            st.rerun()
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
+        return
+
+    if len(jobs) == 1:
+        show_single_result(jobs[0])
+    else:
+        show_batch_result(queue, job_ids, jobs)
+
+    # 処理時間の内訳（「遅い」と言われたときの原因調査用）
+    timings = {
+        job.filename: job.result.stats.to_dict()
+        for job in jobs
+        if job.result is not None and job.result.stats is not None
+    }
+    if timings:
+        with st.expander("処理時間の内訳（管理者向け）"):
+            st.json(timings[jobs[0].filename] if len(jobs) == 1 else timings)
+
+    if st.button("別のファイルに鍵をかける"):
+        forget_jobs(queue)
+        st.rerun()
 
 
 def main():
     """メインアプリケーション"""
 
+    # メトリクス公開用のサーバーを起動（サーバープロセスで1回だけ）
+    web_metrics.start_metrics_server()
+
     # ページ設定
     st.set_page_config(
         page_title="PDFに鍵をかけるツール",
@@ -105,28 +297,32 @@ def main():
     # ステップ1: ファイルアップロード
     st.markdown('<p class="step-header">① ファイルをアップロード</p>', unsafe_allow_html=True)
 
-    uploaded_file = st.file_uploader(
-        "鍵をかけたいファイルを選んでください",
+    uploaded_files = st.file_uploader(
+        "鍵をかけたいファイルを選んでください（複数選べます）",
         type=["pdf", "docx", "xlsx", "pptx"],
+        accept_multiple_files=True,
         help="PDF、Word(.docx)、Excel(.xlsx)、PowerPoint(.pptx)に対応しています"
     )
 
-    if uploaded_file is not None:
+    if uploaded_files:
         # ファイル情報を表示
-        file_ext = Path(uploaded_file.name).suffix.lower()
-        icon = get_file_type_icon(uploaded_file.name)
-
+        lines = "".join(
+            f"{get_file_type_icon(f.name)} {f.name} <small>（{f.size / 1024:.1f} KB）</small><br>"
+            for f in uploaded_files
+        )
         st.markdown(f"""
             <div class="file-info">
-                <strong>{icon} 選択されたファイル:</strong><br>
-                {uploaded_file.name}<br>
-                <small>サイズ: {uploaded_file.size / 1024:.1f} KB</small>
+                <strong>選択されたファイル（{len(uploaded_files)}個）:</strong><br>
+                {lines}
             </div>
         """, unsafe_allow_html=True)
 
         # Office文書の場合の注意
-        if file_ext in ['.docx', '.xlsx', '.pptx']:
-            st.info("📝 このファイルはPDFに変換してから鍵をかけます。")
+        if any(Path(f.name).suffix.lower() in ['.docx', '.xlsx', '.pptx'] for f in uploaded_files):
+            st.info("📝 Word/Excel/PowerPointのファイルはPDFに変換してから鍵をかけます。")
+
+        if len(uploaded_files) > 1:
+            st.info("📦 複数のファイルは、鍵をかけたあと1つのZIPファイルにまとめてダウンロードできます。")
 
         # ステップ2: パスワード入力
         st.markdown('<p class="step-header">② パスワードを決める</p>', unsafe_allow_html=True)
@@ -171,45 +367,32 @@ def main():
         # パスワードの検証
         is_valid, validation_error = validate_password(password)
 
-        if st.button("🔒 鍵をかけてダウンロード", type="primary", disabled=not is_valid):
-            with st.spinner("処理中です...しばらくお待ちください"):
-                # ファイルを処理
-                uploaded_file.seek(0)  # ファイルポインタをリセット
+        queue = get_job_queue()
+        job_ids = st.session_state.get("job_ids")
 
-                success, locked_pdf_bytes, error_msg = process_uploaded_file(
-                    uploaded_file,
-                    uploaded_file.name,
-                    password
-                )
+        # 別のファイルが選ばれたら前のジョブは片付ける
+        if job_ids and st.session_state.get("job_upload") != upload_key(uploaded_files):
+            forget_jobs(queue)
+            job_ids = None
 
-                if success:
-                    # 成功メッセージ
-                    st.markdown("""
-                        <div class="success-box">
-                            <h3>✅ 鍵をかけ終わりました！</h3>
-                            <p>下のボタンからダウンロードしてください。</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-                    # ダウンロードボタン
-                    output_filename = f"鍵付き_{Path(uploaded_file.name).stem}.pdf"
-
-                    st.download_button(
-                        label="📥 ダウンロード",
-                        data=locked_pdf_bytes,
-                        file_name=output_filename,
-                        mime="application/pdf",
-                        type="primary"
-                    )
-
-                    st.info(f"💡 ダウンロードされるファイル名: **{output_filename}**")
+        if st.button("🔒 鍵をかけてダウンロード", type="primary", disabled=not is_valid or bool(job_ids)):
+            # ファイルをジョブキューに渡す（処理はワーカープロセスで並列に行われる）
+            job_ids = []
+            keys = derive_password_keys(password)  # 鍵の導出は全ファイルで1度だけ
+            for uploaded_file in uploaded_files:
+                uploaded_file.seek(0)  # ファイルポインタをリセット
+                job_ids.append(queue.submit(uploaded_file, uploaded_file.name, password, keys))
+            st.session_state["job_ids"] = job_ids
+            st.session_state["job_upload"] = upload_key(uploaded_files)
 
-                else:
-                    # エラーメッセージ
-                    st.error(f"❌ 処理できませんでした\n\n{error_msg}")
+        if job_ids:
+            show_jobs(queue, job_ids)
 
     else:
         # ファイルが選択されていない場合
+        if "job_ids" in st.session_state:
+            forget_jobs(get_job_queue())
+
         st.markdown("""
             ---
             ### 📌 対応ファイル形式
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+PDF Locker - Webアプリ用のメトリクス（Prometheus形式）
+
+Webアプリ（Streamlit）の処理件数・処理時間などを集計し、
+Prometheusのテキスト形式で公開します。サーバーの負荷の把握や増強の判断に使います。
+
+Streamlitは画面操作のたびにスクリプトを再実行しますが、このモジュールは
+サーバープロセス内で1度だけ読み込まれるため、集計値は全セッションで共有されます。
+
+公開先:
+    http://<PDF_LOCKER_METRICS_HOST>:<PDF_LOCKER_METRICS_PORT>/metrics
+    （既定は 127.0.0.1:9108。PDF_LOCKER_METRICS_PORT=0 で無効）
+
+追加のライブラリは不要です（標準ライブラリのみで動作）。
+"""
+
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from core_logic import StageStats
+
+logger = logging.getLogger("pdf_locker.metrics")
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+
+# 処理時間のバケット（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# 入力サイズのバケット（バイト）
+SIZE_BUCKETS = tuple(kb * 1024 for kb in (16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576))
+
+# 失敗理由の分類（core_logicのエラーメッセージに含まれる語句 → 理由）
+FAILURE_REASONS = [
+    ("すでに鍵がかかっています", "already_encrypted"),
+    ("壊れている", "corrupt"),
+    ("使用中", "in_use"),
+    ("未対応", "unsupported"),
+    ("変換", "conversion"),
+    ("ライブラリ", "missing_dependency"),
+]
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """メトリクスの共通部分（ラベルごとの値をスレッド安全に保持）"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """増える一方の値（処理件数など）"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """増減する値（処理中の件数など）"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """値を取得のたびに関数から求める（ジョブキューの件数など）"""
+        with self._lock:
+            self._function = function
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            value = self._value
+            function = self._function
+        if function is not None:
+            value = function()
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """分布（処理時間・ファイルサイズなど）"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+FILES_LOCKED = Counter(
+    "pdf_locker_files_locked_total",
+    "Number of files locked successfully.",
+    ["file_type"],
+)
+FAILURES = Counter(
+    "pdf_locker_failures_total",
+    "Number of files that could not be locked, by reason.",
+    ["file_type", "reason"],
+)
+BYTES_PROCESSED = Counter(
+    "pdf_locker_bytes_processed_total",
+    "Bytes read from uploads and written as locked PDFs.",
+    ["direction"],
+)
+IN_FLIGHT = Gauge(
+    "pdf_locker_in_flight_requests",
+    "Number of lock requests queued or being processed.",
+)
+WARM_WORKERS = Gauge(
+    "pdf_locker_warm_workers",
+    "Number of worker processes that have loaded the PDF and crypto libraries and are ready for jobs.",
+)
+LOCK_LATENCY = Histogram(
+    "pdf_locker_lock_duration_seconds",
+    "Wall time from upload to locked file, including queueing and Office conversion.",
+    LATENCY_BUCKETS,
+    ["file_type"],
+)
+STAGE_LATENCY = Histogram(
+    "pdf_locker_stage_duration_seconds",
+    "Time spent in each processing stage.",
+    LATENCY_BUCKETS,
+    ["stage"],
+)
+INPUT_SIZE = Histogram(
+    "pdf_locker_input_size_bytes",
+    "Size of uploaded files.",
+    SIZE_BUCKETS,
+    ["file_type"],
+)
+
+REGISTRY: List[_Metric] = [
+    FILES_LOCKED, FAILURES, BYTES_PROCESSED, IN_FLIGHT, WARM_WORKERS, LOCK_LATENCY, STAGE_LATENCY, INPUT_SIZE
+]
+
+
+def render_metrics() -> str:
+    """すべてのメトリクスをPrometheusのテキスト形式で出力"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def failure_reason(error_message: str) -> str:
+    """
+    エラーメッセージから失敗理由の分類を求める
+
+    Args:
+        error_message: core_logicが返したエラーメッセージ
+
+    Returns:
+        失敗理由（ラベル値として使う短い英語）
+    """
+    for phrase, reason in FAILURE_REASONS:
+        if phrase in error_message:
+            return reason
+    return "other"
+
+
+def record_result(
+    file_type: str,
+    input_size: int,
+    duration: float,
+    success: bool,
+    output_size: int = 0,
+    error_message: str = "",
+    stats: Optional[StageStats] = None
+) -> None:
+    """
+    1ファイル分の処理結果を記録
+
+    Args:
+        file_type: ファイルの種類（拡張子、例: "pdf"）
+        input_size: 入力サイズ（バイト）
+        duration: 処理時間（秒）
+        success: 成功したかどうか
+        output_size: 出力サイズ（バイト）
+        error_message: 失敗した場合のエラーメッセージ
+        stats: 処理段階ごとの記録
+    """
+    INPUT_SIZE.observe(input_size, file_type=file_type)
+    LOCK_LATENCY.observe(duration, file_type=file_type)
+    BYTES_PROCESSED.inc(input_size, direction="in")
+    if success:
+        FILES_LOCKED.inc(file_type=file_type)
+        BYTES_PROCESSED.inc(output_size, direction="out")
+    else:
+        FAILURES.inc(file_type=file_type, reason=failure_reason(error_message))
+    if stats is not None:
+        for stage, seconds in stats.durations.items():
+            STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics へのリクエストに応答する"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # アクセスログは出さない（Prometheusが定期的に取得するため）
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host: Optional[str] = None, port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    メトリクス公開用のHTTPサーバーをバックグラウンドで起動（2回目以降は何もしない）
+
+    Args:
+        host: 待ち受けるアドレス（Noneの場合は環境変数 PDF_LOCKER_METRICS_HOST）
+        port: 待ち受けるポート（Noneの場合は環境変数 PDF_LOCKER_METRICS_PORT、0で無効）
+
+    Returns:
+        起動したサーバー（無効または起動できなかった場合はNone）
+    """
+    global _server, _server_started
+    with _server_lock:
+        # Streamlitの再実行のたびに呼ばれるため、起動を試みるのは最初の1回だけ
+        if _server_started:
+            return _server
+        _server_started = True
+
+        if host is None:
+            host = os.environ.get("PDF_LOCKER_METRICS_HOST", DEFAULT_METRICS_HOST)
+        if port is None:
+            port = int(os.environ.get("PDF_LOCKER_METRICS_PORT", DEFAULT_METRICS_PORT))
+        if port == 0:
+            return None
+
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics server could not listen on %s:%s: %s", host, port, e)
+            return None
+
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        _server = server
+        logger.info("Metrics available at http://%s:%s/metrics", host, port)
+        return server